@@ -0,0 +1,94 @@
+"""監査ログ一覧の深いページの取得時間 -- OFFSET 方式とキーセット（カーソル）方式の比較
+
+DATABASE_URL のデータベースへ月別パーティションにまたがる監査ログを投入し、新しい順で
+N 件目以降の1ページ（100件）を OFFSET で取る場合と、直前の行の (created_at, id) を
+カーソルにして取る場合（get_audit_logs）の時間を比べる。投入した行は終了時に削除する。
+
+    python benchmarks/audit_pagination.py --rows 1000000 --months 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+MARKER = "bench-audit-pagination"
+PAGE = 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+    from models.audit_log import AuditLog
+    from services.audit_partitions import ensure_partitions
+    from services.audit_service import get_audit_logs
+    from services.pagination import encode_cursor
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    db = SessionLocal()
+    try:
+        span = args.months * 30 * 86400
+        start = db.execute(text("SELECT (now() - make_interval(secs => :s))::date"), {"s": span}).scalar()
+        db.rollback()
+        ensure_partitions(start=start)
+        db.execute(text("""
+            INSERT INTO audit_logs (entity_type, entity_id, action, ip_address, created_at)
+            SELECT (ARRAY['invoice', 'vendor', 'compliance'])[1 + g % 3], g % 50000, 'update', :marker,
+                   now() - make_interval(secs => g::double precision * :s / :n)
+            FROM generate_series(1, :n) AS g
+        """), {"marker": MARKER, "n": args.rows, "s": span})
+        db.commit()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE audit_logs"))
+
+        def timed(fn) -> float:
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - started) * 1000)
+                db.rollback()
+            return statistics.median(samples)
+
+        for depth in (0, 10000, 100000, args.rows // 2):
+            if depth >= args.rows:
+                continue
+
+            def by_offset():
+                db.query(AuditLog).order_by(AuditLog.created_at.desc(), AuditLog.id.desc()) \
+                    .offset(depth).limit(PAGE).all()
+
+            cursor = None
+            if depth:
+                row = db.execute(text(
+                    "SELECT created_at, id FROM audit_logs ORDER BY created_at DESC, id DESC OFFSET :d LIMIT 1"
+                ), {"d": depth - 1}).one()
+                cursor = encode_cursor(row.created_at, row.id)
+            offset_ms = timed(by_offset)
+            keyset_ms = timed(lambda: get_audit_logs(db, limit=PAGE, cursor=cursor))
+            print(f"rows {depth:>8}+  offset {offset_ms:8.1f} ms  cursor {keyset_ms:6.1f} ms")
+
+        history_ms = timed(lambda: get_audit_logs(db, entity_type="invoice", entity_id=4242, limit=PAGE))
+        print(f"entity history (invoice 4242)  {history_ms:6.1f} ms")
+    finally:
+        db.rollback()
+        db.execute(text("DELETE FROM audit_logs WHERE ip_address = :m"), {"m": MARKER})
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
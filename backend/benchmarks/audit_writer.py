@@ -0,0 +1,76 @@
+"""監査ログの書き込み時間 -- 1件ずつ flush する従来方式とコミット時の一括 INSERT の比較
+
+1トランザクションで監査ログを N 件記録してコミットするまでの時間と SQL 文の数を測る
+（Gmail 取り込みやアップロードで添付ファイルごとに記録する場合に相当）。
+書き込んだ行は終了時に削除する。
+
+    python benchmarks/audit_writer.py --entries 500 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, event  # noqa: E402
+
+MARKER = "bench-audit"
+
+
+def legacy_log_action(db, **fields):
+    # 変更前の log_action: 1件ごとに ORM で追加して flush する
+    from models.audit_log import AuditLog
+
+    db.add(AuditLog(**fields))
+    db.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+    from models.audit_log import AuditLog
+    from services.audit_service import log_action
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *_: statements.append(statement))
+
+    def run(writer) -> tuple[float, int]:
+        samples = []
+        for _ in range(args.repeat):
+            db = SessionLocal()
+            try:
+                statements.clear()
+                started = time.perf_counter()
+                for i in range(args.entries):
+                    writer(db, user_id=None, entity_type="invoice", entity_id=i, action="create",
+                           new_values={"source": "gmail", "message_id": f"msg-{i}"}, ip_address=MARKER)
+                db.commit()
+                samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                db.close()
+        return statistics.median(samples), len(statements)
+
+    try:
+        for name, writer in (("flush per entry", legacy_log_action), ("bulk at commit", log_action)):
+            ms, count = run(writer)
+            print(f"{name:<16} {args.entries} entries  {ms:8.1f} ms  {count:5d} statements")
+    finally:
+        db = SessionLocal()
+        db.execute(delete(AuditLog).where(AuditLog.ip_address == MARKER))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""月末の一括承認の所要時間 -- 1件ずつの承認 API と一括変更 API の比較
+
+DATABASE_URL のデータベースへ承認待ち（reviewed）の請求書を投入し、
+POST /api/invoices/{id}/approve を件数分呼ぶ場合と POST /api/invoices/bulk-transition を
+1回呼ぶ場合の所要時間と発行された SQL 文の数を比べる。投入したデータは終了時に削除する。
+
+    python benchmarks/bulk_transition.py --invoices 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text  # noqa: E402
+
+MARKER = "bench-bulk-transition"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import SessionLocal, engine
+    from models.user import User
+    from services.auth_service import get_current_user
+    from services.invoice_rollup import reconcile
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    app_main.app.dependency_overrides[get_current_user] = lambda: User(id=None, email="b@example.com", name="b", role="admin")
+    client = TestClient(app_main.app)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *_: statements.append(statement))
+
+    db = SessionLocal()
+    try:
+        def seed() -> list[int]:
+            ids = db.execute(text("""
+                INSERT INTO invoices (status, total_amount, due_date, is_deleted, source_type, original_filename)
+                SELECT 'reviewed', 1000 + g, CURRENT_DATE + g % 60, false, 'upload', :marker
+                FROM generate_series(1, :n) AS g
+                RETURNING id
+            """), {"marker": MARKER, "n": args.invoices}).scalars().all()
+            db.commit()
+            reconcile()
+            return ids
+
+        ids = seed()
+        statements.clear()
+        started = time.perf_counter()
+        for invoice_id in ids:
+            client.post(f"/api/invoices/{invoice_id}/approve").raise_for_status()
+        one_by_one = time.perf_counter() - started
+        print(f"one by one  {len(ids)} requests  {one_by_one:7.2f} s  {len(statements):6d} statements", flush=True)
+
+        ids = seed()
+        statements.clear()
+        started = time.perf_counter()
+        resp = client.post("/api/invoices/bulk-transition", json={"action": "approve", "invoice_ids": ids})
+        resp.raise_for_status()
+        bulk = time.perf_counter() - started
+        print(f"bulk        1 request  {bulk:7.2f} s  {len(statements):6d} statements"
+              f"  updated {len(resp.json()['updated'])}  ({one_by_one / bulk:.0f}x faster)")
+    finally:
+        db.rollback()
+        db.execute(text("""
+            DELETE FROM audit_logs WHERE entity_type = 'invoice'
+              AND entity_id IN (SELECT id FROM invoices WHERE original_filename = :m)
+        """), {"m": MARKER})
+        db.execute(text("DELETE FROM invoices WHERE original_filename = :m"), {"m": MARKER})
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""モデルカスケードのレイテンシ・コスト比較
+
+ローカルのモックOpenAIサーバー（benchmarks/mock_openai.py）を起動し、
+大きいモデルのみの構成とカスケード構成で同じ画像群を抽出して
+p50/p95 レイテンシ、エスカレーション率、推定コストを比較する。
+
+    python benchmarks/cascade_latency.py invoice.jpg --documents 50 --bad-rate 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from benchmarks.mock_openai import MockOpenAI, serve  # noqa: E402
+
+# 1リクエストあたりの概算コスト（USD, 入力1500/出力400トークン相当）
+COST_PER_REQUEST = {
+    "gpt-4o": 1500 / 1e6 * 2.50 + 400 / 1e6 * 10.00,
+    "gpt-4o-mini": 1500 / 1e6 * 0.15 + 400 / 1e6 * 0.60,
+}
+
+
+def _run(paths: list[str], cascade: list[str]) -> dict:
+    from services import ocr_service
+
+    settings.OCR_MODEL_CASCADE = cascade
+    timings, escalated, cost = [], 0, 0.0
+    for path in paths:
+        started = time.perf_counter()
+        result = ocr_service.extract_invoice_data(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        meta = result["_extraction"]
+        escalated += meta["escalated"]
+        cost += sum(COST_PER_REQUEST.get(t["model"], 0) * t["requests"] for t in meta["tiers"])
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "escalation_rate": escalated / len(paths),
+        "cost": cost,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image", help="a sample invoice image (its content is ignored by the mock)")
+    parser.add_argument("--documents", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--large-latency", type=float, default=2.5)
+    parser.add_argument("--small-latency", type=float, default=0.8)
+    parser.add_argument("--bad-rate", type=float, default=0.2, help="share of incomplete small-model results")
+    args = parser.parse_args()
+
+    mock = MockOpenAI(
+        latency={"gpt-4o": args.large_latency, "gpt-4o-mini": args.small_latency},
+        bad_rate={"gpt-4o-mini": args.bad_rate},
+    )
+    server = serve(args.port, mock)
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "mock"
+    settings.OPENAI_BASE_URL = f"http://127.0.0.1:{args.port}/v1"
+    settings.OCR_TEXT_LAYER_ENABLED = False
+
+    paths = [args.image] * args.documents
+    try:
+        baseline = _run(paths, ["gpt-4o"])
+        cascade = _run(paths, ["gpt-4o-mini", "gpt-4o"])
+    finally:
+        server.shutdown()
+
+    print(f"{'':12s} {'p50 ms':>9s} {'p95 ms':>9s} {'escalated':>10s} {'cost USD':>10s}")
+    for label, r in (("gpt-4o only", baseline), ("cascade", cascade)):
+        print(f"{label:12s} {r['p50']:9.0f} {r['p95']:9.0f} {r['escalation_rate']:10.1%} {r['cost']:10.4f}")
+    print()
+    print(f"p50 latency  {1 - cascade['p50'] / baseline['p50']:+.1%} reduction")
+    print(f"cost         {1 - cascade['cost'] / baseline['cost']:+.1%} reduction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""ダッシュボード応答時間の測定 -- 請求書の全件集計と集計表（invoice_rollups）読み取りの比較
+
+DATABASE_URL のデータベースへ合成した請求書を段階的に投入し、件数ごとに
+以前の実装と同じ集計クエリ（summary 5本 + compliance 4本）と、集計表を読む現在の
+エンドポイント関数の所要時間を比べる。投入した請求書は終了時に削除する。
+
+    python benchmarks/dashboard_rollup.py --steps 10000 100000 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, text  # noqa: E402
+
+MARKER = "bench-rollup"
+
+
+def legacy_queries(db):
+    from models.department import Department
+    from models.invoice import Invoice
+
+    today = date.today()
+    base = db.query(Invoice).filter(Invoice.is_deleted.is_(False))
+    base.count()
+    db.query(Invoice.status, func.count(Invoice.id)).filter(Invoice.is_deleted.is_(False)).group_by(Invoice.status).all()
+    base.filter(
+        Invoice.due_date.isnot(None),
+        Invoice.due_date <= today + timedelta(days=7),
+        Invoice.due_date >= today,
+        Invoice.status.notin_(["transferred", "cancelled"]),
+    ).count()
+    base.filter(
+        Invoice.due_date.isnot(None), Invoice.due_date < today, Invoice.status.notin_(["transferred", "cancelled"])
+    ).count()
+    (
+        db.query(Department.name, func.sum(Invoice.total_amount), func.count(Invoice.id))
+        .join(Invoice, Invoice.department_id == Department.id)
+        .filter(Invoice.is_deleted.is_(False))
+        .group_by(Department.name)
+        .all()
+    )
+    base.count()
+    for status in ("valid", "invalid", "unchecked"):
+        base.filter(Invoice.invoice_registration_status == status).count()
+
+
+def rollup_endpoints(db, user):
+    from routers.compliance import compliance_dashboard
+    from routers.dashboard import dashboard_summary
+
+    dashboard_summary(db, user)
+    compliance_dashboard(db, user)
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+    from models.department import Department
+    from models.invoice import Invoice
+    from models.user import User
+    from services.invoice_rollup import reconcile
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    user = User(id=0, email="bench@example.com", name="bench", role="admin")
+
+    db = SessionLocal()
+    try:
+        depts = [Department(name=f"{MARKER}-{i}", code=f"{MARKER}-{i}") for i in range(args.departments)]
+        db.add_all(depts)
+        db.commit()
+        dept_ids = "ARRAY[" + ",".join(str(d.id) for d in depts) + "]"
+
+        inserted = 0
+        print(f"{'invoices':>10} {'full scan ms':>14} {'rollup ms':>10}")
+        for target in args.steps:
+            db.execute(text(f"""
+                INSERT INTO invoices (status, department_id, due_date, total_amount, invoice_registration_status,
+                                      is_deleted, source_type, original_filename)
+                SELECT (ARRAY['uploaded','extracted','reviewed','approved','transferred'])[1 + g % 5],
+                       ({dept_ids})[1 + g % {len(depts)}],
+                       CURRENT_DATE + (g % 60) - 30,
+                       1000 + g % 100000,
+                       (ARRAY['valid','invalid','unchecked'])[1 + g % 3],
+                       false, 'upload', :marker
+                FROM generate_series(:start, :stop - 1) AS g
+            """), {"start": inserted, "stop": target, "marker": MARKER})
+            db.commit()
+            inserted = target
+            db.execute(text("ANALYZE invoices"))
+            db.commit()
+            reconcile()
+
+            legacy = timed(lambda: legacy_queries(db), args.repeat)
+            db.rollback()
+            rollup = timed(lambda: rollup_endpoints(db, user), args.repeat)
+            db.rollback()
+            total = db.query(func.count(Invoice.id)).scalar()
+            print(f"{total:>10} {legacy:>14.1f} {rollup:>10.1f}")
+    finally:
+        db.rollback()
+        db.execute(delete(Invoice).where(Invoice.original_filename == MARKER))
+        db.execute(delete(Department).where(Department.name.like(f"{MARKER}-%")))
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
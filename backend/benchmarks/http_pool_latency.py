@@ -0,0 +1,111 @@
+"""共有接続プールによる1呼び出しあたりのレイテンシ改善の測定
+
+既定では自己署名証明書のHTTPSで国税庁APIモック（benchmarks/mock_nta.py）を起動し、
+毎回 ``httpx.get`` する場合と services.http_clients の共有クライアントを使う場合を比較する。
+``--url`` を指定すると実際の接続先に対して同じ比較を行う（TLS・遅延込みの実測）。
+
+    python benchmarks/http_pool_latency.py --calls 200
+    python benchmarks/http_pool_latency.py --url https://web-api.invoice-kohyo.nta.go.jp/ --calls 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from benchmarks.mock_nta import MockNTA, make_registration_number, serve  # noqa: E402
+
+
+def _self_signed_cert(directory: str) -> tuple[str, str]:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_path, key_path
+
+
+def _measure(fn, calls: int) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)
+
+
+def _report(label: str, timings: list[float]):
+    print(f"{label:14s} p50 {statistics.median(timings):7.2f} ms  p95 {timings[int(len(timings) * 0.95)]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--url", help="measure against a real endpoint instead of the local TLS mock")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    from services.http_clients import build_client
+
+    verify: object = True
+    server = None
+    if args.url:
+        url, params = args.url, {}
+    else:
+        tmp = tempfile.mkdtemp()
+        cert, key = _self_signed_cert(tmp)
+        server = serve(args.port, MockNTA(latency=0))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        url = f"https://127.0.0.1:{args.port}/1/num"
+        params = {"number": make_registration_number(1), "type": "21"}
+        verify = ssl.create_default_context(cafile=cert)
+
+    pooled = build_client("nta", verify=verify)
+    try:
+        pooled.get(url, params=params)  # 接続を張っておく
+        fresh = _measure(lambda: httpx.get(url, params=params, verify=verify, timeout=15), args.calls)
+        reused = _measure(lambda: pooled.get(url, params=params), args.calls)
+    finally:
+        pooled.close()
+        if server:
+            server.shutdown()
+
+    _report("httpx.get", fresh)
+    _report("pooled client", reused)
+    print(f"per-call gain  {statistics.median(fresh) - statistics.median(reused):.2f} ms at p50")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""請求書エクスポートのスループットとメモリ使用量の測定
+
+DATABASE_URL のデータベースへ合成の請求書（明細・振込先付き）を投入し、エクスポートの本体
+（services.invoice_export.stream_export）を形式ごとに別プロセスで最後まで読み出して、
+行数・出力サイズ・所要時間・ピークRSSを表示する。比較用の ``buffered`` は同じ列を
+サーバー側カーソルを使わずに全件取得してから CSV を組み立てる方式。
+投入したデータは終了時に削除する。
+
+    python benchmarks/invoice_export.py --invoices 1000000
+    python benchmarks/invoice_export.py --invoices 1000000 --modes csv,csv-gzip,buffered
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+MARKER = "bench-export"
+MODES = ["csv", "csv-gzip", "xlsx", "buffered"]
+
+
+def _peak_rss_mb() -> float:
+    # Linux reports ru_maxrss in KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _buffered(db, conditions) -> list[bytes]:
+    from collections import defaultdict
+
+    from sqlalchemy import select
+
+    from models.invoice_detail import InvoiceDetail
+    from services.invoice_export import DETAIL_COLUMNS, export_query, iter_csv
+
+    invoices = db.execute(export_query(conditions)).all()
+    details = defaultdict(list)
+    for row in db.execute(select(InvoiceDetail.invoice_id, *(c for _, c in DETAIL_COLUMNS))):
+        details[row[0]].append(tuple(row[1:]))
+    blank = (None,) * len(DETAIL_COLUMNS)
+    rows = [tuple(inv) + line for inv in invoices for line in details.get(inv[0]) or [blank]]
+    return list(iter_csv([rows]))
+
+
+def _child(mode: str):
+    from database import SessionLocal
+    from models.invoice import Invoice
+    from services.invoice_export import stream_export
+
+    conditions = [Invoice.is_deleted.is_(False)]
+    db = SessionLocal()
+    try:
+        # 出力行数（明細ごとに1行、明細のない請求書は1行）。時間の計測には含めない
+        rows = db.execute(text("""
+            SELECT count(*) FROM invoices i LEFT JOIN invoice_details d ON d.invoice_id = i.id
+            WHERE i.is_deleted IS false
+        """)).scalar()
+    finally:
+        db.close()
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    first = None
+    size = 0
+    if mode == "buffered":
+        db = SessionLocal()
+        try:
+            chunks = _buffered(db, conditions)
+        finally:
+            db.close()
+    else:
+        fmt = "xlsx" if mode == "xlsx" else "csv"
+        chunks = stream_export(conditions, fmt, mode == "csv-gzip", None, {"benchmark": mode}, MARKER)
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{mode:9s} {rows / elapsed:9,.0f} rows/s  {size / 2**20:8.1f} MB  first byte {first:6.2f} s"
+          f"  total {elapsed:7.1f} s  peak RSS {_peak_rss_mb():7.1f} MB (baseline {baseline:.1f})",
+          flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=1000000)
+    parser.add_argument("--details", type=int, default=2, help="請求書1件あたりの明細数")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return
+
+    from database import SessionLocal, engine
+    from services.invoice_rollup import reconcile
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+            INSERT INTO vendors (name, invoice_registration_number)
+            SELECT '株式会社取引先' || g || ' ' || :marker, 'T' || lpad(g::text, 13, '0')
+            FROM generate_series(1, 500) AS g
+        """), {"marker": MARKER})
+        db.execute(text("""
+            INSERT INTO invoices (
+                invoice_number, vendor_id, status, invoice_date, due_date, subtotal_amount, tax_amount,
+                tax_10_amount, total_amount, description, invoice_registration_number,
+                invoice_registration_status, is_deleted, source_type, original_filename, created_at
+            )
+            SELECT 'INV-' || lpad(g::text, 8, '0'),
+                   (SELECT array_agg(id) FROM vendors WHERE name LIKE '%' || :marker)[1 + g % 500],
+                   'approved', DATE '2024-01-01' + g % 365, DATE '2024-01-31' + g % 365,
+                   10000 + g % 90000, (10000 + g % 90000) / 10, (10000 + g % 90000) / 10,
+                   (10000 + g % 90000) * 11 / 10, (g % 12 + 1) || '月分 保守料金', 'T' || lpad((g % 500)::text, 13, '0'),
+                   'valid', false, 'upload', :marker, now() - make_interval(secs => g)
+            FROM generate_series(1, :n) AS g
+        """), {"marker": MARKER, "n": args.invoices})
+        db.execute(text("""
+            INSERT INTO invoice_details (invoice_id, description, amount, tax, tax_rate)
+            SELECT i.id, '品目' || k || ' サーバー保守', 5000 * k, 500 * k, '10%'
+            FROM invoices i, generate_series(1, :k) AS k
+            WHERE i.original_filename = :marker
+        """), {"marker": MARKER, "k": args.details})
+        db.execute(text("""
+            INSERT INTO bank_accounts (invoice_id, bank_name, branch_name, account_type, account_number, account_holder)
+            SELECT id, 'みずほ銀行', '本店', '普通', lpad((id % 10000000)::text, 7, '0'), 'カ）トリヒキサキ'
+            FROM invoices WHERE original_filename = :marker
+        """), {"marker": MARKER})
+        db.commit()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table in ("invoices", "invoice_details", "bank_accounts"):
+                conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+        print(f"{args.invoices} invoices x {args.details} details", flush=True)
+        for mode in args.modes.split(","):
+            subprocess.run([sys.executable, __file__, "--child", mode], check=True)
+    finally:
+        db.rollback()
+        db.execute(text("DELETE FROM audit_logs WHERE action = 'export' AND ip_address = :m"), {"m": MARKER})
+        for table in ("invoice_details", "bank_accounts"):
+            db.execute(text(f"""
+                DELETE FROM {table} WHERE invoice_id IN (SELECT id FROM invoices WHERE original_filename = :m)
+            """), {"m": MARKER})
+        db.execute(text("DELETE FROM invoices WHERE original_filename = :m"), {"m": MARKER})
+        db.execute(text("DELETE FROM vendors WHERE name LIKE '%' || :m"), {"m": MARKER})
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""請求書一覧のページ送り測定 -- OFFSET とキーセット（カーソル）、正確な件数と推定件数の比較
+
+DATABASE_URL のデータベースへ合成した請求書を投入し、GET /api/invoices を
+1ページ目・深いページ（OFFSET）・同じ位置のカーソル指定で呼んで所要時間を比べる。
+投入した請求書は終了時に削除する。
+
+    python benchmarks/invoice_list_pagination.py --invoices 1000000 --page 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, text  # noqa: E402
+
+MARKER = "bench-pagination"
+
+
+def timed(client, params: dict, repeat: int) -> tuple[float, dict]:
+    samples = []
+    body = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        resp = client.get("/api/invoices", params=params)
+        samples.append((time.perf_counter() - started) * 1000)
+        resp.raise_for_status()
+        body = resp.json()
+    return statistics.median(samples), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=1000000)
+    parser.add_argument("--page", type=int, default=5000)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import SessionLocal
+    from models.invoice import Invoice
+    from models.user import User
+    from services.auth_service import get_current_user
+    from services.invoice_rollup import reconcile
+    from services.pagination import encode_cursor
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    app_main.app.dependency_overrides[get_current_user] = lambda: User(id=0, email="b@example.com", name="b", role="admin")
+    client = TestClient(app_main.app)
+
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+            INSERT INTO invoices (status, total_amount, is_deleted, source_type, original_filename, created_at)
+            SELECT 'uploaded', 1000 + g % 100000, false, 'upload', :marker,
+                   now() - make_interval(secs => g)
+            FROM generate_series(1, :n) AS g
+        """), {"marker": MARKER, "n": args.invoices})
+        db.commit()
+        db.execute(text("ANALYZE invoices"))
+        db.commit()
+
+        offset = (args.page - 1) * args.per_page
+        created_at, last_id = db.execute(text("""
+            SELECT created_at, id FROM invoices WHERE NOT is_deleted
+            ORDER BY created_at DESC, id DESC OFFSET :offset - 1 LIMIT 1
+        """), {"offset": offset}).one()
+        db.rollback()
+        cursor = encode_cursor(created_at, last_id)
+
+        per_page = {"per_page": args.per_page}
+        cases = [
+            ("page 1, exact count", {**per_page, "page": 1}),
+            ("page 1, estimated count", {**per_page, "page": 1, "count": "estimated"}),
+            (f"page {args.page} (OFFSET), exact", {**per_page, "page": args.page}),
+            (f"page {args.page} (OFFSET), no count", {**per_page, "page": args.page, "count": "none"}),
+            (f"page {args.page} (cursor), no count", {**per_page, "cursor": cursor, "count": "none"}),
+            (f"page {args.page} (cursor), estimated", {**per_page, "cursor": cursor, "count": "estimated"}),
+        ]
+        results = {}
+        for label, params in cases:
+            ms, body = timed(client, params, args.repeat)
+            results[label] = body
+            print(f"{label:<40} {ms:>9.1f} ms  total={body['total']} estimate={body['total_is_estimate']}")
+
+        offset_ids = [i["id"] for i in results[f"page {args.page} (OFFSET), exact"]["items"]]
+        cursor_ids = [i["id"] for i in results[f"page {args.page} (cursor), no count"]["items"]]
+        print("same rows via OFFSET and cursor:", offset_ids == cursor_ids)
+    finally:
+        db.rollback()
+        db.execute(delete(Invoice).where(Invoice.original_filename == MARKER))
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
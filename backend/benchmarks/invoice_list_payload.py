@@ -0,0 +1,117 @@
+"""請求書一覧のレスポンスサイズと所要時間の測定 -- 一覧用の列だけ返す場合と全項目を返す場合
+
+DATABASE_URL のデータベースへ、実際の抽出結果に近い大きさの ai_raw_result（明細・
+読み取りテキスト付き）を持つ請求書を投入し、GET /api/invoices?per_page=100 を
+``fields`` なし（一覧用の列のみ）と ``fields=`` に全項目を指定した場合（以前の一覧と同じ内容）で比べる。
+投入したデータは終了時に削除する。
+
+    python benchmarks/invoice_list_payload.py --invoices 1000 --items 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete  # noqa: E402
+
+MARKER = "bench-payload"
+
+
+def fake_extraction(n_items: int, rng: random.Random) -> dict:
+    items = [
+        {
+            "description": f"保守サービス 第{i}期 作業費（オンサイト対応・部品交換含む）",
+            "quantity": rng.randint(1, 20),
+            "unit_price": rng.randint(100, 50000),
+            "amount": rng.randint(1000, 500000),
+            "tax_rate": rng.choice(["8%", "10%"]),
+        }
+        for i in range(n_items)
+    ]
+    return {
+        "vendor_name": "株式会社サンプル商事",
+        "invoice_registration_number": "T1234567890123",
+        "invoice_date": "2024-05-01",
+        "due_date": "2024-05-31",
+        "total_amount": sum(i["amount"] for i in items),
+        "items": items,
+        "raw_text": "\n".join(f"{i['description']} {i['quantity']} x {i['unit_price']}" for i in items) * 2,
+    }
+
+
+def measure(client, params: dict, repeat: int) -> tuple[float, int]:
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        resp = client.get("/api/invoices", params=params)
+        samples.append((time.perf_counter() - started) * 1000)
+        resp.raise_for_status()
+        size = len(resp.content)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=30, help="line items per extraction result")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import SessionLocal
+    from models import Invoice, InvoiceDetail, User
+    from schemas.invoice import INVOICE_LIST_EXTRA_FIELDS
+    from services.auth_service import get_current_user
+    from services.invoice_rollup import reconcile
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    app_main.app.dependency_overrides[get_current_user] = lambda: User(id=0, email="b@example.com", name="b", role="admin")
+    client = TestClient(app_main.app)
+    rng = random.Random(0)
+
+    db = SessionLocal()
+    try:
+        for start in range(0, args.invoices, 500):
+            batch = []
+            for _ in range(min(500, args.invoices - start)):
+                raw = fake_extraction(args.items, rng)
+                inv = Invoice(
+                    status="compliance_checked", total_amount=raw["total_amount"], original_filename=MARKER,
+                    source_type="upload", ai_raw_result=raw,
+                    compliance_check_result={"passed": True, "missing_items": [], "warnings": [], "nta": {"raw": raw["items"][:3]}},
+                )
+                inv.details = [InvoiceDetail(description=i["description"], amount=i["amount"], tax_rate=i["tax_rate"]) for i in raw["items"]]
+                batch.append(inv)
+            db.add_all(batch)
+            db.commit()
+
+        cases = [
+            ("list columns only", {"per_page": 100, "count": "none"}),
+            ("all fields (previous list)", {"per_page": 100, "count": "none", "fields": ",".join(INVOICE_LIST_EXTRA_FIELDS)}),
+        ]
+        for label, params in cases:
+            ms, size = measure(client, params, args.repeat)
+            print(f"{label:<28} {size / 1024:>9.1f} KiB {ms:>8.1f} ms")
+    finally:
+        db.rollback()
+        ids = [i for (i,) in db.query(Invoice.id).filter(Invoice.original_filename == MARKER)]
+        db.execute(delete(InvoiceDetail).where(InvoiceDetail.invoice_id.in_(ids)))
+        db.execute(delete(Invoice).where(Invoice.id.in_(ids)))
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""請求書全文検索の応答時間測定
+
+DATABASE_URL のデータベースへ、取引先名・摘要・明細に日本語を含む合成の請求書を投入して
+検索用文書を作り、GET /api/invoices/search の所要時間を検索語ごとに測る。
+投入したデータは終了時に削除する。
+
+    python benchmarks/invoice_search.py --invoices 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+MARKER = "bench-search"
+
+VENDOR_WORDS = ["サンプル", "東都", "北斗", "みなと", "青葉", "富士見", "さくら", "若葉", "桜井", "大和", "光", "緑川"]
+VENDOR_KINDS = ["商事", "電機", "物産", "運輸", "建設", "システム", "印刷", "製作所"]
+ITEMS = [
+    "サーバー保守", "コピー用紙", "トナーカートリッジ", "出張旅費", "交通費", "会議室利用料", "清掃作業",
+    "ソフトウェアライセンス", "回線使用料", "部品交換", "運送料", "倉庫保管料", "広告掲載料", "翻訳料",
+    "システム開発", "警備業務", "廃棄物処理", "電気料金", "ガス料金", "水道料金",
+]
+QUERIES = ["サンプル商事", "北斗電機", "トナー", "会議室", "廃棄物処理", "inv-2024-00012345", "株", "保守 交換", "存在しない言葉"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import SessionLocal, engine
+    from models.user import User
+    from services import search_index
+    from services.auth_service import get_current_user
+    from services.invoice_rollup import reconcile
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    app_main.app.dependency_overrides[get_current_user] = lambda: User(id=0, email="b@example.com", name="b", role="admin")
+    client = TestClient(app_main.app)
+
+    vendor_names = [f"株式会社{w}{k}" for w in VENDOR_WORDS for k in VENDOR_KINDS]
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+            INSERT INTO vendors (name, invoice_registration_number)
+            SELECT unnest(CAST(:names AS text[])) || ' ' || :marker, NULL
+        """), {"names": vendor_names, "marker": MARKER})
+        db.execute(text("""
+            INSERT INTO invoices (invoice_number, vendor_id, description, status, is_deleted, source_type, original_filename)
+            SELECT 'INV-2024-' || lpad(g::text, 8, '0'),
+                   (SELECT array_agg(id) FROM vendors WHERE name LIKE '%' || :marker)[1 + g % :n_vendors],
+                   (g % 12 + 1) || '月分 ' || (CAST(:items AS text[]))[1 + g % 20],
+                   'uploaded', false, 'upload', :marker
+            FROM generate_series(1, :n) AS g
+        """), {"marker": MARKER, "n": args.invoices, "n_vendors": len(vendor_names), "items": ITEMS})
+        db.execute(text("""
+            INSERT INTO invoice_details (invoice_id, description, amount)
+            SELECT i.id, (CAST(:items AS text[]))[1 + (i.id * 7 + k) % 20], 1000
+            FROM invoices i, generate_series(1, 3) AS k
+            WHERE i.original_filename = :marker
+        """), {"marker": MARKER, "items": ITEMS})
+        db.commit()
+
+        started = time.perf_counter()
+        indexed = search_index.reindex_all()
+        print(f"indexed {indexed} invoices in {time.perf_counter() - started:.0f}s")
+        # 一括投入した分を GIN の保留リストから本体へ移す（運用中は autovacuum が行う）
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE invoice_search_documents"))
+
+        for q in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                resp = client.get("/api/invoices/search", params={"q": q, "limit": 20})
+                samples.append((time.perf_counter() - t0) * 1000)
+                resp.raise_for_status()
+            body = resp.json()
+            print(f"{q:<24} {statistics.median(samples):>8.1f} ms  max {max(samples):>8.1f} ms"
+                  f"  hits {len(body['items'])}  truncated={body['truncated']}")
+    finally:
+        db.rollback()
+        db.execute(text("""
+            DELETE FROM invoice_details WHERE invoice_id IN (SELECT id FROM invoices WHERE original_filename = :m)
+        """), {"m": MARKER})
+        db.execute(text("DELETE FROM invoices WHERE original_filename = :m"), {"m": MARKER})
+        db.execute(text("DELETE FROM vendors WHERE name LIKE '%' || :m"), {"m": MARKER})
+        db.commit()
+        db.close()
+        reconcile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""国税庁 適格請求書発行事業者公表APIのローカル代替（ベンチマーク用）
+
+``/1/num?number=T...,T...`` に対し、カンマ区切りの各番号を公表済みとして返す。
+``--revoked-rate`` の割合の番号は失効日付きで、``--unknown-rate`` の割合は未登録として扱う
+（番号から決まるので同じ番号には毎回同じ結果を返す）。
+``NTA_API_BASE_URL=http://127.0.0.1:8766/1`` を設定して呼び出す。
+
+    python benchmarks/mock_nta.py --port 8766 --latency 0.3 --revoked-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_registration_number(base: int) -> str:
+    """Build a T-number with a valid check digit from a 12-digit base."""
+    digits = f"{base % 10**12:012d}"
+    total = sum(int(d) * (1 if n % 2 else 2) for n, d in enumerate(reversed(digits), start=1))
+    return f"T{9 - total % 9}{digits}"
+
+
+class MockNTA:
+    def __init__(self, latency: float = 0.3, revoked_rate: float = 0.0, unknown_rate: float = 0.0):
+        self.latency = latency
+        self.revoked_rate = revoked_rate
+        self.unknown_rate = unknown_rate
+        self.requests = 0
+        self.numbers = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, numbers: list[str]) -> dict:
+        with self._lock:
+            self.requests += 1
+            self.numbers += len(numbers)
+        time.sleep(self.latency)
+        announcements = []
+        for n in numbers:
+            bucket = zlib.crc32(n.encode()) % 10000 / 10000
+            if bucket < self.unknown_rate:
+                continue
+            revoked = bucket < self.unknown_rate + self.revoked_rate
+            announcements.append({
+                "registratedNumber": n,
+                "name": f"株式会社テスト{n[-4:]}",
+                "address": "東京都千代田区霞が関３丁目１－１",
+                "registrationDate": "2023-10-01",
+                "updateDate": "2024-04-01",
+                "disposalDate": "2024-03-31" if revoked else "",
+                "expireDate": "",
+                "process": "99" if revoked else "01",
+                "latest": "1",
+            })
+        return {"lastUpdateDate": "2024-04-01", "count": str(len(announcements)), "announcement": announcements}
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # ヘッダーと本文を別々に書くため、Nagleによる遅延でレイテンシ測定が歪まないようにする
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                numbers = [n for n in ",".join(query.get("number", [])).split(",") if n]
+                if not url.path.endswith("/num") or not numbers or len(numbers) > 10:
+                    self._send(400, {"errors": [{"message": "invalid request"}]})
+                    return
+                self._send(200, mock.lookup(numbers))
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def serve(port: int, mock: MockNTA) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), mock.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--revoked-rate", type=float, default=0.0)
+    parser.add_argument("--unknown-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), MockNTA(args.latency, args.revoked_rate, args.unknown_rate).handler()
+    )
+    print(f"mock NTA listening on http://127.0.0.1:{args.port}/1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""OpenAI互換エンドポイントのローカル代替（ベンチマーク用）
+
+``/v1/chat/completions`` だけを実装し、モデルごとの応答遅延と、小さいモデルが
+不完全な結果（登録番号の欠落・金額の不整合）を返す割合を指定できる。
+``--rpm-quota`` を超えたリクエストや ``--throttle-rate`` の割合で Retry-After 付きの429を、
+``--error-rate`` の割合で500を返す。
+``OPENAI_BASE_URL=http://127.0.0.1:8765/v1`` を設定してアプリやベンチマークから呼び出す。
+
+    python benchmarks/mock_openai.py --port 8765 --latency gpt-4o=2.5 --latency gpt-4o-mini=0.8 --bad-rate gpt-4o-mini=0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import math
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GOOD_RESULT = {
+    "vendor_name": "株式会社サンプル商事",
+    "invoice_number": "INV-2024-0001",
+    "invoice_date": "2024-04-30",
+    "due_date": "2024-05-31",
+    "total_amount": 110000,
+    "subtotal_amount": 100000,
+    "tax_amount": 10000,
+    "tax_8_amount": None,
+    "tax_10_amount": 10000,
+    "invoice_registration_number": "T7000012050002",
+    "recipient_name": "株式会社テスト",
+    "bank_account": {
+        "bank_name": "みずほ銀行",
+        "branch_name": "東京営業部",
+        "account_type": "普通",
+        "account_number": "1234567",
+        "account_holder": "カ）サンプルシヨウジ",
+    },
+    "items": [{"description": "システム保守費用", "amount": 100000, "tax": 10000, "tax_rate": "10%"}],
+}
+
+
+def _bad_result() -> dict:
+    result = json.loads(json.dumps(GOOD_RESULT))
+    if random.random() < 0.5:
+        result["invoice_registration_number"] = None
+    else:
+        result["subtotal_amount"] = 90000
+    return result
+
+
+class MockOpenAI:
+    def __init__(
+        self,
+        latency: dict[str, float],
+        bad_rate: dict[str, float],
+        default_latency: float = 0.5,
+        rpm_quota: int = 0,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        window_seconds: float = 60.0,
+    ):
+        self.latency = latency
+        self.bad_rate = bad_rate
+        self.default_latency = default_latency
+        self.rpm_quota = rpm_quota
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self.calls: dict[str, int] = {}
+        self.rejected = {"429": 0, "500": 0}
+        self._window: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+
+    def admit(self) -> tuple[int, float]:
+        """Return (status, retry_after) for an incoming request: 200, 429 or 500."""
+        now = time.monotonic()
+        with self._lock:
+            while self._window and self._window[0] <= now - self.window_seconds:
+                self._window.popleft()
+            if self.rpm_quota and len(self._window) >= self.rpm_quota * self.window_seconds / 60:
+                self.rejected["429"] += 1
+                return 429, self._window[0] + self.window_seconds - now
+            if random.random() < self.throttle_rate:
+                self.rejected["429"] += 1
+                return 429, 1.0
+            if random.random() < self.error_rate:
+                self.rejected["500"] += 1
+                return 500, 0.0
+            self._window.append(now)
+        return 200, 0.0
+
+    def complete(self, body: dict) -> dict:
+        model = body.get("model", "")
+        with self._lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+        time.sleep(self.latency.get(model, self.default_latency))
+        bad = random.random() < self.bad_rate.get(model, 0.0)
+        content = json.dumps(_bad_result() if bad else GOOD_RESULT, ensure_ascii=False)
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"```json\n{content}\n```"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1500, "completion_tokens": 400, "total_tokens": 1900},
+        }
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                status, retry_after = mock.admit()
+                if status == 429:
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                               {"Retry-After": str(max(1, math.ceil(retry_after)))})
+                    return
+                if status == 500:
+                    self._send(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+                    return
+                self._send(200, mock.complete(body))
+
+            def _send(self, status: int, payload: dict, headers: dict | None = None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def serve(port: int, mock: MockOpenAI) -> ThreadingHTTPServer:
+    """Start the mock server in a daemon thread and return it (``server.shutdown()`` to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), mock.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_pairs(values: list[str]) -> dict[str, float]:
+    out = {}
+    for value in values or []:
+        model, _, number = value.partition("=")
+        out[model] = float(number)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", action="append", help="model=seconds")
+    parser.add_argument("--bad-rate", action="append", help="model=ratio of incomplete results")
+    parser.add_argument("--rpm-quota", type=int, default=0, help="answer 429 above this many requests/minute")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of random 429 responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of random 500 responses")
+    args = parser.parse_args()
+
+    mock = MockOpenAI(
+        parse_pairs(args.latency),
+        parse_pairs(args.bad_rate),
+        rpm_quota=args.rpm_quota,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), mock.handler())
+    print(f"mock OpenAI listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""公表情報ローカルミラーの取込・照会速度の測定
+
+合成した全件CSV（既定300万行）と差分CSVを生成して DATABASE_URL のデータベースへ取り込み、
+取込時間と登録番号1件あたりの照会時間を計測する。nta_registrants の内容は置き換わるので
+本番データベースでは実行しないこと。
+
+    python benchmarks/nta_registry_import.py --rows 3000000 --workdir /tmp/nta
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_nta import make_registration_number  # noqa: E402
+
+BASE = 100000000000
+
+
+def _row(seq: int, number: str, process: str = "01", disposal: str = "") -> list[str]:
+    return [
+        str(seq), number, process, "0", "2", "1", "1",
+        "2023-10-01", "2024-04-01", disposal, "",
+        "東京都千代田区霞が関３丁目１－１", "13", "101", "", "", "",
+        "テストショウジ", f"株式会社テスト商事{number[-6:]}", "", "", "", "", "",
+    ]
+
+
+def write_snapshot(path: str, rows: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        for i in range(rows):
+            w.writerow(_row(i + 1, make_registration_number(BASE + i)))
+
+
+def write_diff(path: str, rows: int, total: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        for seq in range(1, rows + 1):
+            kind = seq % 10
+            if kind == 0:  # 新規登録
+                w.writerow(_row(seq, make_registration_number(BASE + total + seq)))
+            elif kind == 1:  # 削除
+                w.writerow(_row(seq, make_registration_number(BASE + random.randrange(total)), "99"))
+            elif kind == 2:  # 取消
+                w.writerow(_row(seq, make_registration_number(BASE + random.randrange(total)), "04", "2024-04-01"))
+            else:  # 変更
+                w.writerow(_row(seq, make_registration_number(BASE + random.randrange(total)), "02"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--diff-rows", type=int, default=20_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--workdir", default="/tmp/nta-bench")
+    args = parser.parse_args()
+
+    from config import settings
+    from services import nta_registry
+    from services.schema import upgrade_database
+    from services.nta_api_service import verify_registration_number
+
+    os.makedirs(args.workdir, exist_ok=True)
+    snapshot = os.path.join(args.workdir, "snapshot.csv")
+    diff = os.path.join(args.workdir, "diff.csv")
+
+    started = time.perf_counter()
+    write_snapshot(snapshot, args.rows)
+    write_diff(diff, args.diff_rows, args.rows)
+    print(f"generated {args.rows:,} rows ({os.path.getsize(snapshot) / 1e6:.0f} MB) in {time.perf_counter() - started:.1f} s")
+
+    upgrade_database()
+    print("snapshot", nta_registry.import_snapshot(snapshot))
+    print("diff    ", nta_registry.apply_diff(diff))
+
+    settings.NTA_LOOKUP_MODE = "local"
+    timings = []
+    for _ in range(args.lookups):
+        number = make_registration_number(BASE + random.randrange(args.rows))
+        t = time.perf_counter()
+        verify_registration_number(number)
+        timings.append((time.perf_counter() - t) * 1000)
+    timings.sort()
+    print(f"lookup   p50 {statistics.median(timings):.2f} ms  p99 {timings[int(len(timings) * 0.99)]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
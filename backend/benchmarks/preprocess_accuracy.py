@@ -0,0 +1,102 @@
+"""画像前処理の効果測定 -- 送信バイト数の削減と抽出精度への影響
+
+フィクスチャディレクトリには画像 (``*.jpg`` / ``*.jpeg`` / ``*.png``) と、
+同名の正解JSON (``請求書A.jpg`` -> ``請求書A.json``) を置く。正解JSONはAI抽出結果と同じキーで、
+比較したいフィールドだけを書けばよい。
+
+    # バイト数のみ（API呼び出しなし）
+    python benchmarks/preprocess_accuracy.py fixtures/ --bytes-only
+    # 前処理なし/ありでそれぞれ抽出し、正解との一致率を比較
+    python benchmarks/preprocess_accuracy.py fixtures/
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from services.image_preprocess import preprocess_image  # noqa: E402
+
+COMPARED_FIELDS = [
+    "vendor_name", "invoice_number", "invoice_date", "due_date",
+    "total_amount", "subtotal_amount", "tax_amount", "tax_8_amount", "tax_10_amount",
+    "invoice_registration_number", "recipient_name",
+]
+
+
+def _normalize(value) -> str:
+    if value is None:
+        return ""
+    return str(value).replace(",", "").replace("¥", "").replace("円", "").replace(" ", "").strip()
+
+
+def _score(result: dict, expected: dict) -> tuple[int, int]:
+    fields = [f for f in COMPARED_FIELDS if f in expected]
+    hits = sum(1 for f in fields if _normalize(result.get(f)) == _normalize(expected[f]))
+    return hits, len(fields)
+
+
+def _fixtures(directory: str) -> list[tuple[str, dict]]:
+    out = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        for path in sorted(glob.glob(os.path.join(directory, pattern))):
+            expected_path = os.path.splitext(path)[0] + ".json"
+            expected = {}
+            if os.path.exists(expected_path):
+                with open(expected_path, encoding="utf-8") as f:
+                    expected = json.load(f)
+            out.append((path, expected))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures")
+    parser.add_argument("--bytes-only", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = _fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"no images found in {args.fixtures}")
+
+    total_before = total_after = 0
+    for path, _ in fixtures:
+        with open(path, "rb") as f:
+            data = f.read()
+        started = time.perf_counter()
+        processed = preprocess_image(data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        after = processed.processed_bytes if processed else len(data)
+        total_before += len(data)
+        total_after += min(after, len(data))
+        print(f"{os.path.basename(path):40s} {len(data):>10,} -> {after:>10,} bytes  ({elapsed_ms:6.1f} ms)")
+    print(f"{'TOTAL':40s} {total_before:>10,} -> {total_after:>10,} bytes  ({total_after / total_before:.1%})")
+
+    if args.bytes_only:
+        return
+
+    from services.ocr_service import extract_invoice_data
+
+    for enabled in (False, True):
+        settings.OCR_PREPROCESS_ENABLED = enabled
+        hits = fields = 0
+        started = time.perf_counter()
+        for path, expected in fixtures:
+            h, n = _score(extract_invoice_data(path), expected)
+            hits += h
+            fields += n
+        elapsed = time.perf_counter() - started
+        label = "preprocessed" if enabled else "raw"
+        accuracy = hits / fields if fields else 0
+        print(f"{label:13s} field accuracy {hits}/{fields} ({accuracy:.1%})  total {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""OpenAI送信スケジューラーのスループット測定
+
+クォータ（リクエスト数/分）を超えると429を返すモックサーバーに対して、
+レート制御なし（再送なし）とスケジューラー経由で同じ件数を並行抽出し、
+成功件数・429の発生数・実効リクエスト数/分を比較する。
+測定時間を短くするため、モックのクォータ判定窓を ``--window`` 秒に縮めている。
+
+    python benchmarks/rate_limit_throughput.py invoice.jpg --documents 60 --rpm 120 --window 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from benchmarks.mock_openai import MockOpenAI, serve  # noqa: E402
+
+
+def _run(path: str, documents: int, mock: MockOpenAI, scheduler) -> dict:
+    from services import ocr_service
+
+    ocr_service.openai_scheduler = scheduler
+    mock.rejected = {"429": 0, "500": 0}
+    started = time.perf_counter()
+    results = asyncio.run(ocr_service.extract_many_async([path] * documents, concurrency=documents))
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if not isinstance(r, Exception))
+    return {
+        "succeeded": succeeded,
+        "failed": documents - succeeded,
+        "elapsed": elapsed,
+        "rpm": succeeded / elapsed * 60,
+        "429": mock.rejected["429"],
+        "500": mock.rejected["500"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image", help="a sample invoice image (its content is ignored by the mock)")
+    parser.add_argument("--documents", type=int, default=60)
+    parser.add_argument("--rpm", type=int, default=120, help="quota enforced by the mock")
+    parser.add_argument("--window", type=float, default=10.0, help="quota window of the mock in seconds")
+    parser.add_argument("--burst", type=float, default=0.5, help="scheduler burst in seconds of quota")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    from services.rate_limiter import OutboundScheduler
+
+    mock = MockOpenAI(
+        latency={}, bad_rate={}, default_latency=0.2,
+        rpm_quota=args.rpm, window_seconds=args.window, error_rate=args.error_rate,
+    )
+    server = serve(args.port, mock)
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "mock"
+    settings.OPENAI_BASE_URL = f"http://127.0.0.1:{args.port}/v1"
+    settings.OCR_TEXT_LAYER_ENABLED = False
+    settings.OCR_MODEL_CASCADE = ["gpt-4o"]
+
+    # 窓を縮めた分だけスケジューラーのバーストも縮める
+    scheduled = OutboundScheduler(
+        "openai", requests_per_minute=args.rpm, burst_seconds=args.burst, max_retries=8, backoff_base=0.5
+    )
+
+    try:
+        unmanaged = _run(args.image, args.documents, mock, OutboundScheduler("openai", max_retries=0))
+        time.sleep(args.window)
+        managed = _run(args.image, args.documents, mock, scheduled)
+    finally:
+        server.shutdown()
+
+    print(f"quota {args.rpm} rpm (window {args.window:.0f}s), {args.documents} documents")
+    print(f"{'':12s} {'ok':>5s} {'failed':>7s} {'429s':>6s} {'elapsed':>9s} {'rpm':>7s}")
+    for label, r in (("unmanaged", unmanaged), ("scheduled", managed)):
+        print(f"{label:12s} {r['succeeded']:5d} {r['failed']:7d} {r['429']:6d} {r['elapsed']:8.1f}s {r['rpm']:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
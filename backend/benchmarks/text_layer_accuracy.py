@@ -0,0 +1,82 @@
+"""テキストレイヤー抽出の精度・速度測定
+
+フィクスチャディレクトリにPDFと同名の正解JSON (``請求書A.pdf`` -> ``請求書A.json``) を置く。
+Visionモデルは呼ばず、テキストレイヤーのルール抽出だけを評価する。
+
+    python benchmarks/text_layer_accuracy.py fixtures/
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_service import extract_text_layer  # noqa: E402
+from services.text_layer_extractor import fast_path_problems, parse_invoice_text, MIN_TEXT_CHARS  # noqa: E402
+
+COMPARED_FIELDS = [
+    "vendor_name", "invoice_number", "invoice_date", "due_date",
+    "total_amount", "subtotal_amount", "tax_amount", "tax_8_amount", "tax_10_amount",
+    "invoice_registration_number", "recipient_name",
+]
+
+
+def _normalize(value) -> str:
+    if value is None:
+        return ""
+    return str(value).replace(",", "").replace("¥", "").replace("円", "").replace(" ", "").strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.pdf")))
+    if not paths:
+        sys.exit(f"no PDFs found in {args.fixtures}")
+
+    timings = []
+    accepted = hits = fields = 0
+    for path in paths:
+        expected_path = os.path.splitext(path)[0] + ".json"
+        expected = {}
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                expected = json.load(f)
+
+        started = time.perf_counter()
+        pages = extract_text_layer(path)
+        has_text = bool(pages) and len(pages[0].strip()) >= MIN_TEXT_CHARS
+        result = parse_invoice_text("\n".join(pages)) if has_text else {}
+        problems = fast_path_problems(result) if has_text else ["テキストレイヤーなし"]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timings.append(elapsed_ms)
+
+        compared = [f for f in COMPARED_FIELDS if f in expected]
+        matched = [f for f in compared if _normalize(result.get(f)) == _normalize(expected[f])]
+        status = "fast-path" if not problems else "fallback: " + ", ".join(problems)
+        if not problems:
+            accepted += 1
+            hits += len(matched)
+            fields += len(compared)
+        mismatched = sorted(set(compared) - set(matched))
+        print(f"{os.path.basename(path):40s} {elapsed_ms:7.1f} ms  {len(matched)}/{len(compared)}  {status}"
+              + (f"  mismatched={mismatched}" if mismatched else ""))
+
+    print()
+    print(f"fast-path rate   {accepted}/{len(paths)} ({accepted / len(paths):.1%})")
+    if fields:
+        print(f"field accuracy   {hits}/{fields} ({hits / fields:.1%}) on fast-path documents")
+    print(f"latency          p50 {statistics.median(timings):.1f} ms  max {max(timings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
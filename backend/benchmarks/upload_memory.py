@@ -0,0 +1,100 @@
+"""アップロード保存のメモリ使用量ベンチマーク
+
+一括アップロード相当のファイル群を、従来の全読み込み方式 (``await f.read()`` + ``save_upload``) と
+ストリーミング方式 (``save_upload_stream``) で保存し、それぞれ別プロセスでピークRSSを測定する。
+
+    python benchmarks/upload_memory.py --total-mb 500 --files 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _make_sources(directory: str, total_mb: int, files: int) -> list[str]:
+    per_file = total_mb * 1024 * 1024 // files
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"scan_{i:03d}.pdf")
+        with open(path, "wb") as f:
+            written = 0
+            while written < per_file:
+                chunk = os.urandom(min(4 * 1024 * 1024, per_file - written))
+                f.write(chunk)
+                written += len(chunk)
+        paths.append(path)
+    return paths
+
+
+def _peak_rss_mb() -> float:
+    # Linux reports ru_maxrss in KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _run(mode: str, sources: list[str]):
+    from fastapi import UploadFile
+    from services.file_service import save_upload, save_upload_stream
+
+    uploads = [UploadFile(file=open(p, "rb"), filename=os.path.basename(p)) for p in sources]
+    try:
+        if mode == "buffer":
+            for f in uploads:
+                content = await f.read()
+                save_upload(content, f.filename)
+        else:
+            for f in uploads:
+                await save_upload_stream(f, max_bytes=2**62)
+    finally:
+        for f in uploads:
+            await f.close()
+
+
+def _child(mode: str, sources: list[str]):
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    asyncio.run(_run(mode, sources))
+    elapsed = time.perf_counter() - started
+    print(f"{mode:7s} baseline={baseline:7.1f} MB  peak={_peak_rss_mb():7.1f} MB  elapsed={elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total-mb", type=int, default=500)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--mode", choices=["buffer", "stream", "both"], default="both")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("sources", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.mode, args.sources)
+        return
+
+    with tempfile.TemporaryDirectory() as src_dir, tempfile.TemporaryDirectory() as upload_dir:
+        sources = _make_sources(src_dir, args.total_mb, args.files)
+        env = dict(
+            os.environ,
+            UPLOAD_DIR=upload_dir,
+            UPLOAD_MAX_FILE_BYTES=str(2**62),
+        )
+        print(f"batch: {args.files} files, {args.total_mb} MB total")
+        modes = ["buffer", "stream"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            subprocess.run(
+                [sys.executable, __file__, "--child", "--mode", mode, *sources],
+                env=env,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
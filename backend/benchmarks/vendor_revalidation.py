@@ -0,0 +1,74 @@
+"""取引先一括再確認の所要時間測定
+
+ローカルの国税庁APIモック（benchmarks/mock_nta.py）を起動し、合成した取引先を
+DATABASE_URL のデータベースへ投入してから revalidate_vendors を実行する。
+投入した取引先は終了時に削除する。
+
+    python benchmarks/vendor_revalidation.py --vendors 10000 --latency 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert  # noqa: E402
+
+from config import settings  # noqa: E402
+from benchmarks.mock_nta import MockNTA, make_registration_number, serve  # noqa: E402
+
+NAME_PREFIX = "bench-revalidation-"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vendors", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.3, help="mock response time per request (s)")
+    parser.add_argument("--revoked-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=settings.NTA_CONCURRENCY)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    mock = MockNTA(args.latency, args.revoked_rate)
+    server = serve(args.port, mock)
+    settings.NTA_API_BASE_URL = f"http://127.0.0.1:{args.port}/1"
+    settings.NTA_CONCURRENCY = args.concurrency
+
+    from database import SessionLocal
+    from models.vendor import Vendor
+    from services.nta_api_service import nta_scheduler
+    from services.vendor_revalidation import revalidate_vendors
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    nta_scheduler.requests.per_minute = 0  # モック相手なのでクライアント側のレート制限は外す
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(Vendor), [
+            {"name": f"{NAME_PREFIX}{i}", "invoice_registration_number": make_registration_number(900000000000 + i)}
+            for i in range(args.vendors)
+        ])
+        db.commit()
+
+        started = time.perf_counter()
+        summary = revalidate_vendors()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.execute(delete(Vendor).where(Vendor.name.like(f"{NAME_PREFIX}%")))
+        db.commit()
+        db.close()
+        server.shutdown()
+
+    one_by_one = summary["numbers"] * args.latency
+    print(summary)
+    print(f"requests sent     {mock.requests} for {mock.numbers} numbers")
+    print(f"elapsed           {elapsed:.1f} s (one request per number, sequential: ~{one_by_one:.0f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,15 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480
 
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = ""
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 300000
+    OPENAI_RATE_BURST_SECONDS: float = 10.0
+    OPENAI_MAX_RETRIES: int = 6
+    OPENAI_BACKOFF_BASE_SECONDS: float = 1.0
+    OPENAI_BACKOFF_MAX_SECONDS: float = 60.0
+    OPENAI_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    OPENAI_CIRCUIT_RESET_SECONDS: float = 30.0
     GEMINI_API_KEY: str = ""
 
     GMAIL_CREDENTIALS_FILE: str = "credentials.json"
@@ -19,11 +28,67 @@ class Settings(BaseSettings):
     MF_REDIRECT_URI: str = "http://localhost:8000/api/transfers/mf/callback"
 
     UPLOAD_DIR: str = os.path.join(os.path.dirname(__file__), "uploads")
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_FILE_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_MAX_BATCH_BYTES: int = 1024 * 1024 * 1024
+
+    HTTP_HTTP2_ENABLED: bool = False
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    OPENAI_HTTP_TIMEOUT_SECONDS: float = 120.0
+    NTA_HTTP_TIMEOUT_SECONDS: float = 15.0
+    MF_HTTP_TIMEOUT_SECONDS: float = 30.0
 
     NTA_API_BASE_URL: str = "https://web-api.invoice-kohyo.nta.go.jp/1"
+    NTA_APPLICATION_ID: str = ""
+    NTA_LOOKUP_MODE: str = "api"
+    NTA_LOCAL_MAX_AGE_HOURS: int = 72
+    NTA_BATCH_SIZE: int = 10
+    NTA_CONCURRENCY: int = 4
+    NTA_RPM_LIMIT: int = 600
+    NTA_REVALIDATION_INTERVAL_HOURS: int = 24
+    NTA_CACHE_ENABLED: bool = True
+    NTA_CACHE_MEMORY_SIZE: int = 4096
+    NTA_CACHE_POSITIVE_TTL_HOURS: int = 24 * 7
+    NTA_CACHE_NEGATIVE_TTL_HOURS: int = 6
 
     RETENTION_YEARS: int = 7
 
+    DASHBOARD_ROLLUP_RECONCILE_MINUTES: int = 60
+    LIST_EXACT_COUNT_THRESHOLD: int = 10000
+    SEARCH_MAX_CANDIDATES: int = 1000
+    EXPORT_BATCH_SIZE: int = 2000
+    BULK_TRANSITION_MAX_IDS: int = 5000
+
+    AUDIT_PARTITION_MONTHS_AHEAD: int = 3
+    AUDIT_ARCHIVE_AFTER_MONTHS: int = 13
+    AUDIT_ARCHIVE_DIR: str = os.path.join(os.path.dirname(__file__), "audit_archive")
+    AUDIT_MAINTENANCE_INTERVAL_HOURS: int = 24
+
+    OCR_CONCURRENCY: int = 5
+    OCR_MODEL_CASCADE: list[str] = ["gpt-4o-mini", "gpt-4o"]
+    OCR_MAX_TOKENS: int = 4000
+    OCR_IMAGE_DETAIL: str = "high"
+    OCR_PREPROCESS_ENABLED: bool = True
+    OCR_IMAGE_MAX_EDGE: int = 2048
+    OCR_IMAGE_FORMAT: str = "JPEG"
+    OCR_IMAGE_QUALITY: int = 80
+    OCR_IMAGE_GRAYSCALE: bool = True
+    OCR_PDF_DPI: int = 200
+    OCR_PDF_MAX_PAGES: int = 30
+    OCR_TEXT_LAYER_ENABLED: bool = True
+    OCR_TEXT_LAYER_MIN_CONFIDENCE: float = 0.8
+
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_MEMORY_SIZE: int = 512
+    EXTRACTION_CACHE_TTL_DAYS: int = 180
+    EXTRACTION_CACHE_MAX_ROWS: int = 50000
+
+    EXTRACTION_WORKERS: int = 4
+    EXTRACTION_MAX_ATTEMPTS: int = 3
+    EXTRACTION_RETRY_BACKOFF_SECONDS: int = 30
+    EXTRACTION_POLL_INTERVAL_SECONDS: float = 2.0
+    EXTRACTION_JOB_TIMEOUT_SECONDS: int = 600
+
     class Config:
         env_file = ".env"
 
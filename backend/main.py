@@ -4,19 +4,27 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from database import engine, Base
 from config import settings
-import models  # noqa: F401 -- ensure all models are imported for table creation
+import models  # noqa: F401 -- register every model before the routers use them
 
-from routers import auth, departments, vendors, invoices, transfers, compliance, users, gmail, dashboard, audit
+from routers import auth, departments, vendors, invoices, transfers, compliance, users, gmail, dashboard, audit, jobs, system
+from services.job_queue import start_workers, stop_workers
+from services.scheduler import start_scheduler, stop_scheduler
+from services.http_clients import http_clients
+from services.schema import upgrade_database
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    upgrade_database()
     import os
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    start_workers()
+    start_scheduler()
     yield
+    stop_scheduler()
+    stop_workers()
+    await http_clients.aclose()
 
 
 app = FastAPI(title="請求書管理システム", version="1.0.0", lifespan=lifespan)
@@ -41,6 +49,8 @@ app.include_router(compliance.router)
 app.include_router(gmail.router)
 app.include_router(dashboard.router)
 app.include_router(audit.router)
+app.include_router(jobs.router)
+app.include_router(system.router)
 
 
 @app.get("/")
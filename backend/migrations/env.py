@@ -0,0 +1,63 @@
+"""Alembic の実行環境 -- 接続先は DATABASE_URL、比較対象は models のメタデータ"""
+
+from __future__ import annotations
+
+from logging.config import fileConfig
+
+from alembic import context
+
+import models  # noqa: F401 -- register every table on Base.metadata
+from database import Base, engine
+from services.audit_partitions import is_partition_table
+
+# alembic コマンドから実行したときだけ alembic.ini のログ設定を使う（アプリ起動時はアプリの設定のまま）
+if context.config.config_file_name and "connection" not in context.config.attributes:
+    fileConfig(context.config.config_file_name)
+
+# 拡張（pg_trgm）がある環境でだけマイグレーションが作るインデックス。モデルには宣言しない
+UNMANAGED_INDEXES = {"ix_vendors_name_trgm"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "table" and is_partition_table(name):
+        return False  # 監査ログの月別パーティション（services/audit_partitions.py が作る）
+    return not (type_ == "index" and name in UNMANAGED_INDEXES)
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # services.schema.upgrade_database はロック済みの接続を渡してくる
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        # インデックスを CONCURRENTLY で作るリビジョンがあるため、リビジョンごとにコミットする
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
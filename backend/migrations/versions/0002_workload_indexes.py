@@ -0,0 +1,65 @@
+"""workload indexes -- partial / composite indexes matched to the invoice list, recheck and audit queries
+
+Almost every invoice query filters ``is_deleted IS false`` (Invoice.is_deleted.is_(False)), so the
+invoice indexes are partial on exactly that predicate. They replace the plain status index and the
+(created_at, id) list index; the audit log's single-column entity indexes are replaced by one
+(entity_type, entity_id, created_at) index that also serves the newest-first ordering.
+
+Indexes are built CONCURRENTLY so an existing database keeps accepting writes while this runs.
+scripts/explain_queries.py checks that the planner actually picks them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:40:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text("is_deleted IS false")
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ("ix_invoices_live_created_at", "invoices", ["created_at", "id"], LIVE),
+    ("ix_invoices_live_department_created_at", "invoices", ["department_id", "created_at", "id"], LIVE),
+    ("ix_invoices_live_status_created_at", "invoices", ["status", "created_at", "id"], LIVE),
+    ("ix_invoices_live_invoice_date", "invoices", ["invoice_date"], LIVE),
+    ("ix_invoices_vendor_id", "invoices", ["vendor_id"], None),
+    ("ix_invoices_live_registration_number", "invoices", ["invoice_registration_number"], LIVE),
+    ("ix_invoices_recheck_registration_status", "invoices", ["invoice_registration_status", "id"],
+     sa.text("is_deleted IS false AND ai_raw_result IS NOT NULL")),
+    ("ix_audit_logs_entity_created_at", "audit_logs", ["entity_type", "entity_id", "created_at"], None),
+    ("ix_audit_logs_created_at", "audit_logs", ["created_at"], None),
+]
+
+# Superseded by the indexes above: (name, table, columns)
+REPLACED = [
+    ("ix_invoices_created_at_id", "invoices", ["created_at", "id"]),
+    ("ix_invoices_status", "invoices", ["status"]),
+    ("ix_audit_logs_entity_type", "audit_logs", ["entity_type"]),
+    ("ix_audit_logs_entity_id", "audit_logs", ["entity_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_where=where, postgresql_concurrently=True, if_not_exists=True,
+            )
+        for name, table, _ in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,103 @@
+"""partition audit_logs by month -- RANGE (created_at) partitions with (created_at, id) keyed indexes
+
+audit_logs is append-only and must be kept for the statutory retention period, so it is rebuilt as a
+partitioned table: one partition per UTC month (audit_logs_YYYYMM) from the oldest existing row to a
+few months ahead, plus audit_logs_default for anything outside them. The primary key becomes
+(id, created_at) because a partitioned table's unique constraints must include the partition key;
+ids keep coming from the same sequence. Existing rows are copied over and the old table dropped.
+
+services/audit_partitions.py creates later partitions and moves old months to archive files.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 21:05:00.000000
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+COLUMNS = "id, user_id, entity_type, entity_id, action, old_values, new_values, ip_address, created_at"
+
+
+def _add_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('old_values', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('new_values', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='audit_logs_user_id_fkey'),
+    ]
+
+
+def _rename_old(new_name: str) -> None:
+    # Partitions carry copies of the FK under the same name, so drop it rather than rename it
+    # (the old table is dropped after the copy anyway).
+    op.drop_constraint('audit_logs_user_id_fkey', 'audit_logs', type_='foreignkey')
+    op.rename_table('audit_logs', new_name)
+    op.execute(f"ALTER SEQUENCE audit_logs_id_seq RENAME TO {new_name}_id_seq")
+    op.execute(f"ALTER INDEX audit_logs_pkey RENAME TO {new_name}_pkey")
+
+
+def _copy_from(old_name: str) -> None:
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM {old_name}")
+    op.execute("SELECT setval('audit_logs_id_seq', COALESCE((SELECT max(id) FROM audit_logs), 0) + 1, false)")
+    op.drop_table(old_name)
+
+
+def upgrade() -> None:
+    _rename_old('audit_logs_unpartitioned')
+    op.create_table('audit_logs', *_columns(),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+
+    oldest = op.get_bind().execute(sa.text(
+        "SELECT min(created_at) AT TIME ZONE 'UTC' FROM audit_logs_unpartitioned"
+    )).scalar()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current
+    last = current
+    for _ in range(MONTHS_AHEAD):
+        last = _add_month(last)
+    while month <= last:
+        following = _add_month(month)
+        op.execute(
+            f"CREATE TABLE audit_logs_{month:%Y%m} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{following} 00:00:00+00')"
+        )
+        month = following
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    _copy_from('audit_logs_unpartitioned')
+    # Indexes on the parent cascade to every partition; building them after the copy is faster.
+    op.create_index('ix_audit_logs_entity_created_at', 'audit_logs', ['entity_type', 'entity_id', 'created_at', 'id'])
+    op.create_index('ix_audit_logs_created_at_id', 'audit_logs', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    # Months already archived (and dropped) by services/audit_partitions.py are not restored.
+    _rename_old('audit_logs_partitioned')
+    op.create_table('audit_logs', *_columns(), sa.PrimaryKeyConstraint('id'))
+    _copy_from('audit_logs_partitioned')
+    op.create_index('ix_audit_logs_id', 'audit_logs', ['id'])
+    op.create_index('ix_audit_logs_entity_created_at', 'audit_logs', ['entity_type', 'entity_id', 'created_at'])
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'])
@@ -0,0 +1,131 @@
+"""tables added before migrations existed -- job queue, caches, NTA mirror, rollups and search
+
+0001 is the schema the original create_all code built. The tables and indexes below were later added
+with create_all as well, so a database made by one of those versions has some of them and not
+others, and services.schema stamps every such database at 0001. Everything here is therefore
+created only if it is missing. pg_trgm and the vendor name trigram index are only created when the
+server provides the extension.
+
+The (created_at, id) invoice index of that period is not recreated: 0002 replaced it.
+A freshly created invoice_search_documents is empty; fill it with scripts/reindex_search.py
+(the dashboard rollup is rebuilt by its scheduled reconcile).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:20:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('extraction_cache',
+    sa.Column('cache_key', sa.String(length=160), nullable=False),
+    sa.Column('file_hash_sha256', sa.String(length=64), nullable=False),
+    sa.Column('extraction_version', sa.String(length=90), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('cache_key'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_extraction_cache_file_hash_sha256'), 'extraction_cache', ['file_hash_sha256'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_extraction_cache_last_hit_at'), 'extraction_cache', ['last_hit_at'], unique=False, if_not_exists=True)
+    op.create_table('invoice_rollup_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True,
+    )
+    op.create_table('invoice_rollups',
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=False),
+    sa.Column('registration_status', sa.String(length=20), nullable=False),
+    sa.Column('due_bucket', sa.String(length=10), nullable=False),
+    sa.Column('invoice_count', sa.BigInteger(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=18, scale=0), nullable=False),
+    sa.PrimaryKeyConstraint('department_id', 'status', 'registration_status', 'due_bucket'),
+    if_not_exists=True,
+    )
+    op.create_table('nta_registrants',
+    sa.Column('registration_number', sa.String(length=14), nullable=False),
+    sa.Column('sequence_number', sa.Integer(), nullable=True),
+    sa.Column('process', sa.String(length=2), nullable=True),
+    sa.Column('kind', sa.String(length=1), nullable=True),
+    sa.Column('name', sa.String(length=300), nullable=True),
+    sa.Column('trade_name', sa.String(length=300), nullable=True),
+    sa.Column('address', sa.String(length=600), nullable=True),
+    sa.Column('registration_date', sa.Date(), nullable=True),
+    sa.Column('update_date', sa.Date(), nullable=True),
+    sa.Column('disposal_date', sa.Date(), nullable=True),
+    sa.Column('expire_date', sa.Date(), nullable=True),
+    sa.Column('imported_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('registration_number'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_nta_registrants_imported_at'), 'nta_registrants', ['imported_at'], unique=False, if_not_exists=True)
+    op.create_table('nta_registration_cache',
+    sa.Column('registration_number', sa.String(length=14), nullable=False),
+    sa.Column('is_valid', sa.Boolean(), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('checked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('registration_number'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_nta_registration_cache_expires_at'), 'nta_registration_cache', ['expires_at'], unique=False, if_not_exists=True)
+    op.create_table('extraction_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True,
+    )
+    op.create_index(op.f('ix_extraction_jobs_id'), 'extraction_jobs', ['id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_extraction_jobs_invoice_id'), 'extraction_jobs', ['invoice_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_extraction_jobs_status'), 'extraction_jobs', ['status'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_invoice_details_invoice_id'), 'invoice_details', ['invoice_id'], unique=False, if_not_exists=True)
+    op.create_table('invoice_search_documents',
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('invoice_id'),
+    if_not_exists=True,
+    )
+    op.create_index('ix_invoice_search_documents_document', 'invoice_search_documents', ['document'], unique=False, postgresql_using='gin', if_not_exists=True)
+
+    if op.get_bind().execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_vendors_name_trgm ON vendors USING gin (name gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_vendors_name_trgm")
+    op.drop_index(op.f('ix_invoice_details_invoice_id'), table_name='invoice_details', if_exists=True)
+    for table in (
+        'invoice_search_documents', 'extraction_jobs', 'nta_registration_cache', 'nta_registrants',
+        'invoice_rollups', 'invoice_rollup_state', 'extraction_cache',
+    ):
+        op.drop_table(table, if_exists=True)
@@ -0,0 +1,42 @@
+"""extraction cache key from a version digest -- keys no longer grow with the model cascade
+
+The cache key was "<file sha256>:<extraction version>" in a String(160) column and the version was
+stored in String(90). The version lists every model of OCR_MODEL_CASCADE plus prompt and
+preprocessing signatures, so a longer cascade made the INSERT fail. The key is now
+"<file sha256>:<first 16 hex of sha256(version)>" (81 characters) and the version column is Text.
+Existing rows are re-keyed in place (same digest as services.extraction_cache.version_digest), so
+cached results stay usable.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 11:05:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+VERSION_DIGEST_LENGTH = 16
+CACHE_KEY_LENGTH = 64 + 1 + VERSION_DIGEST_LENGTH
+
+
+def upgrade() -> None:
+    op.alter_column('extraction_cache', 'extraction_version', type_=sa.Text(), existing_nullable=False)
+    op.execute(
+        "UPDATE extraction_cache SET cache_key = file_hash_sha256 || ':' || "
+        f"left(encode(sha256(convert_to(extraction_version, 'UTF8')), 'hex'), {VERSION_DIGEST_LENGTH})"
+    )
+    op.alter_column('extraction_cache', 'cache_key', type_=sa.String(length=CACHE_KEY_LENGTH), existing_nullable=False)
+
+
+def downgrade() -> None:
+    # Versions longer than the old column cannot be kept under the old format.
+    op.execute("DELETE FROM extraction_cache WHERE length(extraction_version) > 90")
+    op.alter_column('extraction_cache', 'cache_key', type_=sa.String(length=160), existing_nullable=False)
+    op.execute("UPDATE extraction_cache SET cache_key = file_hash_sha256 || ':' || extraction_version")
+    op.alter_column('extraction_cache', 'extraction_version', type_=sa.String(length=90), existing_nullable=False)
@@ -5,8 +5,16 @@ from models.invoice import Invoice
 from models.invoice_detail import InvoiceDetail
 from models.bank_account import BankAccount
 from models.audit_log import AuditLog
+from models.extraction_job import ExtractionJob
+from models.extraction_cache import ExtractionCacheEntry
+from models.nta_registration import NTARegistrationCacheEntry
+from models.nta_registrant import NTARegistrant
+from models.invoice_rollup import InvoiceRollup, InvoiceRollupState
+from models.invoice_search import InvoiceSearchDocument
 
 __all__ = [
     "User", "Department", "Vendor", "Invoice",
-    "InvoiceDetail", "BankAccount", "AuditLog",
+    "InvoiceDetail", "BankAccount", "AuditLog", "ExtractionJob",
+    "ExtractionCacheEntry", "NTARegistrationCacheEntry", "NTARegistrant",
+    "InvoiceRollup", "InvoiceRollupState", "InvoiceSearchDocument",
 ]
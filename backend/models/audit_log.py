@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import Optional
 
 from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, DateTime, func
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
@@ -10,15 +10,23 @@ from database import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # 対象ごとの履歴（新しい順）と全体の新しい順。(created_at, id) はキーセット方式のページ送りのキー
+        Index("ix_audit_logs_entity_created_at", "entity_type", "entity_id", "created_at", "id"),
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        # 月別パーティション（audit_logs_YYYYMM）の作成とアーカイブは services/audit_partitions.py
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
-    entity_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
-    entity_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    entity_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
     action: Mapped[str] = mapped_column(String(20), nullable=False)
     old_values: Mapped[Optional[dict]] = mapped_column(JSONB)
     new_values: Mapped[Optional[dict]] = mapped_column(JSONB)
     ip_address: Mapped[Optional[str]] = mapped_column(String(45))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # パーティションキーは主キーに含める必要がある（主キーは (id, created_at)）
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     user = relationship("User", back_populates="audit_logs")
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+# キーは「ファイルの SHA-256:抽出バージョンのダイジェスト」。抽出バージョン（モデルの並び・プロンプト・
+# 前処理の組み合わせ）は長さが決まらないため、キーにはダイジェストを使い、原文は Text 列に残す
+SHA256_HEX_LENGTH = 64
+VERSION_DIGEST_LENGTH = 16
+CACHE_KEY_LENGTH = SHA256_HEX_LENGTH + 1 + VERSION_DIGEST_LENGTH
+
+
+class ExtractionCacheEntry(Base):
+    __tablename__ = "extraction_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(CACHE_KEY_LENGTH), primary_key=True)
+    file_hash_sha256: Mapped[str] = mapped_column(String(SHA256_HEX_LENGTH), nullable=False, index=True)
+    extraction_version: Mapped[str] = mapped_column(Text, nullable=False)
+    result: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -5,29 +5,51 @@ from datetime import datetime, date
 from decimal import Decimal
 from sqlalchemy import (
     String, Integer, ForeignKey, DateTime, Date, Numeric,
-    Boolean, Text, func,
+    Boolean, Text, Index, func, text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
 
+_LIVE = text("is_deleted IS false")
+
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # 実際の検索条件に合わせたインデックス。ほぼすべての検索が削除済みを除くため部分インデックスにする。
+    # 条件は検索側の Invoice.is_deleted.is_(False) と同じ形でないと使われない（NOT is_deleted や = false では不可）。
+    # 変更は migrations/versions に追加し、scripts/explain_queries.py で使われることを確かめる
+    __table_args__ = (
+        # 一覧の並び順 (created_at DESC, id DESC) とキーセットのページ送り。部署・ステータスの絞り込みは先頭列に
+        Index("ix_invoices_live_created_at", "created_at", "id", postgresql_where=_LIVE),
+        Index("ix_invoices_live_department_created_at", "department_id", "created_at", "id",
+              postgresql_where=_LIVE),
+        Index("ix_invoices_live_status_created_at", "status", "created_at", "id",
+              postgresql_where=_LIVE),
+        # 一覧・一括再チェックの請求日の範囲指定
+        Index("ix_invoices_live_invoice_date", "invoice_date", postgresql_where=_LIVE),
+        # 取引先名での絞り込み（vendors との結合）、取引先の再検証
+        Index("ix_invoices_vendor_id", "vendor_id"),
+        Index("ix_invoices_live_registration_number", "invoice_registration_number",
+              postgresql_where=_LIVE),
+        # 一括再チェックの対象（登録番号の確認状態ごと、id 順のキーセット）
+        Index("ix_invoices_recheck_registration_status", "invoice_registration_status", "id",
+              postgresql_where=text("is_deleted IS false AND ai_raw_result IS NOT NULL")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     invoice_number: Mapped[Optional[str]] = mapped_column(String(100))
     vendor_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("vendors.id"))
-    department_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("departments.id"))
+    department_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("departments.id"), active_history=True)
     assigned_user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
     approved_by_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
 
-    status: Mapped[str] = mapped_column(String(30), default="uploaded", index=True)
+    status: Mapped[str] = mapped_column(String(30), default="uploaded", active_history=True)
 
     invoice_date: Mapped[Optional[date]] = mapped_column(Date)
-    due_date: Mapped[Optional[date]] = mapped_column(Date)
+    due_date: Mapped[Optional[date]] = mapped_column(Date, active_history=True)
 
-    total_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
+    total_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0), active_history=True)
     tax_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
     tax_8_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
     tax_10_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
@@ -39,12 +61,13 @@ class Invoice(Base):
     source_type: Mapped[str] = mapped_column(String(20), default="upload")
 
     invoice_registration_number: Mapped[Optional[str]] = mapped_column(String(14))
-    invoice_registration_status: Mapped[Optional[str]] = mapped_column(String(20))
+    invoice_registration_status: Mapped[Optional[str]] = mapped_column(String(20), active_history=True)
 
-    ai_raw_result: Mapped[Optional[dict]] = mapped_column(JSONB)
-    compliance_check_result: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # 抽出結果・判定結果のJSONは大きいので、詳細表示など必要なときだけ読む（undefer）
+    ai_raw_result: Mapped[Optional[dict]] = mapped_column(JSONB, deferred=True)
+    compliance_check_result: Mapped[Optional[dict]] = mapped_column(JSONB, deferred=True)
 
-    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, active_history=True)
     retention_until: Mapped[Optional[date]] = mapped_column(Date)
     description: Mapped[Optional[str]] = mapped_column(Text)
     recipient_name: Mapped[Optional[str]] = mapped_column(String(200))
@@ -55,5 +78,7 @@ class Invoice(Base):
 
     vendor = relationship("Vendor", back_populates="invoices")
     department = relationship("Department", back_populates="invoices")
-    details = relationship("InvoiceDetail", back_populates="invoice", cascade="all, delete-orphan")
+    details = relationship(
+        "InvoiceDetail", back_populates="invoice", cascade="all, delete-orphan", order_by="InvoiceDetail.id"
+    )
     bank_account = relationship("BankAccount", back_populates="invoice", uselist=False, cascade="all, delete-orphan")
@@ -11,7 +11,7 @@ class InvoiceDetail(Base):
     __tablename__ = "invoice_details"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id"), nullable=False)
+    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
     description: Mapped[Optional[str]] = mapped_column(String(500))
     amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
     tax: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 0))
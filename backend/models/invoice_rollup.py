@@ -0,0 +1,32 @@
+from __future__ import annotations
+from typing import Optional
+
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import String, Integer, BigInteger, Date, DateTime, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class InvoiceRollup(Base):
+    """Invoice counts/amounts per (department, status, registration status, due bucket).
+
+    department_id 0 = no department. Buckets are relative to ``InvoiceRollupState.as_of``.
+    """
+
+    __tablename__ = "invoice_rollups"
+
+    department_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(String(30), primary_key=True)
+    registration_status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    due_bucket: Mapped[str] = mapped_column(String(10), primary_key=True)
+    invoice_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    total_amount: Mapped[Decimal] = mapped_column(Numeric(18, 0), default=0)
+
+
+class InvoiceRollupState(Base):
+    __tablename__ = "invoice_rollup_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    as_of: Mapped[date] = mapped_column(Date)
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
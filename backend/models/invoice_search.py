@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import Integer, ForeignKey, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class InvoiceSearchDocument(Base):
+    """Bigram full-text document per invoice (number, vendor, description, line items)."""
+
+    __tablename__ = "invoice_search_documents"
+    __table_args__ = (
+        Index("ix_invoice_search_documents_document", "document", postgresql_using="gin"),
+    )
+
+    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True)
+    document: Mapped[str] = mapped_column(TSVECTOR, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
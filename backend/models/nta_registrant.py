@@ -0,0 +1,24 @@
+from __future__ import annotations
+from typing import Optional
+
+from datetime import date, datetime
+from sqlalchemy import String, Integer, Date, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class NTARegistrant(Base):
+    __tablename__ = "nta_registrants"
+
+    registration_number: Mapped[str] = mapped_column(String(14), primary_key=True)
+    sequence_number: Mapped[Optional[int]] = mapped_column(Integer)
+    process: Mapped[Optional[str]] = mapped_column(String(2))
+    kind: Mapped[Optional[str]] = mapped_column(String(1))
+    name: Mapped[Optional[str]] = mapped_column(String(300))
+    trade_name: Mapped[Optional[str]] = mapped_column(String(300))
+    address: Mapped[Optional[str]] = mapped_column(String(600))
+    registration_date: Mapped[Optional[date]] = mapped_column(Date)
+    update_date: Mapped[Optional[date]] = mapped_column(Date)
+    disposal_date: Mapped[Optional[date]] = mapped_column(Date)
+    expire_date: Mapped[Optional[date]] = mapped_column(Date)
+    imported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import String, Integer, Boolean, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class NTARegistrationCacheEntry(Base):
+    __tablename__ = "nta_registration_cache"
+
+    registration_number: Mapped[str] = mapped_column(String(14), primary_key=True)
+    is_valid: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    result: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,37 +1,60 @@
 from __future__ import annotations
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 
 from database import get_db
+from schemas.audit import AuditArchiveOut, AuditLogListOut
+from services import audit_partitions
 from services.auth_service import require_role
 from services.audit_service import get_audit_logs
+from services.pagination import InvalidCursorError, decode_cursor
 
 router = APIRouter(prefix="/api/audit", tags=["audit"])
 
 
-@router.get("")
+@router.get("", response_model=AuditLogListOut)
 def list_audit_logs(
     entity_type: Optional[str] = None,
     entity_id: Optional[int] = None,
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="前のレスポンスの next_cursor"),
     db: Session = Depends(get_db),
     _=Depends(require_role("admin", "accountant")),
 ):
-    logs = get_audit_logs(db, entity_type=entity_type, entity_id=entity_id, limit=limit, offset=offset)
-    return [
-        {
-            "id": l.id,
-            "user_id": l.user_id,
-            "entity_type": l.entity_type,
-            "entity_id": l.entity_id,
-            "action": l.action,
-            "old_values": l.old_values,
-            "new_values": l.new_values,
-            "ip_address": l.ip_address,
-            "created_at": l.created_at.isoformat() if l.created_at else None,
-        }
-        for l in logs
-    ]
+    try:
+        logs, next_cursor = get_audit_logs(db, entity_type=entity_type, entity_id=entity_id, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+    return AuditLogListOut(items=logs, next_cursor=next_cursor)
+
+
+@router.get("/archives", response_model=list[AuditArchiveOut])
+def list_audit_archives(_=Depends(require_role("admin", "accountant"))):
+    """Months moved out of the database into archive files, oldest first."""
+    return audit_partitions.list_archives()
+
+
+@router.get("/archives/{month}", response_model=AuditLogListOut)
+def read_audit_archive(
+    month: str = Path(..., pattern=r"^\d{4}-\d{2}$", description="YYYY-MM（UTC の月）"),
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="前のレスポンスの next_cursor"),
+    _=Depends(require_role("admin", "accountant")),
+):
+    try:
+        after = tuple(decode_cursor(cursor, 2)) if cursor else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+    try:
+        items, next_cursor = audit_partitions.read_archive(
+            month, entity_type=entity_type, entity_id=entity_id, limit=limit, cursor=after,
+        )
+    except audit_partitions.ArchiveNotFoundError:
+        raise HTTPException(status_code=404, detail="この月のアーカイブはありません")
+    except audit_partitions.ArchiveIntegrityError:
+        raise HTTPException(status_code=500, detail="アーカイブファイルがチェックサムと一致しません")
+    return AuditLogListOut(items=items, next_cursor=next_cursor)
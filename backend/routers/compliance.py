@@ -1,24 +1,30 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models.invoice import Invoice
 from models.vendor import Vendor
 from models.user import User
-from schemas.compliance import NTAVerificationResult, ComplianceCheckResult
-from services.auth_service import get_current_user
+from schemas.compliance import NTAVerificationResult, ComplianceCheckResult, ComplianceRecheckRequest
+from services.auth_service import get_current_user, require_role
 from services.nta_api_service import verify_registration_number
-from services.compliance_service import check_invoice_compliance
+from services.compliance_service import check_invoice_compliance, registration_status
+from services.compliance_recheck import run_recheck
 from services.audit_service import log_action
+from services.invoice_rollup import current_rows
 
 router = APIRouter(prefix="/api/compliance", tags=["compliance"])
 
 
 @router.get("/verify/{registration_number}", response_model=NTAVerificationResult)
-def verify_number(registration_number: str, _=Depends(get_current_user)):
-    return verify_registration_number(registration_number)
+def verify_number(registration_number: str, refresh: bool = Query(False), _=Depends(get_current_user)):
+    return verify_registration_number(registration_number, refresh=refresh)
 
 
 @router.post("/check/{invoice_id}", response_model=ComplianceCheckResult)
@@ -29,13 +35,10 @@ def check_compliance(invoice_id: int, db: Session = Depends(get_db), current_use
 
     result = check_invoice_compliance(inv.ai_raw_result)
     inv.compliance_check_result = result.model_dump()
-    inv.invoice_registration_status = (
-        "valid" if result.registration_valid
-        else "invalid" if result.registration_valid is False
-        else "unchecked"
-    )
+    inv.invoice_registration_status = registration_status(result)
 
-    if inv.vendor_id and inv.invoice_registration_number:
+    # 照会できなかった（未確認の）結果で取引先の判定を上書きしない
+    if inv.vendor_id and inv.invoice_registration_number and result.registration_valid is not None:
         vendor = db.query(Vendor).filter(Vendor.id == inv.vendor_id).first()
         if vendor:
             vendor.invoice_registration_number = inv.invoice_registration_number
@@ -47,15 +50,32 @@ def check_compliance(invoice_id: int, db: Session = Depends(get_db), current_use
     return result
 
 
+@router.post("/recheck")
+def recheck_compliance(
+    body: ComplianceRecheckRequest,
+    request: Request,
+    current_user: User = Depends(require_role("admin", "accountant")),
+):
+    """Re-check every matching invoice; progress is streamed as NDJSON (one event per line)."""
+    user_id = current_user.id
+    ip_address = request.client.host if request.client else None
+
+    def stream():
+        for event in run_recheck(body, user_id, ip_address):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/dashboard")
 def compliance_dashboard(db: Session = Depends(get_db), _=Depends(get_current_user)):
-    total = db.query(Invoice).filter(Invoice.is_deleted.is_(False)).count()
-    valid = db.query(Invoice).filter(Invoice.invoice_registration_status == "valid", Invoice.is_deleted.is_(False)).count()
-    invalid = db.query(Invoice).filter(Invoice.invoice_registration_status == "invalid", Invoice.is_deleted.is_(False)).count()
-    unchecked = db.query(Invoice).filter(
-        Invoice.invoice_registration_status.in_(["unchecked", None]),
-        Invoice.is_deleted.is_(False),
-    ).count()
+    by_registration: dict[str, int] = defaultdict(int)
+    for r in current_rows(db):
+        by_registration[r.registration_status] += r.invoice_count
+    total = sum(by_registration.values())
+    valid = by_registration["valid"]
+    invalid = by_registration["invalid"]
+    unchecked = by_registration["unchecked"]
 
     return {
         "total_invoices": total,
@@ -1,66 +1,46 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
+from collections import defaultdict
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sqlfunc
 
 from database import get_db
-from models.invoice import Invoice
 from models.department import Department
 from models.user import User
 from services.auth_service import get_current_user
+from services.invoice_rollup import current_rows
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
 @router.get("/summary")
 def dashboard_summary(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    base = db.query(Invoice).filter(Invoice.is_deleted.is_(False))
+    rows = current_rows(db)
 
+    scoped = rows
     if current_user.role == "department" and current_user.department_id:
-        base = base.filter(Invoice.department_id == current_user.department_id)
+        scoped = [r for r in rows if r.department_id == current_user.department_id]
+    open_rows = [r for r in scoped if r.status not in ("transferred", "cancelled")]
 
-    total = base.count()
-    by_status = dict(
-        db.query(Invoice.status, sqlfunc.count(Invoice.id))
-        .filter(Invoice.is_deleted.is_(False))
-        .group_by(Invoice.status)
-        .all()
-    )
+    by_status: dict[str, int] = defaultdict(int)
+    for r in rows:
+        by_status[r.status] += r.invoice_count
 
-    upcoming_due = (
-        base.filter(
-            Invoice.due_date.isnot(None),
-            Invoice.due_date <= date.today() + timedelta(days=7),
-            Invoice.due_date >= date.today(),
-            Invoice.status.notin_(["transferred", "cancelled"]),
-        ).count()
-    )
-
-    overdue = (
-        base.filter(
-            Invoice.due_date.isnot(None),
-            Invoice.due_date < date.today(),
-            Invoice.status.notin_(["transferred", "cancelled"]),
-        ).count()
-    )
-
-    dept_totals = (
-        db.query(Department.name, sqlfunc.sum(Invoice.total_amount), sqlfunc.count(Invoice.id))
-        .join(Invoice, Invoice.department_id == Department.id)
-        .filter(Invoice.is_deleted.is_(False))
-        .group_by(Department.name)
-        .all()
-    )
+    names = dict(db.query(Department.id, Department.name).all())
+    dept_totals: dict[str, list] = {}
+    for r in rows:
+        if r.department_id in names:
+            entry = dept_totals.setdefault(names[r.department_id], [0, 0])
+            entry[0] += r.total_amount
+            entry[1] += r.invoice_count
 
     return {
-        "total_invoices": total,
-        "by_status": by_status,
-        "upcoming_due_7days": upcoming_due,
-        "overdue": overdue,
+        "total_invoices": sum(r.invoice_count for r in scoped),
+        "by_status": dict(by_status),
+        "upcoming_due_7days": sum(r.invoice_count for r in open_rows if r.due_bucket == "due_7d"),
+        "overdue": sum(r.invoice_count for r in open_rows if r.due_bucket == "overdue"),
         "by_department": [
             {"name": name, "total_amount": float(amt or 0), "count": cnt}
-            for name, amt, cnt in dept_totals
+            for name, (amt, cnt) in dept_totals.items()
         ],
     }
@@ -10,11 +10,8 @@ from schemas.invoice import InvoiceOut
 from services.auth_service import require_role
 from services.gmail_service import fetch_invoice_emails
 from services.file_service import save_upload, calculate_retention_date
-from services.ocr_service import extract_invoice_data
-from services.compliance_service import check_invoice_compliance
+from services.job_queue import enqueue_extraction, notify_workers
 from services.audit_service import log_action
-from config import settings
-import os
 
 router = APIRouter(prefix="/api/gmail", tags=["gmail"])
 
@@ -55,20 +52,9 @@ def fetch_emails(
                 new_values={"source": "gmail", "message_id": email_data["message_id"]},
             )
 
-            abs_path = os.path.join(settings.UPLOAD_DIR, rel_path)
-            try:
-                ai_result = extract_invoice_data(abs_path)
-                inv.ai_raw_result = ai_result
-                inv.status = "extracted"
-
-                compliance = check_invoice_compliance(ai_result)
-                inv.compliance_check_result = compliance.model_dump()
-                inv.status = "compliance_checked"
-            except Exception:
-                inv.status = "extraction_failed"
-
-            db.flush()
+            enqueue_extraction(db, inv.id)
             created.append(inv.id)
 
     db.commit()
+    notify_workers()
     return {"ok": True, "created_count": len(created), "invoice_ids": created}
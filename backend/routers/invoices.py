@@ -1,32 +1,66 @@
 from __future__ import annotations
 from typing import Optional
 
+import asyncio
 import os
 from datetime import date
-from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload, undefer
+from sqlalchemy import or_, select, tuple_
 
 from database import get_db
 from models.invoice import Invoice
-from models.invoice_detail import InvoiceDetail
 from models.bank_account import BankAccount
 from models.vendor import Vendor
-from schemas.invoice import InvoiceOut, InvoiceUpdate, InvoiceListOut
+from models.department import Department
+from schemas.invoice import (
+    InvoiceOut, InvoiceUpdate, InvoiceListOut, InvoiceListItemOut,
+    InvoiceDetailOut, InvoiceBankAccountOut, InvoiceSearchOut, InvoiceSearchHit, INVOICE_LIST_EXTRA_FIELDS,
+    InvoiceBulkTransitionRequest, InvoiceBulkTransitionOut, InvoiceBulkSkipped,
+)
 from services.auth_service import get_current_user, require_role
-from services.file_service import save_upload, compute_sha256, calculate_retention_date, check_image_dpi, verify_file_hash
-from services.ocr_service import extract_invoice_data
+from services.file_service import (
+    save_upload_stream, remove_upload, UploadTooLargeError,
+    calculate_retention_date, verify_file_hash,
+)
+from services.extraction_cache import extract_many_cached_async
 from services.compliance_service import check_invoice_compliance
-from services.classifier import classify_department, update_vendor_department
+from services.extraction_pipeline import apply_extraction_result, apply_compliance_check
+from services.job_queue import enqueue_extraction, notify_workers
+from services.classifier import update_vendor_department
 from services.audit_service import log_action
+from services import search_index
+from services.invoice_details import UnknownDetailError, sync_details
+from services.invoice_export import stream_export
+from services.invoice_transitions import TRANSITIONS, bulk_transition
+from services.pagination import InvalidCursorError, count_rows, decode_cursor, encode_cursor
 from config import settings
 from models.user import User
 
 router = APIRouter(prefix="/api/invoices", tags=["invoices"])
 
 
+def _invoice_query(db: Session):
+    """Invoice query that loads everything ``_to_out`` touches: one JOIN plus two batched SELECTs."""
+    return db.query(Invoice).options(
+        undefer(Invoice.ai_raw_result),
+        undefer(Invoice.compliance_check_result),
+        joinedload(Invoice.vendor),
+        joinedload(Invoice.department),
+        selectinload(Invoice.bank_account),
+        selectinload(Invoice.details),
+    )
+
+
+def _reload(db: Session, invoice_ids: list[int]) -> list[Invoice]:
+    """Re-read invoices after commit (replaces per-row ``db.refresh``), keeping the given order."""
+    rows = _invoice_query(db).filter(Invoice.id.in_(invoice_ids)).populate_existing().all()
+    by_id = {inv.id: inv for inv in rows}
+    return [by_id[i] for i in invoice_ids]
+
+
 def _to_out(inv: Invoice) -> InvoiceOut:
     d = InvoiceOut.model_validate(inv)
     d.vendor_name = inv.vendor.name if inv.vendor else None
@@ -34,22 +68,125 @@ def _to_out(inv: Invoice) -> InvoiceOut:
     return d
 
 
+_LIST_RELATIONS = {"details", "bank_account"}
+_LIST_COLUMNS = [
+    name for name in InvoiceListItemOut.model_fields
+    if name not in INVOICE_LIST_EXTRA_FIELDS and name not in ("vendor_name", "department_name")
+]
+
+
+def _parse_fields(fields: Optional[str]) -> list[str]:
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    unknown = [f for f in requested if f not in INVOICE_LIST_EXTRA_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不明な項目です: {', '.join(unknown)}（指定可能: {', '.join(INVOICE_LIST_EXTRA_FIELDS)}）",
+        )
+    return list(dict.fromkeys(requested))
+
+
+def _list_options(extras: list[str]) -> list:
+    """Select only the listed columns (plus requested extras); JSONB stays deferred unless asked for."""
+    columns = _LIST_COLUMNS + [f for f in extras if f not in _LIST_RELATIONS]
+    options = [
+        load_only(*(getattr(Invoice, c) for c in columns)),
+        joinedload(Invoice.vendor).load_only(Vendor.name),
+        joinedload(Invoice.department).load_only(Department.name),
+    ]
+    if "details" in extras:
+        options.append(selectinload(Invoice.details))
+    if "bank_account" in extras:
+        options.append(selectinload(Invoice.bank_account))
+    return options
+
+
+def _list_filters(
+    status: Optional[str] = None,
+    department_id: Optional[int] = None,
+    vendor_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    amount_min: Optional[int] = None,
+    amount_max: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+) -> list:
+    """WHERE conditions shared by the list and the export; department users only see their own."""
+    conditions = [Invoice.is_deleted.is_(False)]
+    if current_user.role == "department" and current_user.department_id:
+        conditions.append(Invoice.department_id == current_user.department_id)
+    if status:
+        conditions.append(Invoice.status == status)
+    if department_id:
+        conditions.append(Invoice.department_id == department_id)
+    if vendor_name:
+        conditions.append(Invoice.vendor_id.in_(select(Vendor.id).where(Vendor.name.ilike(f"%{vendor_name}%"))))
+    if date_from:
+        conditions.append(Invoice.invoice_date >= date_from)
+    if date_to:
+        conditions.append(Invoice.invoice_date <= date_to)
+    if amount_min is not None:
+        conditions.append(Invoice.total_amount >= amount_min)
+    if amount_max is not None:
+        conditions.append(Invoice.total_amount <= amount_max)
+    return conditions
+
+
+def _to_list_item(inv: Invoice, extras: list[str]) -> InvoiceListItemOut:
+    """Only the base columns and requested extras are set, so ``exclude_unset`` drops the rest."""
+    data = {c: getattr(inv, c) for c in _LIST_COLUMNS}
+    data["vendor_name"] = inv.vendor.name if inv.vendor else None
+    data["department_name"] = inv.department.name if inv.department else None
+    for f in extras:
+        if f == "details":
+            data[f] = [InvoiceDetailOut.model_validate(d) for d in inv.details]
+        elif f == "bank_account":
+            data[f] = InvoiceBankAccountOut.model_validate(inv.bank_account) if inv.bank_account else None
+        else:
+            data[f] = getattr(inv, f)
+    return InvoiceListItemOut(**data)
+
+
 @router.post("/upload", response_model=list[InvoiceOut])
 async def upload_invoices(
     request: Request,
     files: list[UploadFile] = File(...),
+    wait: bool = Query(False, description="抽出完了まで待って結果を返す（ファイル単位で並列実行）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    results = []
-    for f in files:
-        content = await f.read()
-        rel_path, sha256 = save_upload(content, f.filename)
+    user_id = current_user.id
+    ip_address = request.client.host if request.client else None
+
+    saved = []
+    remaining = settings.UPLOAD_MAX_BATCH_BYTES
+    try:
+        for f in files:
+            rel_path, sha256, size = await save_upload_stream(f, max_bytes=remaining)
+            remaining -= size
+            saved.append((f.filename, rel_path, sha256))
+    except BaseException as e:
+        for _, rel_path, _ in saved:
+            remove_upload(rel_path)
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        raise
+
+    outcomes: list = [None] * len(saved)
+    if wait:
+        # Release the connection held since authentication; nothing is written
+        # until every file has been extracted.
+        db.commit()
+        outcomes = await _extract_batch(
+            [(os.path.join(settings.UPLOAD_DIR, rel_path), sha256) for _, rel_path, sha256 in saved]
+        )
 
+    results = []
+    for (filename, rel_path, sha256), outcome in zip(saved, outcomes):
         inv = Invoice(
             file_path=rel_path,
             file_hash_sha256=sha256,
-            original_filename=f.filename,
+            original_filename=filename,
             source_type="upload",
             status="uploaded",
             retention_until=calculate_retention_date(None),
@@ -59,138 +196,140 @@ async def upload_invoices(
 
         log_action(
             db,
-            user_id=current_user.id,
+            user_id=user_id,
             entity_type="invoice",
             entity_id=inv.id,
             action="create",
-            new_values={"filename": f.filename, "sha256": sha256},
-            ip_address=request.client.host if request.client else None,
+            new_values={"filename": filename, "sha256": sha256},
+            ip_address=ip_address,
         )
 
-        abs_path = os.path.join(settings.UPLOAD_DIR, rel_path)
-        try:
-            ai_result = extract_invoice_data(abs_path)
-            inv.ai_raw_result = ai_result
-            inv.status = "extracted"
-
-            inv.invoice_number = ai_result.get("invoice_number")
-            inv.invoice_date = _parse_date(ai_result.get("invoice_date"))
-            inv.due_date = _parse_date(ai_result.get("due_date"))
-            inv.total_amount = _to_decimal(ai_result.get("total_amount"))
-            inv.subtotal_amount = _to_decimal(ai_result.get("subtotal_amount"))
-            inv.tax_amount = _to_decimal(ai_result.get("tax_amount"))
-            inv.tax_8_amount = _to_decimal(ai_result.get("tax_8_amount"))
-            inv.tax_10_amount = _to_decimal(ai_result.get("tax_10_amount"))
-            inv.invoice_registration_number = ai_result.get("invoice_registration_number")
-            inv.recipient_name = ai_result.get("recipient_name")
-            inv.retention_until = calculate_retention_date(inv.invoice_date)
-
-            vendor_name = ai_result.get("vendor_name")
-            if vendor_name:
-                vendor = db.query(Vendor).filter(Vendor.name == vendor_name).first()
-                if not vendor:
-                    vendor = Vendor(name=vendor_name, invoice_registration_number=ai_result.get("invoice_registration_number"))
-                    db.add(vendor)
-                    db.flush()
-                inv.vendor_id = vendor.id
-
-            dept_id = classify_department(db, vendor_name)
-            if dept_id:
-                inv.department_id = dept_id
-
-            bank_data = ai_result.get("bank_account", {})
-            if bank_data and any(bank_data.values()):
-                ba = BankAccount(
-                    invoice_id=inv.id,
-                    bank_name=bank_data.get("bank_name"),
-                    branch_name=bank_data.get("branch_name"),
-                    account_type=bank_data.get("account_type"),
-                    account_number=bank_data.get("account_number"),
-                    account_holder=bank_data.get("account_holder"),
-                )
-                db.add(ba)
-
-            items = ai_result.get("items", [])
-            for item in items:
-                detail = InvoiceDetail(
-                    invoice_id=inv.id,
-                    description=item.get("description"),
-                    amount=_to_decimal(item.get("amount")),
-                    tax=_to_decimal(item.get("tax")),
-                    tax_rate=item.get("tax_rate"),
-                )
-                db.add(detail)
-
-            compliance = check_invoice_compliance(ai_result)
-            inv.compliance_check_result = compliance.model_dump()
-            inv.invoice_registration_status = (
-                "valid" if compliance.registration_valid
-                else "invalid" if compliance.registration_valid is False
-                else "unchecked"
-            )
-            inv.status = "compliance_checked"
-
-        except Exception as e:
-            inv.ai_raw_result = {"error": str(e)}
-            inv.status = "extraction_failed"
-
-        db.flush()
+        if outcome is None or isinstance(outcome, BaseException):
+            enqueue_extraction(db, inv.id)
+        else:
+            ai_result, compliance = outcome
+            apply_extraction_result(db, inv, ai_result)
+            apply_compliance_check(inv, compliance)
         results.append(inv)
 
+    invoice_ids = [inv.id for inv in results]
     db.commit()
-    for inv in results:
-        db.refresh(inv)
-    return [_to_out(inv) for inv in results]
+    notify_workers()
+    return [_to_out(inv) for inv in _reload(db, invoice_ids)]
+
+
+async def _extract_batch(files: list[tuple[str, str]]) -> list:
+    """Run extraction and compliance checks for all files concurrently.
 
+    Failed files come back as exceptions and are handed to the job queue for retry.
+    """
+    extracted = await extract_many_cached_async(files)
 
-@router.get("", response_model=InvoiceListOut)
+    async def _check(ai_result):
+        if isinstance(ai_result, BaseException):
+            return ai_result
+        compliance = await asyncio.to_thread(check_invoice_compliance, ai_result)
+        return ai_result, compliance
+
+    return await asyncio.gather(*(_check(r) for r in extracted))
+
+
+@router.get("", response_model=InvoiceListOut, response_model_exclude_unset=True)
 def list_invoices(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    status: Optional[str] = None,
-    department_id: Optional[int] = None,
-    vendor_name: Optional[str] = None,
-    date_from: Optional[date] = None,
-    date_to: Optional[date] = None,
-    amount_min: Optional[int] = None,
-    amount_max: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="追加で返す項目（カンマ区切り。例: details,ai_raw_result）"),
+    cursor: Optional[str] = Query(None, description="前のレスポンスの next_cursor（指定時は page を無視）"),
+    count: str = Query("exact", pattern="^(exact|estimated|none)$", description="総件数: 正確/推定/なし"),
+    conditions: list = Depends(_list_filters),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
 ):
-    q = db.query(Invoice).filter(Invoice.is_deleted.is_(False))
-
-    if current_user.role == "department" and current_user.department_id:
-        q = q.filter(Invoice.department_id == current_user.department_id)
-
-    if status:
-        q = q.filter(Invoice.status == status)
-    if department_id:
-        q = q.filter(Invoice.department_id == department_id)
-    if vendor_name:
-        q = q.join(Vendor).filter(Vendor.name.ilike(f"%{vendor_name}%"))
-    if date_from:
-        q = q.filter(Invoice.invoice_date >= date_from)
-    if date_to:
-        q = q.filter(Invoice.invoice_date <= date_to)
-    if amount_min is not None:
-        q = q.filter(Invoice.total_amount >= amount_min)
-    if amount_max is not None:
-        q = q.filter(Invoice.total_amount <= amount_max)
-
-    total = q.count()
-    items = q.order_by(Invoice.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+    extras = _parse_fields(fields)
+    q = db.query(Invoice).filter(*conditions)
+    total, estimated = count_rows(db, q, count)
 
+    q = q.order_by(Invoice.created_at.desc(), Invoice.id.desc())
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="カーソルが不正です")
+        q = q.filter(tuple_(Invoice.created_at, Invoice.id) < tuple_(created_at, last_id))
+    else:
+        q = q.offset((page - 1) * per_page)
+    items = q.limit(per_page).options(*_list_options(extras)).all()
+
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(items) == per_page else None
     return InvoiceListOut(
-        items=[_to_out(inv) for inv in items],
+        items=[_to_list_item(inv, extras) for inv in items],
         total=total,
+        total_is_estimate=estimated,
         page=page,
         per_page=per_page,
+        next_cursor=next_cursor,
     )
 
 
+@router.get("/search", response_model=InvoiceSearchOut, response_model_exclude_unset=True)
+def search_invoices(
+    q: str = Query(..., min_length=1, max_length=200, description="請求書番号・取引先名・摘要・明細の品目"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    department_id = current_user.department_id if current_user.role == "department" else None
+    hits, truncated = search_index.search(db, q, limit, department_id)
+    invoices = {
+        inv.id: inv
+        for inv in db.query(Invoice).filter(Invoice.id.in_([i for i, _ in hits])).options(*_list_options([]))
+    }
+    items = []
+    for invoice_id, rank in hits:
+        item = _to_list_item(invoices[invoice_id], [])
+        items.append(InvoiceSearchHit(**item.model_dump(exclude_unset=True), rank=round(rank, 6)))
+    return InvoiceSearchOut(query=q, items=items, truncated=truncated)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() == "gzip":
+            q = params.strip().removeprefix("q=")
+            try:
+                return float(q) > 0 if q else True
+            except ValueError:
+                return True
+    return False
+
+
+@router.get("/export")
+def export_invoices(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$", description="csv または xlsx"),
+    conditions: list = Depends(_list_filters),
+    current_user: User = Depends(get_current_user),
+):
+    """Every matching invoice (one row per line item), streamed; CSV is gzipped if the client accepts it."""
+    compress = fmt == "csv" and _accepts_gzip(request.headers.get("accept-encoding", ""))
+    filters = {k: v for k, v in request.query_params.items() if k != "format"}
+    headers = {"Content-Disposition": f'attachment; filename="invoices_{date.today():%Y%m%d}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    media_type = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }[fmt]
+    body = stream_export(
+        conditions, fmt, compress, current_user.id, filters,
+        request.client.host if request.client else None,
+    )
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
 @router.get("/{invoice_id}", response_model=InvoiceOut)
 def get_invoice(invoice_id: int, db: Session = Depends(get_db), _=Depends(get_current_user)):
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.is_deleted.is_(False)).first()
+    inv = _invoice_query(db).filter(Invoice.id == invoice_id, Invoice.is_deleted.is_(False)).first()
     if not inv:
         raise HTTPException(status_code=404, detail="請求書が見つかりません")
     return _to_out(inv)
@@ -204,7 +343,7 @@ def update_invoice(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.is_deleted.is_(False)).first()
+    inv = _invoice_query(db).filter(Invoice.id == invoice_id, Invoice.is_deleted.is_(False)).first()
     if not inv:
         raise HTTPException(status_code=404, detail="請求書が見つかりません")
 
@@ -228,12 +367,13 @@ def update_invoice(
             db.add(ba)
 
     if body.details is not None:
-        for detail in inv.details:
-            db.delete(detail)
-        db.flush()
-        for item in body.details:
-            detail = InvoiceDetail(invoice_id=inv.id, **item.model_dump(exclude_unset=True))
-            db.add(detail)
+        try:
+            old_lines, new_lines = sync_details(db, inv, body.details)
+        except UnknownDetailError as e:
+            raise HTTPException(status_code=400, detail=f"明細(id={e.args[0]})はこの請求書の明細ではありません")
+        if old_lines or new_lines:
+            old_values["details"] = old_lines
+            new_values["details"] = new_lines
 
     if body.department_id and inv.vendor_id:
         update_vendor_department(db, inv.vendor_id, body.department_id)
@@ -253,8 +393,32 @@ def update_invoice(
     )
 
     db.commit()
-    db.refresh(inv)
-    return _to_out(inv)
+    return _to_out(_reload(db, [invoice_id])[0])
+
+
+@router.post("/bulk-transition", response_model=InvoiceBulkTransitionOut)
+def bulk_transition_invoices(
+    body: InvoiceBulkTransitionRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin", "accountant")),
+):
+    """Approve or reject many invoices at once; ineligible IDs are skipped and reported, not errors."""
+    if len(body.invoice_ids) > settings.BULK_TRANSITION_MAX_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"一度に変更できるのは {settings.BULK_TRANSITION_MAX_IDS} 件までです"
+        )
+    result = bulk_transition(
+        db, body.action, body.invoice_ids, current_user.id,
+        request.client.host if request.client else None,
+    )
+    db.commit()
+    return InvoiceBulkTransitionOut(
+        action=body.action,
+        status=TRANSITIONS[body.action].target,
+        updated=result.updated,
+        skipped=[InvoiceBulkSkipped(id=i, reason=reason, status=status) for i, reason, status in result.skipped],
+    )
 
 
 @router.post("/{invoice_id}/approve", response_model=InvoiceOut)
@@ -267,7 +431,7 @@ def approve_invoice(
     inv = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not inv:
         raise HTTPException(status_code=404, detail="請求書が見つかりません")
-    if inv.status not in ("reviewed", "compliance_checked"):
+    if not TRANSITIONS["approve"].allows(inv.status):
         raise HTTPException(status_code=400, detail=f"現在のステータス({inv.status})では承認できません")
 
     from datetime import datetime, timezone
@@ -284,8 +448,7 @@ def approve_invoice(
         ip_address=request.client.host if request.client else None,
     )
     db.commit()
-    db.refresh(inv)
-    return _to_out(inv)
+    return _to_out(_reload(db, [invoice_id])[0])
 
 
 @router.post("/{invoice_id}/reject", response_model=InvoiceOut)
@@ -310,8 +473,7 @@ def reject_invoice(
         ip_address=request.client.host if request.client else None,
     )
     db.commit()
-    db.refresh(inv)
-    return _to_out(inv)
+    return _to_out(_reload(db, [invoice_id])[0])
 
 
 @router.delete("/{invoice_id}")
@@ -350,21 +512,3 @@ def verify_invoice_hash(invoice_id: int, db: Session = Depends(get_db), _=Depend
     is_valid = verify_file_hash(abs_path, inv.file_hash_sha256)
     return {"valid": is_valid, "expected": inv.file_hash_sha256}
 
-
-def _parse_date(value) -> Optional[date]:
-    if not value:
-        return None
-    try:
-        return date.fromisoformat(str(value))
-    except (ValueError, TypeError):
-        return None
-
-
-def _to_decimal(value) -> Optional[Decimal]:
-    if value is None:
-        return None
-    try:
-        cleaned = str(value).replace(",", "").replace("¥", "").replace("円", "").strip()
-        return Decimal(cleaned)
-    except Exception:
-        return None
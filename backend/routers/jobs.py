@@ -0,0 +1,66 @@
+from __future__ import annotations
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func as sqlfunc
+
+from database import get_db
+from models.extraction_job import ExtractionJob
+from schemas.job import ExtractionJobOut
+from services.auth_service import get_current_user, require_role
+from services.job_queue import requeue_job, notify_workers
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("", response_model=list[ExtractionJobOut])
+def list_jobs(
+    invoice_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    q = db.query(ExtractionJob)
+    if invoice_id:
+        q = q.filter(ExtractionJob.invoice_id == invoice_id)
+    if status:
+        q = q.filter(ExtractionJob.status == status)
+    return q.order_by(ExtractionJob.id.desc()).limit(limit).all()
+
+
+@router.get("/summary")
+def job_summary(db: Session = Depends(get_db), _=Depends(get_current_user)):
+    counts = dict(
+        db.query(ExtractionJob.status, sqlfunc.count(ExtractionJob.id))
+        .group_by(ExtractionJob.status)
+        .all()
+    )
+    return {status: counts.get(status, 0) for status in ("queued", "running", "succeeded", "failed")}
+
+
+@router.get("/{job_id}", response_model=ExtractionJobOut)
+def get_job(job_id: int, db: Session = Depends(get_db), _=Depends(get_current_user)):
+    job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.post("/{job_id}/retry", response_model=ExtractionJobOut)
+def retry_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    _=Depends(require_role("admin", "accountant")),
+):
+    job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    if job.status != "failed":
+        raise HTTPException(status_code=400, detail=f"現在のステータス({job.status})では再実行できません")
+    requeue_job(db, job)
+    db.commit()
+    notify_workers()
+    db.refresh(job)
+    return job
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+
+from services.auth_service import require_role
+from services import extraction_cache, nta_cache, nta_registry, ocr_service
+from services.rate_limiter import openai_scheduler
+from services.nta_api_service import nta_scheduler
+from services.scheduler import scheduler
+from services.http_clients import http_clients
+
+router = APIRouter(prefix="/api/system", tags=["system"])
+
+
+@router.get("/extraction-cache")
+def extraction_cache_stats(_=Depends(require_role("admin"))):
+    return extraction_cache.cache_stats()
+
+
+@router.post("/extraction-cache/prune")
+def prune_extraction_cache(_=Depends(require_role("admin"))):
+    removed = extraction_cache.prune()
+    extraction_cache.clear_memory()
+    return {"ok": True, "removed": removed}
+
+
+@router.get("/nta-cache")
+def nta_cache_stats(_=Depends(require_role("admin"))):
+    return nta_cache.cache_stats()
+
+
+@router.post("/nta-cache/prune")
+def prune_nta_cache(_=Depends(require_role("admin"))):
+    removed = nta_cache.prune()
+    nta_cache.clear_memory()
+    return {"ok": True, "removed": removed}
+
+
+@router.get("/nta-registry")
+def nta_registry_stats(_=Depends(require_role("admin"))):
+    return nta_registry.registry_stats()
+
+
+@router.get("/ocr")
+def ocr_cascade_stats(_=Depends(require_role("admin"))):
+    return ocr_service.cascade_stats()
+
+
+@router.get("/outbound")
+def outbound_stats(_=Depends(require_role("admin"))):
+    return {
+        "schedulers": {"openai": openai_scheduler.stats(), "nta": nta_scheduler.stats()},
+        "http": http_clients.stats(),
+    }
+
+
+@router.get("/tasks")
+def list_tasks(_=Depends(require_role("admin"))):
+    return scheduler.status()
+
+
+@router.post("/tasks/{name}/run", status_code=202)
+def run_task(name: str, background: BackgroundTasks, _=Depends(require_role("admin"))):
+    if name not in scheduler.tasks:
+        raise HTTPException(status_code=404, detail="タスクが見つかりません")
+    background.add_task(scheduler.run_now, name)
+    return {"ok": True, "task": name}
@@ -3,8 +3,12 @@ from schemas.user import UserCreate, UserUpdate, UserOut
 from schemas.department import DepartmentCreate, DepartmentUpdate, DepartmentOut
 from schemas.vendor import VendorCreate, VendorUpdate, VendorOut
 from schemas.invoice import (
-    InvoiceOut, InvoiceUpdate, InvoiceListOut,
+    InvoiceOut, InvoiceUpdate, InvoiceListOut, InvoiceListItemOut,
+    InvoiceSearchOut, InvoiceSearchHit,
+    InvoiceBulkTransitionRequest, InvoiceBulkTransitionOut, InvoiceBulkSkipped,
     InvoiceBankAccountOut, InvoiceDetailOut,
     BankAccountUpdate, InvoiceDetailUpdate,
 )
-from schemas.compliance import ComplianceCheckResult, NTAVerificationResult
+from schemas.compliance import ComplianceCheckResult, NTAVerificationResult, ComplianceRecheckRequest
+from schemas.job import ExtractionJobOut
+from schemas.audit import AuditLogOut, AuditLogListOut, AuditArchiveOut
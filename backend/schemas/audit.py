@@ -0,0 +1,37 @@
+from __future__ import annotations
+from typing import Optional
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class AuditLogOut(BaseModel):
+    id: int
+    user_id: Optional[int]
+    entity_type: str
+    entity_id: int
+    action: str
+    old_values: Optional[dict]
+    new_values: Optional[dict]
+    ip_address: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogListOut(BaseModel):
+    items: list[AuditLogOut]
+    next_cursor: Optional[str] = None
+
+
+class AuditArchiveOut(BaseModel):
+    month: str
+    partition: str
+    file: str
+    rows: int
+    bytes: int
+    sha256: str
+    newest_created_at: Optional[datetime]
+    oldest_created_at: Optional[datetime]
+    archived_at: datetime
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from typing import Optional
 
-from pydantic import BaseModel
+from datetime import date
+from pydantic import BaseModel, Field
 
 
 class NTAVerificationResult(BaseModel):
@@ -24,3 +25,13 @@ class ComplianceCheckResult(BaseModel):
     registration_valid: Optional[bool] = None
     missing_items: list[str] = []
     passed: bool = False
+
+
+class ComplianceRecheckRequest(BaseModel):
+    status: Optional[list[str]] = None
+    invoice_registration_status: Optional[list[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    invoice_ids: Optional[list[int]] = None
+    limit: Optional[int] = Field(None, ge=1)
+    update_vendors: bool = True
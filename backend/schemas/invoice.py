@@ -3,7 +3,7 @@ from typing import Optional
 
 from datetime import datetime, date
 from decimal import Decimal
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class InvoiceDetailOut(BaseModel):
@@ -18,6 +18,8 @@ class InvoiceDetailOut(BaseModel):
 
 
 class InvoiceDetailUpdate(BaseModel):
+    # 既存の明細の ID（省略した行は追加。どの行にも無ければ並び順で対応付ける）
+    id: Optional[int] = None
     description: Optional[str] = None
     amount: Optional[Decimal] = None
     tax: Optional[Decimal] = None
@@ -99,8 +101,82 @@ class InvoiceOut(BaseModel):
         from_attributes = True
 
 
+class InvoiceListItemOut(BaseModel):
+    """One row of the invoice list; extras are only present when requested via ``fields=``."""
+
+    id: int
+    invoice_number: Optional[str]
+    vendor_id: Optional[int]
+    department_id: Optional[int]
+    status: str
+    invoice_date: Optional[date]
+    due_date: Optional[date]
+    total_amount: Optional[Decimal]
+    original_filename: Optional[str]
+    source_type: str
+    invoice_registration_number: Optional[str]
+    invoice_registration_status: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    approved_at: Optional[datetime]
+    vendor_name: Optional[str] = None
+    department_name: Optional[str] = None
+
+    tax_amount: Optional[Decimal] = None
+    tax_8_amount: Optional[Decimal] = None
+    tax_10_amount: Optional[Decimal] = None
+    subtotal_amount: Optional[Decimal] = None
+    description: Optional[str] = None
+    recipient_name: Optional[str] = None
+    retention_until: Optional[date] = None
+    file_hash_sha256: Optional[str] = None
+    ai_raw_result: Optional[dict] = None
+    compliance_check_result: Optional[dict] = None
+    details: Optional[list[InvoiceDetailOut]] = None
+    bank_account: Optional[InvoiceBankAccountOut] = None
+
+
+INVOICE_LIST_EXTRA_FIELDS = (
+    "tax_amount", "tax_8_amount", "tax_10_amount", "subtotal_amount", "description", "recipient_name",
+    "retention_until", "file_hash_sha256", "ai_raw_result", "compliance_check_result", "details", "bank_account",
+)
+
+
+class InvoiceSearchHit(InvoiceListItemOut):
+    rank: float
+
+
+class InvoiceSearchOut(BaseModel):
+    query: str
+    items: list[InvoiceSearchHit]
+    # 一致が多すぎて一部だけを順位付けした（検索語を追加して絞り込む）
+    truncated: bool = False
+
+
 class InvoiceListOut(BaseModel):
-    items: list[InvoiceOut]
-    total: int
+    items: list[InvoiceListItemOut]
+    total: Optional[int]
+    total_is_estimate: bool = False
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
+
+
+class InvoiceBulkTransitionRequest(BaseModel):
+    action: str = Field(pattern="^(approve|reject)$")
+    invoice_ids: list[int] = Field(min_length=1)
+
+
+class InvoiceBulkSkipped(BaseModel):
+    id: int
+    # not_found: 存在しない・削除済み / invalid_status: 今のステータスでは変更できない /
+    # conflict: 処理中に他の操作がステータスを変更した
+    reason: str
+    status: Optional[str] = None
+
+
+class InvoiceBulkTransitionOut(BaseModel):
+    action: str
+    status: str
+    updated: list[int]
+    skipped: list[InvoiceBulkSkipped]
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from typing import Optional
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ExtractionJobOut(BaseModel):
+    id: int
+    invoice_id: int
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str]
+    run_after: Optional[datetime]
+    locked_by: Optional[str]
+    locked_at: Optional[datetime]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
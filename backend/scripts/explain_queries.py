@@ -0,0 +1,311 @@
+"""検索条件ごとの実行計画チェック -- 追加したインデックスが実際に使われることを確かめる
+
+DATABASE_URL のデータベースをマイグレーションで最新にし、合成データ（請求書・監査ログ）を投入して
+ANALYZE したうえで、各エンドポイント・サービス関数が発行した SQL をそのままのパラメータで
+EXPLAIN する。対象テーブルを全件走査（Seq Scan）した場合や、想定したインデックスの
+どれも使われなかった場合は終了コード 1 を返す。投入したデータは終了時に削除する。
+
+一覧は count=none で確認する（count=exact は条件に合う行をすべて数えるため全件走査になりうる）。
+ダッシュボードは集計表（invoice_rollups）を読むため、請求書を読まないことを確認する。
+監査ログは月別パーティションなので、各パーティションの計画を親テーブル・親インデックスの名前で数える
+（空のパーティションの Seq Scan は読むページが無いので除く）。
+
+    python scripts/explain_queries.py --invoices 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, select, text  # noqa: E402
+
+MARKER = "explain-queries"
+
+
+@dataclass
+class Case:
+    name: str
+    call: Callable
+    table: str
+    # どれか1つが計画に現れればよい。空なら table を読まないこと
+    indexes: set[str] = field(default_factory=set)
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements: list[tuple[str, object]] = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+
+def touches(statement: str, table: str) -> bool:
+    return re.search(rf"\b(FROM|JOIN)\s+{table}\b", statement) is not None
+
+
+def partition_layout(engine) -> tuple[dict[str, str], set[str]]:
+    """``(roots, empty)``: partition and partition-index names mapped to their partitioned parent,
+    and the partitions that have no pages (e.g. the months ahead)."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT relname, pg_partition_root(oid)::regclass::text, relkind = 'r' AND relpages = 0
+            FROM pg_class WHERE relispartition
+        """)).all()
+    return {name: root for name, root, _ in rows}, {name for name, _, empty in rows if empty}
+
+
+def plan_nodes(plan: dict, table: str, roots: dict[str, str], empty: set[str]) -> list[tuple[str, str]]:
+    """``(node type, index name)`` for every plan node that reads ``table`` (or one of its partitions).
+
+    Index names on partitions are reported as the parent's index name. A Seq Scan of an empty
+    partition reads nothing and is left out.
+    """
+    found = []
+    relation = plan.get("Relation Name")
+    skipped = plan["Node Type"] == "Seq Scan" and relation in empty
+    if relation is not None and roots.get(relation, relation) == table and not skipped:
+        index = plan.get("Index Name", "")
+        found.append((plan["Node Type"], roots.get(index, index)))
+        if plan["Node Type"] == "Bitmap Heap Scan":
+            # Bitmap Index Scan（BitmapAnd/Or の下を含む）にはテーブル名が付かない
+            found += [("Bitmap Index Scan", roots.get(name, name)) for name in _bitmap_indexes(plan)]
+    for child in plan.get("Plans", []):
+        found += plan_nodes(child, table, roots, empty)
+    return found
+
+
+def _bitmap_indexes(plan: dict) -> list[str]:
+    names = []
+    for child in plan.get("Plans", []):
+        if child["Node Type"] == "Bitmap Index Scan":
+            names.append(child["Index Name"])
+        elif child["Node Type"] in ("BitmapAnd", "BitmapOr"):
+            names += _bitmap_indexes(child)
+    return names
+
+
+def explain(engine, statement: str, parameters) -> dict:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        value = cursor.fetchone()[0]
+        return (json.loads(value) if isinstance(value, str) else value)[0]["Plan"]
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def seed(db, n: int) -> dict:
+    from services.audit_partitions import ensure_partitions
+
+    db.execute(text("""
+        INSERT INTO departments (name, code, is_active)
+        SELECT :marker || '-' || g, :marker || '-' || g, true FROM generate_series(1, 30) AS g
+    """), {"marker": MARKER})
+    db.execute(text("""
+        INSERT INTO vendors (name) SELECT '取引先' || g || ' ' || :marker FROM generate_series(1, 200) AS g
+    """), {"marker": MARKER})
+    # 実データに近い偏り: ステータスは振込済みが大半で処理待ちは数 %、部署は 30。
+    # 登録番号の確認状態は valid が大半、unchecked / 未確認(NULL) / invalid が 5% ずつ。削除済みは 4%
+    db.execute(text("""
+        INSERT INTO invoices (
+            invoice_number, vendor_id, department_id, status, invoice_date, due_date, total_amount,
+            invoice_registration_number, invoice_registration_status, ai_raw_result, is_deleted,
+            source_type, original_filename, created_at
+        )
+        SELECT 'X-' || g,
+               (SELECT array_agg(id ORDER BY id) FROM vendors WHERE name LIKE '%' || :marker)[1 + g % 200],
+               (SELECT array_agg(id ORDER BY id) FROM departments WHERE code LIKE :marker || '-%')[1 + g % 30],
+               CASE WHEN g % 100 < 70 THEN 'transferred' WHEN g % 100 < 85 THEN 'approved'
+                    WHEN g % 100 < 93 THEN 'reviewed' WHEN g % 100 < 97 THEN 'ai_processed'
+                    WHEN g % 100 < 99 THEN 'uploaded' ELSE 'rejected' END,
+               DATE '2022-01-01' + g % 1095, DATE '2022-01-31' + g % 1095, 1000 + g % 100000,
+               'T' || lpad((g % 50000)::text, 13, '0'),
+               CASE g % 20 WHEN 0 THEN 'unchecked' WHEN 1 THEN NULL WHEN 2 THEN 'invalid' ELSE 'valid' END,
+               CASE WHEN g % 10 = 0 THEN NULL ELSE '{}'::jsonb END,
+               g % 25 = 0, 'upload', :marker, now() - make_interval(secs => g * 60)
+        FROM generate_series(1, :n) AS g
+    """), {"marker": MARKER, "n": n})
+    # 監査ログは月別パーティション。投入する期間の月がすべてパーティションを持つようにしておく
+    ensure_partitions(start=db.execute(text("SELECT (now() - make_interval(secs => :n * 60))::date"), {"n": n}).scalar())
+    db.execute(text("""
+        INSERT INTO audit_logs (entity_type, entity_id, action, ip_address, created_at)
+        SELECT (ARRAY['invoice', 'vendor', 'compliance'])[1 + g % 3], g % :n, 'update', :marker,
+               now() - make_interval(secs => g * 60)
+        FROM generate_series(1, :n) AS g
+    """), {"marker": MARKER, "n": n})
+    db.commit()
+    department_id = db.execute(text("SELECT min(id) FROM departments WHERE code LIKE :m || '-%'"), {"m": MARKER}).scalar()
+    numbers = [f"T{i:013d}" for i in range(100, 600)]
+    return {"department_id": department_id, "numbers": numbers}
+
+
+def cleanup(db):
+    db.rollback()
+    db.execute(text("DELETE FROM audit_logs WHERE ip_address = :m"), {"m": MARKER})
+    db.execute(text("DELETE FROM invoices WHERE original_filename = :m"), {"m": MARKER})
+    db.execute(text("DELETE FROM vendors WHERE name LIKE '%' || :m"), {"m": MARKER})
+    db.execute(text("DELETE FROM departments WHERE code LIKE :m || '-%'"), {"m": MARKER})
+    db.commit()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=200000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("EXTRACTION_WORKERS", "0")
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import SessionLocal, engine
+    from models import Invoice, User
+    from schemas.compliance import ComplianceRecheckRequest
+    from services.auth_service import get_current_user
+    from services.compliance_recheck import _chunks, count_targets
+    from services.invoice_rollup import reconcile
+    from services.pagination import encode_cursor
+    from services.schema import upgrade_database
+
+    upgrade_database()
+    db = SessionLocal()
+    failures = []
+    try:
+        ctx = seed(db, args.invoices)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE invoices"))
+            conn.execute(text("VACUUM ANALYZE audit_logs"))
+        reconcile()
+
+        user = {"current": User(id=0, email="e@example.com", name="e", role="admin")}
+        app_main.app.dependency_overrides[get_current_user] = lambda: user["current"]
+        client = TestClient(app_main.app)
+
+        def as_department(call):
+            def run():
+                user["current"] = User(id=0, email="e@example.com", name="e", role="department",
+                                       department_id=ctx["department_id"])
+                try:
+                    return call()
+                finally:
+                    user["current"] = User(id=0, email="e@example.com", name="e", role="admin")
+            return run
+
+        deep = db.execute(text("""
+            SELECT created_at, id FROM invoices WHERE is_deleted IS false
+            ORDER BY created_at DESC, id DESC OFFSET 5000 LIMIT 1
+        """)).one()
+        db.rollback()
+        cursor = encode_cursor(deep.created_at, deep.id)
+        deep = db.execute(text("SELECT created_at, id FROM audit_logs ORDER BY created_at DESC, id DESC OFFSET 50000 LIMIT 1")).one()
+        db.rollback()
+        audit_cursor = encode_cursor(deep.created_at, deep.id)
+
+        def get(path: str, **params):
+            return lambda: client.get(path, params=params).raise_for_status()
+
+        def recheck(**body):
+            request = ComplianceRecheckRequest(**body)
+
+            def run():
+                count_targets(db, request)
+                next(_chunks(db, request), None)
+                db.rollback()
+            return run
+
+        def revalidation_targets():
+            # vendor_revalidation の UPDATE と同じ条件（登録番号の IN と削除済みの除外）
+            db.execute(select(Invoice.id).where(
+                Invoice.invoice_registration_number.in_(ctx["numbers"]), Invoice.is_deleted.is_(False),
+            )).all()
+            db.rollback()
+
+        live = "ix_invoices_live_created_at"
+        cases = [
+            Case("list: newest first", get("/api/invoices", count="none"), "invoices", {live}),
+            Case("list: cursor page", get("/api/invoices", count="none", cursor=cursor), "invoices", {live}),
+            Case("list: department user", as_department(get("/api/invoices", count="none")), "invoices",
+                 {"ix_invoices_live_department_created_at"}),
+            Case("list: department filter", get("/api/invoices", count="none", department_id=ctx["department_id"]),
+                 "invoices", {"ix_invoices_live_department_created_at"}),
+            Case("list: status filter", get("/api/invoices", count="none", status="ai_processed"), "invoices",
+                 {"ix_invoices_live_status_created_at"}),
+            Case("list: invoice date range",
+                 get("/api/invoices", count="none", date_from="2023-03-01", date_to="2023-03-07"), "invoices",
+                 {"ix_invoices_live_invoice_date", live}),
+            Case("list: vendor name", get("/api/invoices", count="none", vendor_name="取引先17 "), "invoices",
+                 {"ix_invoices_vendor_id", live}),
+            Case("recheck: unchecked", recheck(invoice_registration_status=["unchecked"]), "invoices",
+                 {"ix_invoices_recheck_registration_status"}),
+            Case("recheck: invalid", recheck(invoice_registration_status=["invalid"]), "invoices",
+                 {"ix_invoices_recheck_registration_status"}),
+            Case("recheck: date range", recheck(date_from="2023-03-01", date_to="2023-03-07"), "invoices",
+                 {"ix_invoices_live_invoice_date"}),
+            Case("vendor revalidation", revalidation_targets, "invoices", {"ix_invoices_live_registration_number"}),
+            Case("dashboard summary", get("/api/dashboard/summary"), "invoices"),
+            Case("compliance dashboard", get("/api/compliance/dashboard"), "invoices"),
+            Case("audit: entity history", get("/api/audit", entity_type="invoice", entity_id=42), "audit_logs",
+                 {"ix_audit_logs_entity_created_at"}),
+            Case("audit: newest first", get("/api/audit"), "audit_logs", {"ix_audit_logs_created_at_id"}),
+            Case("audit: cursor page", get("/api/audit", cursor=audit_cursor), "audit_logs",
+                 {"ix_audit_logs_created_at_id"}),
+        ]
+
+        roots, empty = partition_layout(engine)
+        recorder = StatementRecorder()
+        event.listen(engine, "before_cursor_execute", recorder)
+        try:
+            for case in cases:
+                recorder.statements = []
+                recorder.active = True
+                try:
+                    case.call()
+                finally:
+                    recorder.active = False
+                statements = [(s, p) for s, p in recorder.statements if touches(s, case.table)]
+
+                if not case.indexes:
+                    status = "ok" if not statements else "FAIL"
+                    print(f"{case.name:<28} {'(does not read ' + case.table + ')':<44} {status}")
+                    if statements:
+                        failures.append(f"{case.name}: reads {case.table}")
+                    continue
+                if not statements:
+                    failures.append(f"{case.name}: no statement read {case.table}")
+                    continue
+
+                used = []
+                for statement, parameters in statements:
+                    used += plan_nodes(explain(engine, statement, parameters), case.table, roots, empty)
+                indexes = sorted({name for _, name in used if name})
+                seq = any(node == "Seq Scan" for node, _ in used)
+                status = "ok" if not seq and case.indexes & set(indexes) else "FAIL"
+                print(f"{case.name:<28} {', '.join(indexes) or '-':<44} {status}")
+                if status != "ok":
+                    failures.append(f"{case.name}: {'Seq Scan, ' if seq else ''}used {indexes or 'no index'},"
+                                    f" expected one of {sorted(case.indexes)}")
+        finally:
+            event.remove(engine, "before_cursor_execute", recorder)
+    finally:
+        cleanup(db)
+        db.close()
+        reconcile()
+
+    for failure in failures:
+        print("FAIL:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""国税庁 公表情報（全件・差分）の取込
+
+    # 全件データで置き換え
+    python scripts/import_nta_registry.py snapshot zenken_all_20240401.zip
+    # 差分データを日付順に適用
+    python scripts/import_nta_registry.py diff sabun_20240402.zip sabun_20240403.zip
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import nta_registry  # noqa: E402
+from services.schema import upgrade_database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("kind", choices=["snapshot", "diff"])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--encoding", default="utf-8", help="utf-8 or sjis")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade_database()
+
+    if args.kind == "snapshot":
+        if len(args.files) != 1:
+            sys.exit("snapshot takes exactly one file")
+        print(json.dumps(nta_registry.import_snapshot(args.files[0], args.encoding), ensure_ascii=False))
+        return
+    for path in sorted(args.files):
+        print(json.dumps({"file": path, **nta_registry.apply_diff(path, args.encoding)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
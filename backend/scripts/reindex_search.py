@@ -0,0 +1,28 @@
+"""請求書の全文検索用文書の作り直し（既存データの初回投入・分割規則の変更後）
+
+    python scripts/reindex_search.py
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import search_index  # noqa: E402
+from services.schema import upgrade_database  # noqa: E402
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    upgrade_database()
+    started = time.perf_counter()
+    total = search_index.reindex_all()
+    print(f"reindexed {total} invoices in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
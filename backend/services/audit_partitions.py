@@ -0,0 +1,320 @@
+"""監査ログの月別パーティションとアーカイブ -- 古い月はパーティションごと圧縮ファイルへ移す
+
+audit_logs は created_at で月ごと（UTC の月初から翌月初まで）に RANGE パーティション分割している。
+パーティションは audit_logs_YYYYMM、どの月にも入らない行は audit_logs_default が受ける。
+
+- ``ensure_partitions``: 今月から AUDIT_PARTITION_MONTHS_AHEAD か月先までのパーティションを作る。
+  既定パーティションに入っていたその月の行は新しいパーティションへ移す
+- ``archive_partitions``: AUDIT_ARCHIVE_AFTER_MONTHS か月より前の月の行を新しい順に gzip の
+  JSON Lines へ書き出し、読み戻して件数と SHA-256 を確かめてからパーティションを DETACH・DROP する。
+  書き出しから DROP までは1トランザクションで、その間そのパーティションへの書き込みはロックで止める。
+  manifest.json には DROP の前に pending として記録し、コミット後に archived へ確定する
+  （DETACH が失敗すれば取り消す。途中で止まった pending は次回の実行でパーティションの有無から確定・取り消す）
+- ``read_archive``: チェックサムを確かめてからアーカイブを読み、条件に合う行を返す
+
+アーカイブは電子帳簿保存法の保存期間中の記録なので、このモジュールはファイルを削除しない。
+"""
+
+from __future__ import annotations
+from typing import Iterator, Optional
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import date, datetime, timezone
+
+from sqlalchemy import select, text
+
+from config import settings
+from database import engine
+from models.audit_log import AuditLog
+from services.pagination import encode_cursor
+
+PARTITION_PREFIX = "audit_logs_"
+DEFAULT_PARTITION = "audit_logs_default"
+MANIFEST = "manifest.json"
+_PARTITION_RE = re.compile(r"^audit_logs_(\d{6}|default)$")
+
+
+class ArchiveNotFoundError(LookupError):
+    pass
+
+
+class ArchiveIntegrityError(ValueError):
+    """The archive file no longer matches the checksum recorded in the manifest."""
+
+
+def is_partition_table(name: str) -> bool:
+    return _PARTITION_RE.match(name) is not None
+
+
+def add_months(month: date, n: int) -> date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def _current_month() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def list_partitions(conn) -> list[date]:
+    """Months that currently have an attached partition (the default partition excluded)."""
+    names = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass
+    """)).scalars().all()
+    return sorted(
+        date(int(name[-6:-2]), int(name[-2:]), 1)
+        for name in names if is_partition_table(name) and name != DEFAULT_PARTITION
+    )
+
+
+def ensure_partitions(start: Optional[date] = None, months_ahead: Optional[int] = None) -> dict:
+    """Create the missing monthly partitions from ``start`` (default: this month) to a few months ahead."""
+    ahead = settings.AUDIT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = _current_month()
+    month = start.replace(day=1) if start else current
+    last = add_months(current, ahead)
+    created, moved = [], 0
+    with engine.connect() as conn:
+        existing = set(list_partitions(conn))
+        conn.rollback()
+        while month <= last:
+            if month not in existing:
+                moved += _create_partition(conn, month)
+                conn.commit()
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return {"created": created, "moved_rows": moved}
+
+
+def _create_partition(conn, month: date) -> int:
+    name = partition_name(month)
+    lo, hi = _bound(month), _bound(add_months(month, 1))
+    # ATTACH は既定パーティションにその月の行が無いことを確かめるため、先に書き込みを止めて行を移す
+    conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :lo AND created_at < :hi RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"lo": lo, "hi": hi}).rowcount
+    conn.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    return moved
+
+
+def _archive_dir() -> str:
+    return settings.AUDIT_ARCHIVE_DIR
+
+
+def load_manifest() -> dict[str, dict]:
+    """Archived months keyed by partition name."""
+    path = os.path.join(_archive_dir(), MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {entry["partition"]: entry for entry in json.load(f)["archives"]}
+
+
+def list_archives() -> list[dict]:
+    """Manifest entries of the months whose partition has been dropped, oldest first."""
+    return [e for e in load_manifest().values() if e.get("status", "archived") == "archived"]
+
+
+def _save_manifest(entries: dict[str, dict]):
+    path = os.path.join(_archive_dir(), MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"archives": [entries[k] for k in sorted(entries)]}, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _put_manifest_entry(entry: dict):
+    entries = load_manifest()
+    entries[entry["partition"]] = entry
+    _save_manifest(entries)
+
+
+def _discard_manifest_entry(name: str):
+    entries = load_manifest()
+    if entries.pop(name, None) is not None:
+        _save_manifest(entries)
+
+
+def _settle_pending(conn):
+    """Finish entries left pending by an interrupted run: archived if the partition is gone, else discarded."""
+    pending = [e for e in load_manifest().values() if e.get("status") == "pending"]
+    if not pending:
+        return
+    attached = {partition_name(m) for m in list_partitions(conn)}
+    for entry in pending:
+        if entry["partition"] in attached:
+            _discard_manifest_entry(entry["partition"])
+        else:
+            _put_manifest_entry({**entry, "status": "archived"})
+
+
+def _row(row) -> dict:
+    values = dict(row._mapping)
+    values["created_at"] = values["created_at"].isoformat()
+    return values
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _count_lines(path: str) -> int:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def archive_partitions(older_than_months: Optional[int] = None) -> dict:
+    """Archive and drop every monthly partition older than ``older_than_months`` (0 disables)."""
+    months = settings.AUDIT_ARCHIVE_AFTER_MONTHS if older_than_months is None else older_than_months
+    if months <= 0:
+        return {"archived": [], "rows": 0}
+    cutoff = add_months(_current_month(), -months)
+    with engine.connect() as conn:
+        _settle_pending(conn)
+        targets = [m for m in list_partitions(conn) if m < cutoff]
+    archived = [archive_partition(month) for month in targets]
+    return {"archived": [a["partition"] for a in archived], "rows": sum(a["rows"] for a in archived)}
+
+
+def archive_partition(month: date) -> dict:
+    """Write one month to ``audit_logs_YYYYMM.jsonl.gz``, verify it, record it and drop the partition."""
+    name = partition_name(month)
+    os.makedirs(_archive_dir(), exist_ok=True)
+    filename = f"{name}.jsonl.gz"
+    path = os.path.join(_archive_dir(), filename)
+    tmp = path + ".tmp"
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # 書き出した行と DROP する行が一致するよう、コミットまでこのパーティションへの書き込みを止める
+        conn.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        rows = 0
+        first = last = None
+        result = conn.execute(
+            select(AuditLog.__table__)
+            .where(AuditLog.created_at >= _bound(month), AuditLog.created_at < _bound(add_months(month, 1)))
+            .order_by(AuditLog.created_at.desc(), AuditLog.id.desc()),
+            execution_options={"yield_per": settings.EXPORT_BATCH_SIZE},
+        )
+        with open(tmp, "wb") as raw:
+            # mtime=0: 同じ行からは同じファイル（同じチェックサム）になる
+            with gzip.GzipFile(filename=filename[:-3], mode="wb", fileobj=raw, mtime=0) as gz:
+                for row in result:
+                    values = _row(row)
+                    gz.write(json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+                    rows += 1
+                    first = first or values["created_at"]
+                    last = values["created_at"]
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        # 読み戻して件数を確かめてから記録する（DROP するとデータベースには残らない）
+        if _count_lines(tmp) != rows:
+            raise ArchiveIntegrityError(f"{filename}: row count mismatch after writing")
+        os.replace(tmp, path)
+        entry = {
+            "partition": name,
+            "month": f"{month:%Y-%m}",
+            "file": filename,
+            "rows": rows,
+            "bytes": os.path.getsize(path),
+            "sha256": _sha256(path),
+            "newest_created_at": first,
+            "oldest_created_at": last,
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "status": "pending",
+        }
+        # コミット直後に止まってもファイルの記録が残るよう、DROP の前に pending として記録しておく
+        _put_manifest_entry(entry)
+
+        try:
+            # DETACH は親テーブルを排他ロックするため、待たされるなら諦めて次回に回す（ファイルは同じ内容で作り直される）
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _discard_manifest_entry(name)
+            raise
+    entry["status"] = "archived"
+    _put_manifest_entry(entry)
+    return {**entry, "seconds": round(time.perf_counter() - started, 1)}
+
+
+def maintain() -> dict:
+    """Scheduled job: create upcoming partitions, then archive the old ones."""
+    return {"partitions": ensure_partitions(), "archives": archive_partitions()}
+
+
+def get_archive(month: str) -> dict:
+    """Manifest entry for ``YYYY-MM``; raises ArchiveNotFoundError."""
+    for entry in list_archives():
+        if entry["month"] == month:
+            return entry
+    raise ArchiveNotFoundError(month)
+
+
+def verify_archive(entry: dict):
+    path = os.path.join(_archive_dir(), entry["file"])
+    if not os.path.exists(path):
+        raise ArchiveNotFoundError(entry["month"])
+    if _sha256(path) != entry["sha256"]:
+        raise ArchiveIntegrityError(f"{entry['file']}: sha256 mismatch")
+
+
+def _archived_rows(entry: dict) -> Iterator[dict]:
+    with gzip.open(os.path.join(_archive_dir(), entry["file"]), "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def read_archive(
+    month: str,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, int]] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """Newest-first page of an archived month, in the same shape and cursor format as ``/api/audit``."""
+    entry = get_archive(month)
+    verify_archive(entry)
+    items = []
+    for row in _archived_rows(entry):
+        if entity_type and row["entity_type"] != entity_type:
+            continue
+        if entity_id is not None and row["entity_id"] != entity_id:
+            continue
+        if cursor and (datetime.fromisoformat(row["created_at"]), row["id"]) >= cursor:
+            continue
+        items.append(row)
+        if len(items) == limit:
+            break
+    next_cursor = (
+        encode_cursor(datetime.fromisoformat(items[-1]["created_at"]), items[-1]["id"])
+        if len(items) == limit else None
+    )
+    return items, next_cursor
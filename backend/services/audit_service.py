@@ -1,8 +1,21 @@
+"""監査ログ -- 記録はトランザクション内でためておき、コミット直前に複数行の INSERT でまとめて書く
+
+``log_action`` は行を ``Session.info`` に積むだけで SQL を発行しない。コミット直前
+（``before_commit``）に積んだ順のまま1つの INSERT（AUDIT_INSERT_CHUNK 行ごと）で書くため、
+ID の順は記録順と一致し、監査ログは変更と同じトランザクションでコミットされる。
+ロールバック・コミット失敗時は積んだ分を捨てる。
+"""
+
 from __future__ import annotations
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import event, insert, tuple_
+from sqlalchemy.orm import Session, SessionTransaction
 from models.audit_log import AuditLog
+from services.pagination import decode_cursor, encode_cursor
+
+AUDIT_INSERT_CHUNK = 1000
+_PENDING_KEY = "audit_pending"
 
 
 def log_action(
@@ -16,18 +29,46 @@ def log_action(
     new_values: Optional[dict] = None,
     ip_address: Optional[str] = None,
 ):
-    entry = AuditLog(
-        user_id=user_id,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        action=action,
-        old_values=old_values,
-        new_values=new_values,
-        ip_address=ip_address,
-    )
-    db.add(entry)
-    db.flush()
-    return entry
+    """Record an audit entry; it is written with the transaction's other entries at commit."""
+    log_actions(db, [{
+        "user_id": user_id,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "action": action,
+        "old_values": old_values,
+        "new_values": new_values,
+        "ip_address": ip_address,
+    }])
+
+
+def log_actions(db: Session, entries: list[dict]):
+    """Record many entries at once (each entry has every ``log_action`` field)."""
+    if entries:
+        if not db.in_transaction():
+            db.begin()  # 積んだ行をこのトランザクションの終わりで必ず片付けるため
+        db.info.setdefault(_PENDING_KEY, []).extend(entries)
+
+
+def write_pending(db: Session) -> int:
+    """Insert the entries recorded so far now (normally done by the commit)."""
+    entries = db.info.pop(_PENDING_KEY, None)
+    if not entries:
+        return 0
+    conn = db.connection()
+    for i in range(0, len(entries), AUDIT_INSERT_CHUNK):
+        # 複数行の VALUES は記述順に採番されるため、ID の順が記録順になる
+        conn.execute(insert(AuditLog).values(entries[i:i + AUDIT_INSERT_CHUNK]))
+    return len(entries)
+
+
+def _after_transaction_end(session: Session, transaction: SessionTransaction):
+    # コミットで書かれなかった分（ロールバック・close・コミット失敗）を次のトランザクションへ持ち越さない
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+event.listen(Session, "before_commit", write_pending)
+event.listen(Session, "after_transaction_end", _after_transaction_end)
 
 
 def get_audit_logs(
@@ -35,11 +76,21 @@ def get_audit_logs(
     entity_type: Optional[str] = None,
     entity_id: Optional[int] = None,
     limit: int = 100,
-    offset: int = 0,
-):
+    cursor: Optional[str] = None,
+) -> tuple[list[AuditLog], Optional[str]]:
+    """Newest first, ``limit`` per page; returns ``(logs, next_cursor)``.
+
+    ``cursor`` is the previous page's ``next_cursor`` (raises InvalidCursorError if malformed).
+    The (created_at, id) keyset lets each partition's index stop after ``limit`` rows.
+    """
     q = db.query(AuditLog)
     if entity_type:
         q = q.filter(AuditLog.entity_type == entity_type)
-    if entity_id:
+    if entity_id is not None:
         q = q.filter(AuditLog.entity_id == entity_id)
-    return q.order_by(AuditLog.created_at.desc()).offset(offset).limit(limit).all()
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        q = q.filter(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(created_at, last_id))
+    logs = q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit).all()
+    next_cursor = encode_cursor(logs[-1].created_at, logs[-1].id) if len(logs) == limit else None
+    return logs, next_cursor
@@ -0,0 +1,178 @@
+"""コンプライアンス一括再チェック -- 条件に合う請求書をまとめて再判定し、進捗を逐次返す
+
+ルール変更や国税庁APIの障害後に、未確認の請求書をまとめて再チェックするために使う。
+請求書をID順にチャンク単位で読み、チャンク内の登録番号を重複なく一括照会してから判定し、
+結果はチャンクごとにまとめて UPDATE する。次のチャンクの登録番号照会は、
+現在のチャンクの判定・書き込みと並行して進める。照会に失敗した（通信エラー・5xx・429）番号の
+請求書と取引先は更新せず、``lookup_errors`` に数える。
+"""
+
+from __future__ import annotations
+from typing import Iterator, Optional
+
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.invoice import Invoice
+from models.vendor import Vendor
+from schemas.compliance import ComplianceRecheckRequest, NTAVerificationResult
+from services import invoice_rollup
+from services.audit_service import log_action
+from services.compliance_service import check_invoice_compliance, registration_status
+from services.nta_api_service import is_definitive, normalize_registration_number, verify_registration_numbers
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+def build_filter(body: ComplianceRecheckRequest) -> list:
+    conditions = [Invoice.is_deleted.is_(False), Invoice.ai_raw_result.isnot(None)]
+    if body.invoice_ids:
+        conditions.append(Invoice.id.in_(body.invoice_ids))
+    if body.status:
+        conditions.append(Invoice.status.in_(body.status))
+    if body.invoice_registration_status:
+        statuses = [s for s in body.invoice_registration_status if s != "unchecked"]
+        clauses = [Invoice.invoice_registration_status.in_(statuses)] if statuses else []
+        if "unchecked" in body.invoice_registration_status:
+            clauses += [Invoice.invoice_registration_status == "unchecked", Invoice.invoice_registration_status.is_(None)]
+        conditions.append(or_(*clauses))
+    if body.date_from:
+        conditions.append(Invoice.invoice_date >= body.date_from)
+    if body.date_to:
+        conditions.append(Invoice.invoice_date <= body.date_to)
+    return conditions
+
+
+def count_targets(db: Session, body: ComplianceRecheckRequest) -> int:
+    total = db.query(Invoice).filter(*build_filter(body)).count()
+    return min(total, body.limit) if body.limit else total
+
+
+def run_recheck(body: ComplianceRecheckRequest, user_id: Optional[int], ip_address: Optional[str] = None) -> Iterator[dict]:
+    """Yield ``start`` / ``progress`` (one per chunk) / ``done`` events while re-checking."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recheck-prefetch")
+    try:
+        total = count_targets(db, body)
+        db.rollback()
+        yield {"type": "start", "total": total}
+
+        totals = {"processed": 0, "passed": 0, "failed": 0, "valid": 0, "invalid": 0, "unchecked": 0, "lookup_errors": 0}
+        chunks = _chunks(db, body)
+        current = next(chunks, None)
+        pending: Optional[Future] = prefetch.submit(_lookup, current) if current else None
+
+        while current:
+            nta = pending.result()
+            upcoming = next(chunks, None)
+            pending = prefetch.submit(_lookup, upcoming) if upcoming else None
+
+            _apply(db, current, nta, body.update_vendors, totals)
+            db.commit()
+            totals["processed"] += len(current)
+            yield {"type": "progress", "total": total, **totals}
+            current = upcoming
+
+        log_action(
+            db,
+            user_id=user_id,
+            entity_type="compliance",
+            entity_id=0,
+            action="bulk_recheck",
+            new_values={"filter": body.model_dump(mode="json"), **totals},
+            ip_address=ip_address,
+        )
+        db.commit()
+        yield {"type": "done", "total": total, **totals, "seconds": round(time.perf_counter() - started, 1)}
+    except Exception as e:
+        logger.exception("bulk compliance re-check failed")
+        db.rollback()
+        yield {"type": "error", "detail": str(e)}
+    finally:
+        prefetch.shutdown(wait=False, cancel_futures=True)
+        db.close()
+
+
+def _chunks(db: Session, body: ComplianceRecheckRequest) -> Iterator[list]:
+    """Keyset-paginate the targets by id so each chunk is a short, independent query."""
+    conditions = build_filter(body)
+    last_id = 0
+    remaining = body.limit
+    while remaining is None or remaining > 0:
+        size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+        rows = db.execute(
+            select(
+                Invoice.id, Invoice.vendor_id, Invoice.invoice_registration_number, Invoice.ai_raw_result,
+                *invoice_rollup.state_columns(),
+            )
+            .where(*conditions, Invoice.id > last_id)
+            .order_by(Invoice.id)
+            .limit(size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        if remaining is not None:
+            remaining -= len(rows)
+        yield rows
+
+
+def _lookup(rows: list) -> dict[str, NTAVerificationResult]:
+    numbers = {_registration_number(r) for r in rows} - {None}
+    return verify_registration_numbers(sorted(numbers)) if numbers else {}
+
+
+def _registration_number(row) -> Optional[str]:
+    raw = (row.ai_raw_result or {}).get("invoice_registration_number")
+    return normalize_registration_number(raw) if raw else None
+
+
+def _apply(db: Session, rows: list, nta: dict[str, NTAVerificationResult], update_vendors: bool, totals: dict):
+    now = datetime.now(timezone.utc)
+    invoice_updates = []
+    transitions = []
+    vendor_updates: dict[int, dict] = {}
+    for row in rows:
+        number = _registration_number(row)
+        lookup = nta.get(number) if number else None
+        if lookup is not None and not is_definitive(lookup):
+            # 照会できなかった番号で保存済みの判定を上書きしない（障害時に全件が無効になるのを防ぐ）
+            totals["lookup_errors"] += 1
+            continue
+        result = check_invoice_compliance(row.ai_raw_result, lookup)
+        status = registration_status(result)
+        invoice_updates.append({
+            "id": row.id,
+            "compliance_check_result": result.model_dump(),
+            "invoice_registration_status": status,
+        })
+        transitions.append((
+            invoice_rollup.state_of(
+                row.department_id, row.status, row.invoice_registration_status, row.due_date, row.total_amount,
+            ),
+            invoice_rollup.state_of(row.department_id, row.status, status, row.due_date, row.total_amount),
+        ))
+        totals["passed" if result.passed else "failed"] += 1
+        totals[status] += 1
+        if update_vendors and row.vendor_id and row.invoice_registration_number:
+            vendor_updates[row.vendor_id] = {
+                "id": row.vendor_id,
+                "invoice_registration_number": row.invoice_registration_number,
+                "registration_status": status,
+                "registration_checked_at": now,
+            }
+
+    if invoice_updates:
+        db.execute(update(Invoice), invoice_updates)
+    invoice_rollup.apply_transitions(db, transitions)
+    if vendor_updates:
+        db.execute(update(Vendor), list(vendor_updates.values()))
@@ -3,12 +3,18 @@
 from __future__ import annotations
 from typing import Optional
 
-from schemas.compliance import ComplianceCheckResult
-from services.nta_api_service import verify_registration_number
+from schemas.compliance import ComplianceCheckResult, NTAVerificationResult
+from services.nta_api_service import is_definitive, verify_registration_number
 
 
-def check_invoice_compliance(ai_result: Optional[dict]) -> ComplianceCheckResult:
-    """Check if extracted invoice data meets qualified invoice requirements."""
+def check_invoice_compliance(
+    ai_result: Optional[dict],
+    nta: Optional[NTAVerificationResult] = None,
+) -> ComplianceCheckResult:
+    """Check if extracted invoice data meets qualified invoice requirements.
+
+    ``nta`` is a registration lookup already done by the caller (bulk re-check).
+    """
     if not ai_result or ai_result.get("_parse_error"):
         return ComplianceCheckResult(missing_items=["AI解析失敗"], passed=False)
 
@@ -18,10 +24,15 @@ def check_invoice_compliance(ai_result: Optional[dict]) -> ComplianceCheckResult
     reg_num = ai_result.get("invoice_registration_number")
     if reg_num:
         result.has_registration_number = True
-        nta = verify_registration_number(reg_num)
-        result.registration_valid = nta.is_valid
-        if not nta.is_valid:
-            missing.append("適格請求書発行事業者番号が無効です")
+        if nta is None:
+            nta = verify_registration_number(reg_num)
+        if not is_definitive(nta):
+            # 照会に失敗した番号は無効と決めつけず、未確認のままにする
+            missing.append("適格請求書発行事業者番号を照会できませんでした")
+        else:
+            result.registration_valid = nta.is_valid
+            if not nta.is_valid:
+                missing.append("適格請求書発行事業者番号が無効です")
     else:
         missing.append("適格請求書発行事業者の登録番号")
 
@@ -57,6 +68,20 @@ def check_invoice_compliance(ai_result: Optional[dict]) -> ComplianceCheckResult
     else:
         missing.append("書類の交付を受ける事業者の氏名または名称")
 
+    truncated = ai_result.get("_truncated")
+    if truncated:
+        # OCR_PDF_MAX_PAGES を超えたPDFは読んでいないページの明細が欠けるため、確認が済むまで合格にしない
+        missing.append(f"全{truncated['pages']}ページ中{len(truncated['read_pages'])}ページのみ読み取り（明細の確認が必要）")
+
     result.missing_items = missing
     result.passed = len(missing) == 0
     return result
+
+
+def registration_status(result: ComplianceCheckResult) -> str:
+    """Map a compliance result to Invoice.invoice_registration_status."""
+    if result.registration_valid:
+        return "valid"
+    if result.registration_valid is False:
+        return "invalid"
+    return "unchecked"
@@ -0,0 +1,238 @@
+"""AI抽出結果キャッシュ -- ファイルのSHA-256をキーにGPT-4o呼び出しを省略する
+
+同じPDFがGmail経由と手動アップロードで二重に届いた場合や、抽出を再実行した場合に、
+同一バイト列のファイルを再度モデルへ送らないようにする。
+キーは ``sha256:抽出バージョンのダイジェスト`` で、プロンプトやモデルを変えると自動的に別キーになる。
+
+- 1段目: プロセス内LRU（EXTRACTION_CACHE_MEMORY_SIZE件）
+- 2段目: extraction_cache テーブル（EXTRACTION_CACHE_TTL_DAYS日 未使用で削除、
+  EXTRACTION_CACHE_MAX_ROWS件を超えたら最終利用が古いものから削除）
+
+どちらの段も、最後に使われてから EXTRACTION_CACHE_TTL_DAYS日を過ぎた結果は ``prune`` を待たずに使わない。
+
+キャッシュは抽出を省くためだけのもので、データベースのエラーで抽出を失敗させてはいけない。
+2段目の読み書きで起きた例外はログに残して、読み込みは未ヒット・書き込みは何もしなかったものとして扱う。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import asyncio
+import copy
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from database import SessionLocal
+from models.extraction_cache import VERSION_DIGEST_LENGTH, ExtractionCacheEntry
+from services.lru_cache import LRUCache
+from services.ocr_service import extract_invoice_data, extract_many_async, extraction_version
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_STORES = 1000
+
+_memory = LRUCache(settings.EXTRACTION_CACHE_MEMORY_SIZE)
+_stats_lock = threading.Lock()
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "memory_evictions": 0,
+    "db_evictions": 0,
+    "db_errors": 0,
+}
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def version_digest(version: str) -> str:
+    return hashlib.sha256(version.encode("utf-8")).hexdigest()[:VERSION_DIGEST_LENGTH]
+
+
+def cache_key(sha256: str) -> str:
+    return f"{sha256}:{version_digest(extraction_version())}"
+
+
+def lookup(sha256: Optional[str]) -> Optional[dict]:
+    """Return a cached extraction result for the file hash, or None."""
+    if not settings.EXTRACTION_CACHE_ENABLED or not sha256:
+        return None
+    return lookup_many([sha256]).get(sha256)
+
+
+def lookup_many(hashes: list[str]) -> dict[str, dict]:
+    """Batch lookup: memory first, then one query for the rest."""
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return {}
+
+    now = datetime.now(timezone.utc)
+    cutoff = _ttl_cutoff(now)
+    found: dict[str, dict] = {}
+    remaining: dict[str, str] = {}
+    for sha in set(h for h in hashes if h):
+        key = cache_key(sha)
+        hit = _memory.get(key)
+        if hit is not None and hit[0] >= cutoff:
+            _count("memory_hits")
+            _memory.put(key, (now, hit[1]))
+            found[sha] = copy.deepcopy(hit[1])
+        else:
+            remaining[key] = sha
+    if not remaining:
+        return found
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(ExtractionCacheEntry.cache_key, ExtractionCacheEntry.result)
+            .where(ExtractionCacheEntry.cache_key.in_(list(remaining)), ExtractionCacheEntry.last_hit_at >= cutoff)
+        ).all()
+        if rows:
+            db.execute(
+                update(ExtractionCacheEntry)
+                .where(ExtractionCacheEntry.cache_key.in_([k for k, _ in rows]))
+                .values(
+                    hit_count=ExtractionCacheEntry.hit_count + 1,
+                    last_hit_at=now,
+                )
+            )
+            db.commit()
+    except Exception:
+        logger.exception("extraction cache lookup failed; treating %d files as misses", len(remaining))
+        _count("db_errors")
+        rows = []
+    finally:
+        db.close()
+
+    for key, result in rows:
+        _count("db_hits")
+        _count("memory_evictions", _memory.put(key, (now, result)))
+        found[remaining[key]] = copy.deepcopy(result)
+    _count("misses", len(remaining) - len(rows))
+    return found
+
+
+def store(sha256: Optional[str], result: dict):
+    """Remember a successful extraction. Parse failures are never cached."""
+    if not settings.EXTRACTION_CACHE_ENABLED or not sha256 or not result or result.get("_parse_error"):
+        return
+
+    key = cache_key(sha256)
+    now = datetime.now(timezone.utc)
+    _count("memory_evictions", _memory.put(key, (now, copy.deepcopy(result))))
+
+    stmt = insert(ExtractionCacheEntry).values(
+        cache_key=key,
+        file_hash_sha256=sha256,
+        extraction_version=extraction_version(),
+        result=result,
+        hit_count=0,
+        last_hit_at=now,
+    )
+    db = SessionLocal()
+    try:
+        # 期限切れでまだ prune されていない行は新しい結果で置き換える（残すとヒットしないまま居座る）
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ExtractionCacheEntry.cache_key],
+            set_={"result": stmt.excluded.result, "last_hit_at": stmt.excluded.last_hit_at},
+            where=ExtractionCacheEntry.last_hit_at < _ttl_cutoff(now),
+        ))
+        db.commit()
+    except Exception:
+        logger.exception("extraction cache store failed for %s", sha256)
+        _count("db_errors")
+        return
+    finally:
+        db.close()
+
+    with _stats_lock:
+        _stats["stores"] += 1
+        due = _stats["stores"] % PRUNE_EVERY_STORES == 0
+    if due:
+        try:
+            prune()
+        except Exception:
+            logger.exception("extraction cache prune failed")
+            _count("db_errors")
+
+
+def extract_invoice_data_cached(file_path: str, sha256: Optional[str]) -> dict:
+    """Drop-in replacement for :func:`extract_invoice_data` that consults the cache first."""
+    hit = lookup(sha256)
+    if hit is not None:
+        return hit
+    result = extract_invoice_data(file_path)
+    store(sha256, result)
+    return result
+
+
+async def extract_many_cached_async(files: list[tuple[str, Optional[str]]]) -> list:
+    """Cached counterpart of :func:`extract_many_async` for ``(path, sha256)`` pairs."""
+    hits = await asyncio.to_thread(lookup_many, [sha for _, sha in files if sha])
+    misses = [i for i, (_, sha) in enumerate(files) if sha not in hits]
+
+    fetched = await extract_many_async([files[i][0] for i in misses])
+
+    results: list = [hits.get(sha) for _, sha in files]
+    for i, outcome in zip(misses, fetched):
+        results[i] = outcome
+        if not isinstance(outcome, BaseException):
+            await asyncio.to_thread(store, files[i][1], outcome)
+    return results
+
+
+def _ttl_cutoff(now: datetime) -> datetime:
+    """Entries last used before this are expired."""
+    return now - timedelta(days=settings.EXTRACTION_CACHE_TTL_DAYS)
+
+
+def prune() -> int:
+    """Evict persistent entries that are expired or beyond the row budget."""
+    cutoff = _ttl_cutoff(datetime.now(timezone.utc))
+    db = SessionLocal()
+    try:
+        removed = db.execute(
+            delete(ExtractionCacheEntry).where(ExtractionCacheEntry.last_hit_at < cutoff)
+        ).rowcount
+
+        keep = (
+            select(ExtractionCacheEntry.cache_key)
+            .order_by(ExtractionCacheEntry.last_hit_at.desc())
+            .limit(settings.EXTRACTION_CACHE_MAX_ROWS)
+        )
+        removed += db.execute(
+            delete(ExtractionCacheEntry).where(ExtractionCacheEntry.cache_key.notin_(keep))
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+
+    if removed:
+        logger.info("pruned %d extraction cache entries", removed)
+    _count("db_evictions", removed)
+    return removed
+
+
+def clear_memory():
+    _memory.clear()
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+    stats["hit_ratio"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else None
+    stats["memory_entries"] = len(_memory)
+    stats["memory_capacity"] = _memory.maxsize
+    stats["extraction_version"] = extraction_version()
+    return stats
@@ -0,0 +1,107 @@
+"""請求書読み取りパイプライン -- AI抽出結果の反映とコンプライアンスチェック"""
+
+from __future__ import annotations
+from typing import Optional
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from models.invoice import Invoice
+from schemas.compliance import ComplianceCheckResult
+from models.invoice_detail import InvoiceDetail
+from models.bank_account import BankAccount
+from models.vendor import Vendor
+from services.file_service import calculate_retention_date
+from services.compliance_service import check_invoice_compliance, registration_status
+from services.classifier import classify_department
+
+
+def apply_extraction_result(db: Session, inv: Invoice, ai_result: dict):
+    """Copy extracted fields onto the invoice and move it to ``extracted``."""
+    inv.ai_raw_result = ai_result
+    inv.status = "extracted"
+
+    inv.invoice_number = ai_result.get("invoice_number")
+    inv.invoice_date = _parse_date(ai_result.get("invoice_date"))
+    inv.due_date = _parse_date(ai_result.get("due_date"))
+    inv.total_amount = _to_decimal(ai_result.get("total_amount"))
+    inv.subtotal_amount = _to_decimal(ai_result.get("subtotal_amount"))
+    inv.tax_amount = _to_decimal(ai_result.get("tax_amount"))
+    inv.tax_8_amount = _to_decimal(ai_result.get("tax_8_amount"))
+    inv.tax_10_amount = _to_decimal(ai_result.get("tax_10_amount"))
+    inv.invoice_registration_number = ai_result.get("invoice_registration_number")
+    inv.recipient_name = ai_result.get("recipient_name")
+    inv.retention_until = calculate_retention_date(inv.invoice_date)
+
+    vendor_name = ai_result.get("vendor_name")
+    if vendor_name:
+        vendor = db.query(Vendor).filter(Vendor.name == vendor_name).first()
+        if not vendor:
+            vendor = Vendor(name=vendor_name, invoice_registration_number=ai_result.get("invoice_registration_number"))
+            db.add(vendor)
+            db.flush()
+        inv.vendor_id = vendor.id
+
+    dept_id = classify_department(db, vendor_name)
+    if dept_id:
+        inv.department_id = dept_id
+
+    bank_data = ai_result.get("bank_account") or {}
+    if bank_data and any(bank_data.values()):
+        ba = BankAccount(
+            invoice_id=inv.id,
+            bank_name=bank_data.get("bank_name"),
+            branch_name=bank_data.get("branch_name"),
+            account_type=bank_data.get("account_type"),
+            account_number=bank_data.get("account_number"),
+            account_holder=bank_data.get("account_holder"),
+        )
+        db.add(ba)
+
+    for item in ai_result.get("items") or []:
+        detail = InvoiceDetail(
+            invoice_id=inv.id,
+            description=item.get("description"),
+            amount=_to_decimal(item.get("amount")),
+            tax=_to_decimal(item.get("tax")),
+            tax_rate=item.get("tax_rate"),
+        )
+        db.add(detail)
+
+
+def apply_compliance_check(inv: Invoice, compliance: Optional[ComplianceCheckResult] = None):
+    """Run the qualified-invoice checks and move the invoice to ``compliance_checked``.
+
+    Pass ``compliance`` when the check was already run outside the transaction.
+    """
+    if compliance is None:
+        compliance = check_invoice_compliance(inv.ai_raw_result)
+    inv.compliance_check_result = compliance.model_dump()
+    inv.invoice_registration_status = registration_status(compliance)
+    inv.status = "compliance_checked"
+
+
+def mark_extraction_failed(inv: Invoice, error: str):
+    inv.ai_raw_result = {"error": error}
+    inv.status = "extraction_failed"
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    if value is None:
+        return None
+    try:
+        cleaned = str(value).replace(",", "").replace("¥", "").replace("円", "").strip()
+        return Decimal(cleaned)
+    except Exception:
+        return None
@@ -0,0 +1,59 @@
+"""抽出結果の妥当性チェック -- 必須項目の有無と金額の整合性
+
+``_derived`` に挙がった項目は他の項目から計算した値（例: 税抜金額 = 請求金額 - 消費税額）なので、
+その計算元との照合は必ず一致する。そうした照合は行わない。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+from decimal import Decimal, InvalidOperation
+
+REQUIRED_FIELDS = {
+    "vendor_name": "請求元会社名",
+    "invoice_date": "請求日",
+    "total_amount": "請求金額",
+    "tax_amount": "消費税額",
+    "invoice_registration_number": "登録番号",
+}
+
+# 端数処理の差（1円未満の切り捨て/切り上げ/四捨五入）を許容する
+AMOUNT_TOLERANCE = Decimal("1")
+
+
+def amount(value) -> Optional[Decimal]:
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value).replace(",", "").replace("¥", "").replace("円", "").strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def validate_extraction(result: Optional[dict]) -> list[str]:
+    """Return the problems that make an extraction untrustworthy; empty if it looks complete."""
+    if not result or result.get("_parse_error"):
+        return ["解析失敗"]
+
+    problems = [f"{label}なし" for field, label in REQUIRED_FIELDS.items() if result.get(field) in (None, "")]
+    derived = set(result.get("_derived") or ())
+
+    total = amount(result.get("total_amount"))
+    subtotal = amount(result.get("subtotal_amount"))
+    tax = amount(result.get("tax_amount"))
+    tax_8 = amount(result.get("tax_8_amount"))
+    tax_10 = amount(result.get("tax_10_amount"))
+
+    if total is not None and subtotal is not None and tax is not None and "subtotal_amount" not in derived:
+        if abs(subtotal + tax - total) > AMOUNT_TOLERANCE:
+            problems.append(f"税抜金額+消費税額が請求金額と一致しません ({subtotal}+{tax}!={total})")
+
+    if tax is not None and (tax_8 is not None or tax_10 is not None) and "tax_amount" not in derived:
+        breakdown = (tax_8 or 0) + (tax_10 or 0)
+        if abs(breakdown - tax) > AMOUNT_TOLERANCE:
+            problems.append(f"税率別消費税額の合計が消費税額と一致しません ({breakdown}!={tax})")
+
+    if total is not None and total <= 0:
+        problems.append("請求金額が0以下です")
+
+    return problems
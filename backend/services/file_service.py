@@ -1,33 +1,49 @@
 from __future__ import annotations
 from typing import Optional
 
+import asyncio
 import hashlib
 import os
 import uuid
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
+from fastapi import UploadFile
 from PIL import Image
 from config import settings
 
 
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds UPLOAD_MAX_FILE_BYTES or the remaining batch budget."""
+
+
 def compute_sha256(file_bytes: bytes) -> str:
     return hashlib.sha256(file_bytes).hexdigest()
 
 
-def verify_file_hash(file_path: str, expected_hash: str) -> bool:
+def compute_file_sha256(file_path: str) -> str:
+    """Hash a stored file chunk by chunk so large scans are never fully loaded."""
+    hasher = hashlib.sha256()
     with open(file_path, "rb") as f:
-        actual = compute_sha256(f.read())
-    return actual == expected_hash
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
-def save_upload(file_bytes: bytes, original_filename: str) -> tuple[str, str]:
-    """Save uploaded file and return (relative_path, sha256_hash)."""
+def verify_file_hash(file_path: str, expected_hash: str) -> bool:
+    return compute_file_sha256(file_path) == expected_hash
+
+
+def _new_upload_path(original_filename: str) -> tuple[str, str]:
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(original_filename)[1].lower()
+    ext = os.path.splitext(original_filename or "")[1].lower()
     unique_name = f"{uuid.uuid4().hex}{ext}"
-    rel_path = unique_name
-    abs_path = os.path.join(settings.UPLOAD_DIR, unique_name)
+    return unique_name, os.path.join(settings.UPLOAD_DIR, unique_name)
+
+
+def save_upload(file_bytes: bytes, original_filename: str) -> tuple[str, str]:
+    """Save uploaded file and return (relative_path, sha256_hash)."""
+    rel_path, abs_path = _new_upload_path(original_filename)
 
     with open(abs_path, "wb") as f:
         f.write(file_bytes)
@@ -36,6 +52,43 @@ def save_upload(file_bytes: bytes, original_filename: str) -> tuple[str, str]:
     return rel_path, sha256
 
 
+async def save_upload_stream(upload: UploadFile, max_bytes: Optional[int] = None) -> tuple[str, str, int]:
+    """Stream an UploadFile to disk and return (relative_path, sha256_hash, size).
+
+    The SHA-256 is updated chunk by chunk while writing, so memory use is bounded by
+    UPLOAD_CHUNK_SIZE. A partially written file is removed if the limit is exceeded
+    or the client disconnects.
+    """
+    limit = settings.UPLOAD_MAX_FILE_BYTES if max_bytes is None else min(max_bytes, settings.UPLOAD_MAX_FILE_BYTES)
+    rel_path, abs_path = _new_upload_path(upload.filename)
+    hasher = hashlib.sha256()
+    size = 0
+
+    def _write(out, chunk: bytes):
+        hasher.update(chunk)
+        out.write(chunk)
+
+    try:
+        with open(abs_path, "wb") as out:
+            while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLargeError(f"{upload.filename}: ファイルサイズが上限({limit:,}バイト)を超えています")
+                await asyncio.to_thread(_write, out, chunk)
+    except BaseException:
+        remove_upload(rel_path)
+        raise
+
+    return rel_path, hasher.hexdigest(), size
+
+
+def remove_upload(rel_path: str):
+    try:
+        os.remove(os.path.join(settings.UPLOAD_DIR, rel_path))
+    except FileNotFoundError:
+        pass
+
+
 def check_image_dpi(file_path: str) -> Optional[int]:
     """Return DPI of image if available, else None."""
     try:
@@ -0,0 +1,237 @@
+"""外部連携用の共有HTTPクライアント -- 接続先ごとに httpx.Client / AsyncClient を1つずつ保持する
+
+リクエストごとに ``httpx.get`` するとTCP+TLS接続を毎回張り直すため、接続先（国税庁API・
+マネーフォワード・OpenAI）ごとにキープアライブ付きの接続プールを共有する。
+タイムアウトと接続数の上限は接続先ごとに設定し、HTTP/2 は ``h2`` パッケージ
+（``pip install httpx[http2]``）がある場合のみ HTTP_HTTP2_ENABLED で有効になる。
+クライアントは FastAPI の lifespan 終了時に閉じる。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Upstream:
+    timeout: float
+    connect_timeout: float
+    max_connections: int
+    max_keepalive_connections: int
+
+
+def upstreams() -> dict[str, Upstream]:
+    return {
+        "openai": Upstream(
+            timeout=settings.OPENAI_HTTP_TIMEOUT_SECONDS,
+            connect_timeout=10,
+            max_connections=max(settings.OCR_CONCURRENCY * 2, 10),
+            max_keepalive_connections=max(settings.OCR_CONCURRENCY, 5),
+        ),
+        "nta": Upstream(
+            timeout=settings.NTA_HTTP_TIMEOUT_SECONDS,
+            connect_timeout=5,
+            max_connections=max(settings.NTA_CONCURRENCY * 2, 4),
+            max_keepalive_connections=max(settings.NTA_CONCURRENCY, 2),
+        ),
+        "moneyforward": Upstream(
+            timeout=settings.MF_HTTP_TIMEOUT_SECONDS,
+            connect_timeout=10,
+            max_connections=5,
+            max_keepalive_connections=2,
+        ),
+    }
+
+
+def http2_available() -> bool:
+    return settings.HTTP_HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+class _Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.total_ms = 0.0
+
+    def trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    async def atrace(self, event: str, info: dict):
+        self.trace(event, info)
+
+    def record(self, started: float, failed: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "requests_per_connection": round(self.requests / self.connections_opened, 1)
+                if self.connections_opened else None,
+                "avg_ms": round(self.total_ms / self.requests, 1) if self.requests else None,
+            }
+
+
+class _MeteredTransport(httpx.HTTPTransport):
+    def __init__(self, metrics: _Metrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.metrics.trace
+        started = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            self.metrics.record(started, True)
+            raise
+        self.metrics.record(started, response.status_code >= 500)
+        return response
+
+
+class _AsyncMeteredTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, metrics: _Metrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.metrics.atrace
+        started = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            self.metrics.record(started, True)
+            raise
+        self.metrics.record(started, response.status_code >= 500)
+        return response
+
+
+def _pool_state(transport) -> dict:
+    """Open/idle connection counts read from httpcore's pool (best effort)."""
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    return {
+        "open_connections": len(connections),
+        "idle_connections": sum(1 for c in connections if c.is_idle()),
+    }
+
+
+def build_client(name: str, metrics: Optional[_Metrics] = None, **overrides) -> httpx.Client:
+    """Create a pooled client for an upstream; ``overrides`` go to the transport (e.g. ``verify``)."""
+    up = upstreams()[name]
+    transport = _MeteredTransport(
+        metrics or _Metrics(),
+        http2=http2_available(),
+        limits=_limits(up),
+        **overrides,
+    )
+    return httpx.Client(transport=transport, timeout=_timeout(up))
+
+
+def build_async_client(name: str, metrics: Optional[_Metrics] = None, **overrides) -> httpx.AsyncClient:
+    up = upstreams()[name]
+    transport = _AsyncMeteredTransport(
+        metrics or _Metrics(),
+        http2=http2_available(),
+        limits=_limits(up),
+        **overrides,
+    )
+    return httpx.AsyncClient(transport=transport, timeout=_timeout(up))
+
+
+def _limits(up: Upstream) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=up.max_connections,
+        max_keepalive_connections=up.max_keepalive_connections,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout(up: Upstream) -> httpx.Timeout:
+    return httpx.Timeout(up.timeout, connect=up.connect_timeout)
+
+
+class HTTPClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: dict[str, httpx.Client] = {}
+        # AsyncClient の接続はイベントループに紐づくため、ループごとに作り直す
+        self._async_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._metrics: dict[str, _Metrics] = {}
+
+    def get(self, name: str) -> httpx.Client:
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None or client.is_closed:
+                client = build_client(name, self._metrics_for(name))
+                self._clients[name] = client
+            return client
+
+    def get_async(self, name: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(name)
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                entry = (loop, build_async_client(name, self._metrics_for(name)))
+                self._async_clients[name] = entry
+            return entry[1]
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = list(self._async_clients.values())
+            self._async_clients.clear()
+        for owner, client in entries:
+            if owner is loop:
+                await client.aclose()
+        self.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = set(self._metrics)
+            out = {}
+            for name in sorted(names):
+                stats = self._metrics[name].snapshot()
+                if name in self._clients:
+                    stats["sync_pool"] = _pool_state(self._clients[name]._transport)
+                if name in self._async_clients:
+                    stats["async_pool"] = _pool_state(self._async_clients[name][1]._transport)
+                out[name] = stats
+        out["http2"] = http2_available()
+        return out
+
+    def _metrics_for(self, name: str) -> _Metrics:
+        if name not in self._metrics:
+            self._metrics[name] = _Metrics()
+        return self._metrics[name]
+
+
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,125 @@
+"""請求書画像の前処理 -- Visionモデルへ送る前に向き補正・余白除去・縮小・再圧縮する"""
+
+from __future__ import annotations
+from typing import Optional
+
+import io
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+from config import settings
+
+# 紙の白地とみなす明度の閾値（0-255, 反転後にこれ以下を余白として扱う）
+MARGIN_THRESHOLD = 40
+MARGIN_PADDING_RATIO = 0.01
+
+_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreprocessedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    processed_bytes: int
+    width: int
+    height: int
+
+    def report(self) -> dict:
+        return {
+            "original_bytes": self.original_bytes,
+            "sent_bytes": self.processed_bytes,
+            "width": self.width,
+            "height": self.height,
+            "mime_type": self.mime_type,
+        }
+
+
+def preprocess_signature() -> str:
+    """Part of the extraction version: changing these settings invalidates cached results."""
+    if not settings.OCR_PREPROCESS_ENABLED:
+        return "raw"
+    mode = "gray" if settings.OCR_IMAGE_GRAYSCALE else "color"
+    return f"{settings.OCR_IMAGE_FORMAT.lower()}{settings.OCR_IMAGE_QUALITY}-{settings.OCR_IMAGE_MAX_EDGE}-{mode}"
+
+
+def preprocess_image(file_bytes: bytes) -> Optional[PreprocessedImage]:
+    """Shrink a scanned/photographed invoice for the vision model.
+
+    Returns None if the bytes are not a readable image.
+    """
+    try:
+        img = Image.open(io.BytesIO(file_bytes))
+        img.load()
+    except Exception:
+        return None
+    return preprocess_pil_image(ImageOps.exif_transpose(img), len(file_bytes))
+
+
+def preprocess_pil_image(img: Image.Image, original_bytes: int = 0) -> PreprocessedImage:
+    """Crop, convert, downscale and re-encode an already decoded image (e.g. a rendered PDF page)."""
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    gray = img.convert("L")
+    if settings.OCR_IMAGE_GRAYSCALE:
+        img = gray
+
+    img = _crop_margins(img, gray)
+
+    max_edge = settings.OCR_IMAGE_MAX_EDGE
+    if max(img.size) > max_edge:
+        scale = max_edge / max(img.size)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+
+    fmt = settings.OCR_IMAGE_FORMAT.upper()
+    if fmt not in _FORMATS:
+        fmt = "JPEG"
+    out = io.BytesIO()
+    img.save(out, format=fmt, quality=settings.OCR_IMAGE_QUALITY, optimize=True)
+    data = out.getvalue()
+
+    return PreprocessedImage(
+        data=data,
+        mime_type=_FORMATS[fmt],
+        original_bytes=original_bytes,
+        processed_bytes=len(data),
+        width=img.width,
+        height=img.height,
+    )
+
+
+def encode_png(img: Image.Image) -> PreprocessedImage:
+    """Lossless encoding used for rendered PDF pages when preprocessing is disabled."""
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    data = out.getvalue()
+    return PreprocessedImage(
+        data=data,
+        mime_type="image/png",
+        original_bytes=0,
+        processed_bytes=len(data),
+        width=img.width,
+        height=img.height,
+    )
+
+
+def _crop_margins(img: Image.Image, gray: Image.Image) -> Image.Image:
+    """Crop the blank paper border around the printed area, keeping a small padding."""
+    mask = ImageOps.invert(gray).point(lambda p: 255 if p > MARGIN_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return img
+
+    pad_x = int(img.width * MARGIN_PADDING_RATIO)
+    pad_y = int(img.height * MARGIN_PADDING_RATIO)
+    left, top, right, bottom = bbox
+    box = (
+        max(0, left - pad_x),
+        max(0, top - pad_y),
+        min(img.width, right + pad_x),
+        min(img.height, bottom + pad_y),
+    )
+    if box == (0, 0, img.width, img.height):
+        return img
+    return img.crop(box)
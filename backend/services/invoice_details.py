@@ -0,0 +1,89 @@
+"""請求書明細の差分更新 -- 変わった行だけを UPDATE し、追加分はまとめて INSERT、消えた行は1文で DELETE する
+
+PUT /api/invoices/{id} の details は明細の完全な一覧（含まれない明細は削除）。既存の明細との対応付けは
+
+- どれかの行に id があれば id で（id の無い行は追加）
+- id が1つも無ければ（従来のクライアント）並び順（明細 ID 順）で
+
+誤字を1つ直しただけなら UPDATE 1行で済み、明細の ID も変わらない。
+監査ログ用に、変わった行の変更前と変更後（更新は変わった列だけ、追加・削除は行全体）を返す。
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.invoice import Invoice
+from models.invoice_detail import InvoiceDetail
+from schemas.invoice import InvoiceDetailUpdate
+from services import search_index
+
+DETAIL_FIELDS = ("description", "amount", "tax", "tax_rate")
+
+
+class UnknownDetailError(ValueError):
+    """An item's ``id`` is not a line item of this invoice (or appears twice)."""
+
+
+def _audit(value):
+    return str(value) if value is not None else None
+
+
+def _line(detail: InvoiceDetail, fields=DETAIL_FIELDS) -> dict:
+    return {"id": detail.id, **{f: _audit(getattr(detail, f)) for f in fields}}
+
+
+def _pair(existing: list[InvoiceDetail], items: list[InvoiceDetailUpdate]):
+    if not any(item.id is not None for item in items):
+        pairs = [(existing[i] if i < len(existing) else None, item) for i, item in enumerate(items)]
+        return pairs, existing[len(items):]
+
+    by_id = {d.id: d for d in existing}
+    pairs = []
+    for item in items:
+        if item.id is None:
+            pairs.append((None, item))
+        elif item.id in by_id:
+            pairs.append((by_id.pop(item.id), item))
+        else:
+            raise UnknownDetailError(item.id)
+    return pairs, list(by_id.values())
+
+
+def sync_details(db: Session, inv: Invoice, items: list[InvoiceDetailUpdate]) -> tuple[list[dict], list[dict]]:
+    """Make ``inv.details`` match ``items``; returns ``(old_lines, new_lines)`` for the audit log."""
+    existing = sorted(inv.details, key=lambda d: d.id)
+    pairs, removed = _pair(existing, items)
+
+    old_lines, new_lines = [], []
+    kept, added = [], []
+    for detail, item in pairs:
+        values = item.model_dump(include=set(DETAIL_FIELDS))
+        if detail is None:
+            added.append(InvoiceDetail(**values))
+            continue
+        kept.append(detail)
+        changed = [f for f, v in values.items() if getattr(detail, f) != v]
+        if changed:
+            old_lines.append(_line(detail, changed))
+            for f in changed:
+                setattr(detail, f, values[f])
+            new_lines.append(_line(detail, changed))
+
+    if removed:
+        old_lines += [_line(d) for d in removed]
+        db.execute(delete(InvoiceDetail).where(InvoiceDetail.id.in_([d.id for d in removed])))
+        for d in removed:
+            db.expunge(d)
+        # ORM を通さない削除はフラッシュで検知されないため、検索用文書の更新を登録する
+        search_index.mark_for_reindex(db, invoice_ids=[inv.id])
+    # 削除済みの行をコレクションから外す（delete-orphan で二重に DELETE しないよう履歴は残さない）
+    set_committed_value(inv, "details", kept)
+
+    if added:
+        inv.details.extend(added)
+        db.flush()  # 追加分は1つの複数行 INSERT になる
+        new_lines += [_line(d) for d in added]
+    return old_lines, new_lines
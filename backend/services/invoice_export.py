@@ -0,0 +1,199 @@
+"""請求書のエクスポート -- 明細・振込先付きの CSV / XLSX をサーバー側カーソルで少しずつ書き出す
+
+一覧 API と同じ絞り込み条件の請求書を、サーバー側カーソル（``yield_per``）で EXPORT_BATCH_SIZE 件ずつ
+読み、各バッチの明細を1回の SELECT でまとめて取得して1行1明細で書き出す（明細のない請求書は1行）。
+件数が増えてもメモリ使用量はバッチ1つ分で変わらない。
+
+- CSV は Excel でそのまま開けるよう BOM 付き UTF-8。バッチごとに送り出すので最初のバイトがすぐ届く
+- gzip はクライアントが Accept-Encoding: gzip を送った場合に CSV へ適用する（Content-Encoding: gzip）
+- XLSX は openpyxl の write_only モードで一時ファイルへ書き、
+  完成後に少しずつ送り出す。シートの行数上限を超えたら次のシートへ続ける。
+  書き込みは openpyxl の速度（数千行/秒）が上限なので、年間分など大量の出力には CSV を使う
+
+性能の確認は ``python benchmarks/invoice_export.py``。
+"""
+
+from __future__ import annotations
+from typing import Iterable, Iterator, Optional
+
+import csv
+import io
+import tempfile
+import zlib
+from collections import defaultdict
+from datetime import datetime
+
+from openpyxl import Workbook
+from sqlalchemy import DateTime, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models.bank_account import BankAccount
+from models.department import Department
+from models.invoice import Invoice
+from models.invoice_detail import InvoiceDetail
+from models.vendor import Vendor
+from services.audit_service import log_action
+
+CHUNK_BYTES = 64 * 1024
+XLSX_MAX_ROWS = 1_000_000  # 1シートの上限（1,048,576 行）より少し手前で次のシートへ
+
+# (見出し, 列)。明細の列は末尾
+INVOICE_COLUMNS = [
+    ("請求書ID", Invoice.id),
+    ("請求書番号", Invoice.invoice_number),
+    ("取引先", Vendor.name),
+    ("登録番号", Invoice.invoice_registration_number),
+    ("登録番号確認", Invoice.invoice_registration_status),
+    ("部署", Department.name),
+    ("ステータス", Invoice.status),
+    ("請求日", Invoice.invoice_date),
+    ("支払期日", Invoice.due_date),
+    ("小計", Invoice.subtotal_amount),
+    ("消費税", Invoice.tax_amount),
+    ("消費税(8%)", Invoice.tax_8_amount),
+    ("消費税(10%)", Invoice.tax_10_amount),
+    ("合計", Invoice.total_amount),
+    ("摘要", Invoice.description),
+    ("銀行名", BankAccount.bank_name),
+    ("支店名", BankAccount.branch_name),
+    ("口座種別", BankAccount.account_type),
+    ("口座番号", BankAccount.account_number),
+    ("口座名義", BankAccount.account_holder),
+    ("登録日時", Invoice.created_at),
+]
+DETAIL_COLUMNS = [
+    ("明細摘要", InvoiceDetail.description),
+    ("明細金額", InvoiceDetail.amount),
+    ("明細税額", InvoiceDetail.tax),
+    ("税率", InvoiceDetail.tax_rate),
+]
+HEADERS = [h for h, _ in INVOICE_COLUMNS] + [h for h, _ in DETAIL_COLUMNS]
+_DATETIME_INDEXES = [
+    i for i, (_, c) in enumerate(INVOICE_COLUMNS + DETAIL_COLUMNS) if isinstance(c.type, DateTime)
+]
+
+
+def export_query(conditions: list):
+    """Invoices with their one-to-one columns, newest first (same order and filters as the list)."""
+    return (
+        select(*(c for _, c in INVOICE_COLUMNS))
+        .outerjoin(Vendor, Vendor.id == Invoice.vendor_id)
+        .outerjoin(Department, Department.id == Invoice.department_id)
+        .outerjoin(BankAccount, BankAccount.invoice_id == Invoice.id)
+        .where(*conditions)
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+    )
+
+
+def iter_rows(db: Session, conditions: list, batch_size: Optional[int] = None) -> Iterator[list[tuple]]:
+    """Yield batches of output rows (one per line item) read through a server-side cursor."""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    result = db.execute(export_query(conditions), execution_options={"yield_per": batch_size})
+    blank = (None,) * len(DETAIL_COLUMNS)
+    for invoices in result.partitions():
+        details: dict[int, list[tuple]] = defaultdict(list)
+        for row in db.execute(
+            select(InvoiceDetail.invoice_id, *(c for _, c in DETAIL_COLUMNS))
+            .where(InvoiceDetail.invoice_id.in_([inv[0] for inv in invoices]))
+            .order_by(InvoiceDetail.invoice_id, InvoiceDetail.id)
+        ):
+            details[row[0]].append(tuple(row[1:]))
+        rows = []
+        for inv in invoices:
+            inv = tuple(inv)
+            for line in details.get(inv[0]) or [blank]:
+                rows.append(inv + line)
+        yield rows
+
+
+def _csv_row(row: tuple):
+    # None・数値・日付は csv モジュールがそのまま書ける。日時だけ秒までの ISO 8601 にする
+    row = list(row)
+    for i in _DATETIME_INDEXES:
+        if row[i] is not None:
+            row[i] = row[i].isoformat(timespec="seconds")
+    return row
+
+
+def iter_csv(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\r\n")
+    buf.write("\ufeff")  # BOM（Excel で文字化けしないように）
+    writer.writerow(HEADERS)
+    for rows in batches:
+        writer.writerows(map(_csv_row, rows))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip ヘッダー付き
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def iter_xlsx(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    wb = Workbook(write_only=True)
+    sheet, sheet_rows = None, XLSX_MAX_ROWS
+    for rows in batches:
+        for row in rows:
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet = wb.create_sheet(f"請求書{len(wb.worksheets) + 1}")
+                sheet.append(HEADERS)
+                sheet_rows = 0
+            # Excel の日時はタイムゾーンを持てないため、サーバーの地方時に直して外す
+            sheet.append([v.astimezone().replace(tzinfo=None) if isinstance(v, datetime) else v for v in row])
+            sheet_rows += 1
+    if sheet is None:
+        wb.create_sheet("請求書1").append(HEADERS)
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as out:
+        wb.save(out)
+        out.seek(0)
+        while chunk := out.read(CHUNK_BYTES):
+            yield chunk
+
+
+def stream_export(
+    conditions: list,
+    fmt: str,
+    compress: bool,
+    user_id: Optional[int],
+    filters: dict,
+    ip_address: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Response body for an export; owns its session and records an audit entry once fully sent."""
+    db = SessionLocal()
+    totals = {"invoices": 0, "rows": 0}
+
+    def counted(batches: Iterable[list[tuple]]) -> Iterator[list[tuple]]:
+        for rows in batches:
+            totals["rows"] += len(rows)
+            totals["invoices"] += len({row[0] for row in rows})
+            yield rows
+
+    try:
+        batches = counted(iter_rows(db, conditions))
+        chunks = iter_csv(batches) if fmt == "csv" else iter_xlsx(batches)
+        yield from iter_gzip(chunks) if compress else chunks
+        db.rollback()  # サーバー側カーソルのトランザクションを閉じる
+        log_action(
+            db,
+            user_id=user_id,
+            entity_type="invoice",
+            entity_id=0,
+            action="export",
+            new_values={"format": fmt, "filter": filters, **totals},
+            ip_address=ip_address,
+        )
+        db.commit()
+    finally:
+        db.close()
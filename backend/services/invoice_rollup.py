@@ -0,0 +1,230 @@
+"""ダッシュボード集計表 -- 部署×ステータス×登録番号判定×支払期限区分ごとの件数と金額
+
+ダッシュボードは invoices を毎回集計せず invoice_rollups を読む。集計表は請求書の変更と
+同じトランザクションで差分更新する。
+
+- ORM経由の変更: フラッシュ時（``after_flush``）に変更前後の値から差分を自動で反映する
+- 一括 UPDATE（コンプライアンス一括再チェック・取引先再確認など）: 呼び出し側が
+  ``apply_transitions`` で変更前後の状態を渡す
+
+支払期限区分（期限なし/期限切れ/7日以内/それ以降）は invoice_rollup_state.as_of の日付が基準のため、
+日付が変わったら最初の読み取りで作り直す。定期ジョブ（``reconcile``）は全件から作り直し、
+差分更新とのずれがあればログに残す。
+"""
+
+from __future__ import annotations
+from typing import Iterable, Optional
+
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import (
+    BigInteger, Date, Integer, Numeric, String,
+    case, cast, column, delete, event, func, inspect, literal, select, text, values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.invoice import Invoice
+from models.invoice_rollup import InvoiceRollup, InvoiceRollupState
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = 1
+
+# 集計に使う請求書の列（この順で state_of に渡す）
+STATE_COLUMNS = ("department_id", "status", "invoice_registration_status", "due_date", "total_amount", "is_deleted")
+
+# (department_id, status, registration_status, due_date, total_amount); 削除済みは None
+InvoiceState = tuple
+
+
+def state_of(
+    department_id: Optional[int],
+    status: str,
+    registration_status: Optional[str],
+    due_date: Optional[date],
+    total_amount: Optional[Decimal],
+    is_deleted: bool = False,
+) -> Optional[InvoiceState]:
+    if is_deleted:
+        return None
+    return (department_id or 0, status or "uploaded", registration_status or "unchecked", due_date, total_amount or 0)
+
+
+def state_columns(table=Invoice.__table__) -> list:
+    """Invoice columns to SELECT/RETURN for ``state_of`` (pass an alias to read pre-update values)."""
+    return [table.c[name] for name in STATE_COLUMNS]
+
+
+def due_bucket(due_date, as_of):
+    return case(
+        (due_date.is_(None), "none"),
+        (due_date < as_of, "overdue"),
+        (due_date <= as_of + 7, "due_7d"),
+        else_="later",
+    )
+
+
+def apply_transitions(db: Session, changes: Iterable[tuple[Optional[InvoiceState], Optional[InvoiceState]]]):
+    """Add ``(before, after)`` invoice states to the rollup inside the caller's transaction."""
+    deltas: dict[tuple, list] = defaultdict(lambda: [0, Decimal(0)])
+    for before, after in changes:
+        if before == after:
+            continue
+        if before is not None:
+            d = deltas[before[:4]]
+            d[0] -= 1
+            d[1] -= Decimal(before[4])
+        if after is not None:
+            d = deltas[after[:4]]
+            d[0] += 1
+            d[1] += Decimal(after[4])
+    rows = [(*key, n, amount) for key, (n, amount) in deltas.items() if n or amount]
+    if not rows:
+        return
+
+    d = values(
+        column("department_id", Integer),
+        column("status", String),
+        column("registration_status", String),
+        column("due_date", Date),
+        column("n", BigInteger),
+        column("amount", Numeric),
+        name="d",
+    ).data(rows)
+    # VALUES の列型は値から推論されるため、全件 NULL でも比較できるよう明示的に型を付ける
+    bucket = due_bucket(cast(d.c.due_date, Date), InvoiceRollupState.as_of)
+    # 区分は保存済みの as_of で決める（集計表がまだ無ければ何もしない -- 初回の reconcile で作る）
+    source = (
+        select(d.c.department_id, d.c.status, d.c.registration_status, bucket, func.sum(d.c.n), func.sum(cast(d.c.amount, Numeric)))
+        .select_from(d)
+        .join(InvoiceRollupState, InvoiceRollupState.id == STATE_ID)
+        .group_by(d.c.department_id, d.c.status, d.c.registration_status, bucket)
+    )
+    stmt = insert(InvoiceRollup).from_select(
+        ["department_id", "status", "registration_status", "due_bucket", "invoice_count", "total_amount"], source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            InvoiceRollup.department_id, InvoiceRollup.status,
+            InvoiceRollup.registration_status, InvoiceRollup.due_bucket,
+        ],
+        set_={
+            "invoice_count": InvoiceRollup.invoice_count + stmt.excluded.invoice_count,
+            "total_amount": InvoiceRollup.total_amount + stmt.excluded.total_amount,
+        },
+    )
+    db.connection().execute(stmt)
+
+
+def _previous(inv: Invoice, name: str):
+    hist = inspect(inv).attrs[name].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.added:
+        return None  # active_history の列で旧値が無い = NULL から変更
+    return getattr(inv, name)
+
+
+def _after_flush(session: Session, flush_context):
+    changes = []
+    for inv in session.new:
+        if isinstance(inv, Invoice):
+            changes.append((None, state_of(*(getattr(inv, c) for c in STATE_COLUMNS))))
+    for inv in session.dirty:
+        if isinstance(inv, Invoice):
+            changes.append((
+                state_of(*(_previous(inv, c) for c in STATE_COLUMNS)),
+                state_of(*(getattr(inv, c) for c in STATE_COLUMNS)),
+            ))
+    for inv in session.deleted:
+        if isinstance(inv, Invoice):
+            changes.append((state_of(*(_previous(inv, c) for c in STATE_COLUMNS)), None))
+    if changes:
+        apply_transitions(session, changes)
+
+
+event.listen(Session, "after_flush", _after_flush)
+
+
+def reconcile(force: bool = True) -> dict:
+    """Rebuild the rollup from ``invoices`` for today's due buckets.
+
+    Without ``force`` nothing is done when the rollup is already bucketed for today.
+    Concurrent invoice writes wait on the table lock until the rebuild commits.
+    """
+    started = time.perf_counter()
+    today = date.today()
+    db = SessionLocal()
+    try:
+        db.execute(text("LOCK TABLE invoice_rollups IN EXCLUSIVE MODE"))
+        state = db.get(InvoiceRollupState, STATE_ID)
+        if not force and state is not None and state.as_of == today:
+            db.rollback()
+            return {"skipped": True}
+
+        before = _snapshot(db) if state is not None and state.as_of == today else None
+        db.execute(delete(InvoiceRollup))
+        bucket = due_bucket(Invoice.due_date, literal(today, Date))
+        department = func.coalesce(Invoice.department_id, 0)
+        registration = func.coalesce(Invoice.invoice_registration_status, "unchecked")
+        db.execute(insert(InvoiceRollup).from_select(
+            ["department_id", "status", "registration_status", "due_bucket", "invoice_count", "total_amount"],
+            select(
+                department, Invoice.status, registration, bucket,
+                func.count(), func.coalesce(func.sum(Invoice.total_amount), 0),
+            )
+            .where(Invoice.is_deleted.is_(False))
+            .group_by(department, Invoice.status, registration, bucket),
+        ))
+        after = _snapshot(db)
+
+        now = datetime.now(timezone.utc)
+        if state is None:
+            db.add(InvoiceRollupState(id=STATE_ID, as_of=today, reconciled_at=now))
+        else:
+            state.as_of = today
+            state.reconciled_at = now
+        db.commit()
+    finally:
+        db.close()
+
+    drifted = None
+    if before is not None:
+        drifted = sum(1 for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+        if drifted:
+            logger.warning("invoice rollup drifted on %d keys; rebuilt from invoices", drifted)
+    return {
+        "rows": len(after),
+        "invoices": sum(n for n, _ in after.values()),
+        "rebucketed": before is None,
+        "drifted_keys": drifted,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _rows(db: Session) -> list:
+    return db.execute(
+        select(
+            InvoiceRollup.department_id, InvoiceRollup.status, InvoiceRollup.registration_status,
+            InvoiceRollup.due_bucket, InvoiceRollup.invoice_count, InvoiceRollup.total_amount,
+        ).where(InvoiceRollup.invoice_count != 0)
+    ).all()
+
+
+def _snapshot(db: Session) -> dict[tuple, tuple[int, Decimal]]:
+    return {tuple(r[:4]): (r[4], r[5]) for r in _rows(db)}
+
+
+def current_rows(db: Session) -> list:
+    """Non-empty rollup rows, rebuilding first if the due buckets are from an earlier day."""
+    as_of = db.execute(select(InvoiceRollupState.as_of).where(InvoiceRollupState.id == STATE_ID)).scalar()
+    if as_of != date.today():
+        db.rollback()
+        reconcile(force=False)
+    return _rows(db)
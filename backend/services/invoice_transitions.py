@@ -0,0 +1,117 @@
+"""請求書ステータスの一括変更 -- 月末の一括承認・却下を1つの短いトランザクションで行う
+
+対象の ID を1つの UPDATE（``id = ANY(...) AND status IN (...) ... RETURNING``）でまとめて変更する。
+UPDATE は CTE に入れ、同じ文の外側で ID ごとに更新前の行を読むため、変更できなかった ID と
+その理由（存在しない・削除済み／変更できないステータス／同時に他の処理が変更した）も1文で分かる。
+監査ログは複数行の INSERT 1文、ダッシュボード集計表は ``apply_transitions`` で差分を反映する。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+from dataclasses import dataclass
+
+from sqlalchemy import Integer, any_, bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from models.invoice import Invoice
+from services import invoice_rollup
+from services.audit_service import log_actions
+from services.vendor_revalidation import FINAL_INVOICE_STATUSES
+
+
+@dataclass(frozen=True)
+class Transition:
+    target: str
+    # 変更できる元のステータス。None なら確定済み（振込済み・却下済み）以外すべて
+    sources: Optional[tuple[str, ...]]
+
+    def allows(self, status: str) -> bool:
+        if self.sources is None:
+            return status not in FINAL_INVOICE_STATUSES
+        return status in self.sources
+
+    def condition(self):
+        if self.sources is None:
+            return Invoice.status.notin_(FINAL_INVOICE_STATUSES)
+        return Invoice.status.in_(self.sources)
+
+
+TRANSITIONS = {
+    "approve": Transition("approved", ("reviewed", "compliance_checked")),
+    "reject": Transition("rejected", None),
+}
+
+
+@dataclass
+class BulkTransitionResult:
+    updated: list[int]
+    # (id, reason, 現在のステータス)。reason は not_found / invalid_status / conflict
+    skipped: list[tuple[int, str, Optional[str]]]
+
+
+def bulk_transition(
+    db: Session,
+    action: str,
+    invoice_ids: list[int],
+    user_id: Optional[int],
+    ip_address: Optional[str] = None,
+) -> BulkTransitionResult:
+    """Apply ``action`` to every eligible invoice; the caller commits."""
+    transition = TRANSITIONS[action]
+    ids = list(dict.fromkeys(invoice_ids))
+    ids_param = bindparam("ids", ids, type_=ARRAY(Integer))
+
+    values = {"status": transition.target}
+    if action == "approve":
+        values.update(approved_by_id=user_id, approved_at=func.now())
+    changed = (
+        update(Invoice)
+        .where(Invoice.id == any_(ids_param), Invoice.is_deleted.is_(False), transition.condition())
+        .values(**values)
+        .returning(Invoice.id)
+        .cte("changed")
+    )
+    # 外側の SELECT は UPDATE 前のスナップショットを読む（= 更新前の値）
+    requested = func.unnest(ids_param).table_valued("id").render_derived(name="requested")
+    rows = db.execute(
+        select(requested.c.id, changed.c.id.isnot(None), *invoice_rollup.state_columns())
+        .select_from(requested)
+        .outerjoin(Invoice, Invoice.id == requested.c.id)
+        .outerjoin(changed, changed.c.id == requested.c.id)
+    ).all()
+
+    result = BulkTransitionResult(updated=[], skipped=[])
+    transitions = []
+    audit = []
+    for invoice_id, was_changed, dept, status, reg, due, amount, deleted in rows:
+        if was_changed:
+            result.updated.append(invoice_id)
+            transitions.append((
+                invoice_rollup.state_of(dept, status, reg, due, amount, deleted),
+                invoice_rollup.state_of(dept, transition.target, reg, due, amount, deleted),
+            ))
+            audit.append({
+                "user_id": user_id,
+                "entity_type": "invoice",
+                "entity_id": invoice_id,
+                "action": action,
+                "old_values": {"status": status},
+                "new_values": {"status": transition.target},
+                "ip_address": ip_address,
+            })
+        elif status is None or deleted:
+            result.skipped.append((invoice_id, "not_found", None))
+        elif not transition.allows(status):
+            result.skipped.append((invoice_id, "invalid_status", status))
+        else:
+            # 読んだ時点では変更できたが、UPDATE の時点で他のトランザクションが先に変更していた
+            result.skipped.append((invoice_id, "conflict", status))
+
+    log_actions(db, audit)
+    invoice_rollup.apply_transitions(db, transitions)
+    order = {invoice_id: i for i, invoice_id in enumerate(ids)}
+    result.updated.sort(key=order.__getitem__)
+    result.skipped.sort(key=lambda s: order[s[0]])
+    return result
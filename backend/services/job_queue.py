@@ -0,0 +1,274 @@
+"""請求書読み取りジョブキュー -- extraction_jobsテーブルをキューにしたバックグラウンド処理
+
+アップロード時はジョブを登録するだけで、GPT-4o抽出と国税庁API照合はワーカーが行う。
+ワーカーは ``SELECT ... FOR UPDATE SKIP LOCKED`` でジョブを取得するため、
+APIプロセス内のスレッドでも別プロセス (``python -m services.job_queue``) でも並行稼働できる。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models.extraction_job import ExtractionJob
+from models.invoice import Invoice
+from services.extraction_cache import extract_invoice_data_cached
+from services.extraction_pipeline import apply_extraction_result, apply_compliance_check, mark_extraction_failed
+from services import invoice_rollup, search_index  # noqa: F401 -- flush/commit hooks for rollups and search
+from services.pdf_service import EmptyPdfError
+from services.rate_limiter import UpstreamBusyError
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_INTERVAL_SECONDS = 60
+
+_wakeup = threading.Event()
+
+
+def enqueue_extraction(db: Session, invoice_id: int) -> ExtractionJob:
+    """Queue an invoice for extraction. Committed together with the caller's transaction."""
+    job = ExtractionJob(
+        invoice_id=invoice_id,
+        status="queued",
+        attempts=0,
+        max_attempts=settings.EXTRACTION_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def notify_workers():
+    """Wake idle in-process workers after new jobs have been committed."""
+    _wakeup.set()
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[int]:
+    job = (
+        db.query(ExtractionJob)
+        .filter(ExtractionJob.status == "queued", ExtractionJob.run_after <= func.now())
+        .order_by(ExtractionJob.run_after, ExtractionJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = datetime.now(timezone.utc)
+    db.commit()
+    return job.id
+
+
+def process_job(job_id: int):
+    """Drive one invoice through uploaded -> extracted -> compliance_checked.
+
+    The model call runs outside any transaction; each state transition is committed
+    separately so a crash after extraction does not repeat the GPT-4o call.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(ExtractionJob, job_id)
+        if not job:
+            return
+        inv = db.get(Invoice, job.invoice_id)
+        if not inv or inv.is_deleted or not inv.file_path:
+            _retry_or_fail(db, job, "請求書が見つかりません", retry=False)
+            db.commit()
+            return
+
+        needs_extraction = inv.status in ("uploaded", "extraction_failed")
+        abs_path = os.path.join(settings.UPLOAD_DIR, inv.file_path)
+        file_hash = inv.file_hash_sha256
+        db.commit()
+
+        try:
+            if needs_extraction:
+                ai_result = extract_invoice_data_cached(abs_path, file_hash)
+                apply_extraction_result(db, inv, ai_result)
+                db.commit()
+
+            if inv.status == "extracted":
+                apply_compliance_check(inv)
+
+            job.status = "succeeded"
+            job.last_error = None
+            job.locked_by = None
+            job.locked_at = None
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+        except UpstreamBusyError as e:
+            logger.info("extraction job %s deferred %.0fs: %s", job_id, e.retry_after, e)
+            db.rollback()
+            job = db.get(ExtractionJob, job_id)
+            _defer(job, str(e), e.retry_after)
+            db.commit()
+        except EmptyPdfError as e:
+            logger.warning("extraction job %s failed: %s", job_id, e)
+            db.rollback()
+            job = db.get(ExtractionJob, job_id)
+            _retry_or_fail(db, job, str(e), retry=False)
+            db.commit()
+        except Exception as e:
+            logger.warning("extraction job %s failed: %s", job_id, e)
+            db.rollback()
+            job = db.get(ExtractionJob, job_id)
+            _retry_or_fail(db, job, str(e))
+            db.commit()
+    finally:
+        db.close()
+
+
+def recover_stale_jobs(db: Session) -> int:
+    """Requeue jobs whose worker died (process crash, deploy) while running them."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.EXTRACTION_JOB_TIMEOUT_SECONDS)
+    stale = (
+        db.query(ExtractionJob)
+        .filter(ExtractionJob.status == "running", ExtractionJob.locked_at < cutoff)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in stale:
+        _retry_or_fail(db, job, f"ワーカー応答なし (locked_by={job.locked_by})")
+    db.commit()
+    return len(stale)
+
+
+def requeue_job(db: Session, job: ExtractionJob):
+    """Manually retry a failed job with a fresh attempt budget."""
+    job.status = "queued"
+    job.attempts = 0
+    job.last_error = None
+    job.finished_at = None
+    job.run_after = datetime.now(timezone.utc)
+    inv = db.get(Invoice, job.invoice_id)
+    if inv and inv.status == "extraction_failed":
+        inv.status = "uploaded"
+
+
+def _defer(job: ExtractionJob, reason: str, delay: float):
+    """Put a job back without spending an attempt: the upstream was busy, not the document bad."""
+    job.status = "queued"
+    job.attempts = max(job.attempts - 1, 0)
+    job.last_error = reason[:2000]
+    job.locked_by = None
+    job.locked_at = None
+    job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+def _retry_or_fail(db: Session, job: ExtractionJob, error: str, retry: bool = True):
+    now = datetime.now(timezone.utc)
+    job.last_error = error[:2000]
+    job.locked_by = None
+    job.locked_at = None
+
+    if retry and job.attempts < job.max_attempts:
+        backoff = settings.EXTRACTION_RETRY_BACKOFF_SECONDS * (2 ** max(job.attempts - 1, 0))
+        job.status = "queued"
+        job.run_after = now + timedelta(seconds=backoff)
+        return
+
+    job.status = "failed"
+    job.finished_at = now
+    inv = db.get(Invoice, job.invoice_id)
+    if inv and inv.status == "uploaded":
+        mark_extraction_failed(inv, error)
+
+
+class ExtractionWorkerPool:
+    """Thread pool that polls extraction_jobs until stopped."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+    def start(self):
+        for i in range(self.size):
+            t = threading.Thread(
+                target=self._run,
+                args=(f"{self._prefix}-{i}", i == 0),
+                name=f"extraction-worker-{i}",
+                daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        _wakeup.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads.clear()
+
+    def _run(self, worker_id: str, supervises: bool):
+        last_recovery = 0.0
+        while not self._stop.is_set():
+            job_id = None
+            db = SessionLocal()
+            try:
+                if supervises and time.monotonic() - last_recovery >= RECOVERY_INTERVAL_SECONDS:
+                    recovered = recover_stale_jobs(db)
+                    if recovered:
+                        logger.info("requeued %d stale extraction jobs", recovered)
+                    last_recovery = time.monotonic()
+                job_id = claim_next_job(db, worker_id)
+            except Exception:
+                logger.exception("failed to claim extraction job")
+                db.rollback()
+            finally:
+                db.close()
+
+            if job_id is None:
+                _wakeup.wait(settings.EXTRACTION_POLL_INTERVAL_SECONDS)
+                _wakeup.clear()
+                continue
+
+            try:
+                process_job(job_id)
+            except Exception:
+                logger.exception("extraction job %s crashed", job_id)
+
+
+worker_pool: Optional[ExtractionWorkerPool] = None
+
+
+def start_workers():
+    global worker_pool
+    if settings.EXTRACTION_WORKERS <= 0 or worker_pool is not None:
+        return
+    worker_pool = ExtractionWorkerPool(settings.EXTRACTION_WORKERS)
+    worker_pool.start()
+
+
+def stop_workers():
+    global worker_pool
+    if worker_pool is not None:
+        worker_pool.stop()
+        worker_pool = None
+
+
+if __name__ == "__main__":
+    # 専用ワーカープロセスとして起動: EXTRACTION_WORKERS=0 のAPIサーバーと組み合わせる
+    logging.basicConfig(level=logging.INFO)
+    pool = ExtractionWorkerPool(max(settings.EXTRACTION_WORKERS, 1))
+    pool.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
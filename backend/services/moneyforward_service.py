@@ -5,6 +5,7 @@ from typing import Optional
 
 import httpx
 from config import settings
+from services.http_clients import http_clients
 
 MF_API_BASE = "https://invoice.moneyforward.com/api/v3"
 MF_AUTH_BASE = "https://api.biz.moneyforward.com"
@@ -33,7 +34,7 @@ def get_auth_url() -> str:
 
 
 def exchange_code(code: str) -> dict:
-    resp = httpx.post(
+    resp = http_clients.get("moneyforward").post(
         f"{MF_AUTH_BASE}/token",
         data={
             "grant_type": "authorization_code",
@@ -42,7 +43,6 @@ def exchange_code(code: str) -> dict:
             "code": code,
             "redirect_uri": settings.MF_REDIRECT_URI,
         },
-        timeout=30,
     )
     resp.raise_for_status()
     data = resp.json()
@@ -54,7 +54,7 @@ def refresh_access_token() -> dict:
     rt = _token_store.get("refresh_token")
     if not rt:
         raise RuntimeError("マネーフォワード未認証です。先にOAuth認証を完了してください。")
-    resp = httpx.post(
+    resp = http_clients.get("moneyforward").post(
         f"{MF_AUTH_BASE}/token",
         data={
             "grant_type": "refresh_token",
@@ -62,7 +62,6 @@ def refresh_access_token() -> dict:
             "client_secret": settings.MF_CLIENT_SECRET,
             "refresh_token": rt,
         },
-        timeout=30,
     )
     resp.raise_for_status()
     data = resp.json()
@@ -72,10 +71,11 @@ def refresh_access_token() -> dict:
 
 def _request_with_retry(method: str, url: str, **kwargs) -> httpx.Response:
     """401時にトークンをリフレッシュして1回リトライ"""
-    resp = httpx.request(method, url, headers=_headers(), timeout=30, **kwargs)
+    http = http_clients.get("moneyforward")
+    resp = http.request(method, url, headers=_headers(), **kwargs)
     if resp.status_code == 401:
         refresh_access_token()
-        resp = httpx.request(method, url, headers=_headers(), timeout=30, **kwargs)
+        resp = http.request(method, url, headers=_headers(), **kwargs)
     resp.raise_for_status()
     return resp
 
@@ -1,52 +1,188 @@
-"""国税庁 適格請求書発行事業者公表API連携"""
+"""国税庁 適格請求書発行事業者公表API連携
+
+照会結果は services.nta_cache にキャッシュし、形式・チェックデジットが不正な番号は
+APIへ問い合わせずに無効と判定する。
+"""
 
 from __future__ import annotations
+from typing import Optional
+
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
 import httpx
 from config import settings
 from schemas.compliance import NTAVerificationResult
+from services import nta_cache, nta_registry
+from services.http_clients import http_clients
+from services.rate_limiter import OutboundScheduler
+
+MAX_NUMBERS_PER_REQUEST = 10
+
+_NUMBER_RE = re.compile(r"^T\d{13}$")
+
+nta_scheduler = OutboundScheduler(
+    "nta",
+    requests_per_minute=settings.NTA_RPM_LIMIT,
+    max_retries=3,
+    backoff_base=0.5,
+    backoff_max=10.0,
+)
 
 
-def verify_registration_number(reg_number: str) -> NTAVerificationResult:
-    """Verify an invoice registration number against the NTA public API."""
-    clean = reg_number.strip().upper()
+def normalize_registration_number(reg_number: str) -> str:
+    """'t-1234-5678-90123' / full-width digits -> 'T1234567890123'."""
+    clean = unicodedata.normalize("NFKC", reg_number).strip().upper()
+    clean = re.sub(r"[\s\-‐－ー]", "", clean)
     if not clean.startswith("T"):
         clean = "T" + clean
+    return clean
+
+
+def has_valid_check_digit(clean: str) -> bool:
+    """法人番号のチェックデジット: 9 - (Σ P_n × Q_n mod 9), P_n は下位から n 桁目, Q_n は奇数1/偶数2."""
+    digits = clean[1:]
+    total = sum(int(d) * (1 if n % 2 else 2) for n, d in enumerate(reversed(digits[1:]), start=1))
+    return int(digits[0]) == 9 - total % 9
+
+
+def format_error(clean: str) -> Optional[str]:
+    if not _NUMBER_RE.match(clean):
+        return "登録番号はT+13桁の数字です"
+    if not has_valid_check_digit(clean):
+        return "登録番号のチェックデジットが一致しません"
+    return None
+
+
+def verify_registration_number(reg_number: str, refresh: bool = False) -> NTAVerificationResult:
+    """Verify an invoice registration number against the NTA public API.
+
+    Malformed numbers are rejected locally; answers are served from the cache unless ``refresh``.
+    """
+    clean = normalize_registration_number(reg_number)
+    return verify_registration_numbers([clean], refresh=refresh)[clean]
+
+
+def verify_registration_numbers(reg_numbers: list[str], refresh: bool = False) -> dict[str, NTAVerificationResult]:
+    """Verify many numbers at once, keyed by normalized number.
+
+    With NTA_LOOKUP_MODE ``local`` the answer comes only from the imported mirror
+    (``services.nta_registry``); numbers it does not know are invalid, unless the mirror is
+    empty or stale, in which case they come back non-definitive (see :func:`is_definitive`).
+    ``local_then_api`` asks the API for numbers the mirror does not know yet. Cache misses are sent NTA_BATCH_SIZE numbers per request
+    (the API accepts up to 10), with at most NTA_CONCURRENCY requests in flight.
+    """
+    results: dict[str, NTAVerificationResult] = {}
+    pending = []
+    for clean in dict.fromkeys(normalize_registration_number(n) for n in reg_numbers):
+        error = format_error(clean)
+        if error:
+            nta_cache.count("rejected_format")
+            results[clean] = NTAVerificationResult(
+                registration_number=clean, is_valid=False, raw_response={"error": error, "reason": "format"}
+            )
+        else:
+            pending.append(clean)
+
+    mode = settings.NTA_LOOKUP_MODE
+    if pending and mode in ("local", "local_then_api"):
+        results.update(nta_registry.lookup_local(pending))
+        pending = [n for n in pending if n not in results]
+        if mode == "local":
+            stale = nta_registry.staleness(cache_seconds=nta_registry.STALENESS_CACHE_SECONDS) if pending else None
+            # 未取込・古いミラーにない番号は登録がないとは言えないため、照会できなかった扱いにする
+            raw = {"error": f"local mirror stale: {stale}"} if stale else {"announcement": []}
+            for n in pending:
+                results[n] = NTAVerificationResult(
+                    registration_number=n, is_valid=False, raw_response={**raw, "source": "local"}
+                )
+            return results
 
+    if pending and not refresh:
+        results.update(nta_cache.lookup(pending))
+        pending = [n for n in pending if n not in results]
+    if not pending:
+        return results
+
+    size = max(1, min(settings.NTA_BATCH_SIZE, MAX_NUMBERS_PER_REQUEST))
+    chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+    http = http_clients.get("nta")
+    if len(chunks) == 1:
+        fetched = [_fetch(http, chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(settings.NTA_CONCURRENCY, len(chunks))) as pool:
+            fetched = list(pool.map(lambda chunk: _fetch(http, chunk), chunks))
+
+    for batch in fetched:
+        results.update(batch)
+        nta_cache.store([r for r in batch.values() if is_definitive(r)])
+    return results
+
+
+def _fetch(http: httpx.Client, numbers: list[str]) -> dict[str, NTAVerificationResult]:
     url = f"{settings.NTA_API_BASE_URL}/num"
-    params = {"id": clean, "type": "21"}
+    params = {"id": settings.NTA_APPLICATION_ID, "number": ",".join(numbers), "type": "21", "history": "0"}
+    nta_cache.count("fetches")
 
     try:
-        resp = httpx.get(url, params=params, timeout=15)
+        resp = nta_scheduler.call(lambda: _get(http, url, params))
         if resp.status_code != 200:
-            return NTAVerificationResult(
-                registration_number=clean,
-                is_valid=False,
-                raw_response={"status_code": resp.status_code, "body": resp.text[:500]},
-            )
-
+            nta_cache.count("fetch_errors")
+            raw = {"status_code": resp.status_code, "body": resp.text[:500]}
+            return {n: NTAVerificationResult(registration_number=n, is_valid=False, raw_response=raw) for n in numbers}
         data = resp.json()
-        announcements = data.get("announcement", [])
-        if not announcements:
-            return NTAVerificationResult(
-                registration_number=clean,
-                is_valid=False,
-                raw_response=data,
-            )
+    except Exception as e:
+        nta_cache.count("fetch_errors")
+        return {
+            n: NTAVerificationResult(registration_number=n, is_valid=False, raw_response={"error": str(e)})
+            for n in numbers
+        }
+
+    by_number = {rec.get("registratedNumber"): rec for rec in data.get("announcement", [])}
+    if len(numbers) == 1 and len(by_number) == 1 and numbers[0] not in by_number:
+        # 登録番号を返さない応答でも1件照会なら対応が一意に決まる
+        by_number = {numbers[0]: next(iter(by_number.values()))}
 
-        rec = announcements[0]
-        return NTAVerificationResult(
-            registration_number=clean,
-            is_valid=True,
+    out = {}
+    for n in numbers:
+        rec = by_number.get(n)
+        if rec is None:
+            out[n] = NTAVerificationResult(registration_number=n, is_valid=False, raw_response={"announcement": []})
+            continue
+        out[n] = NTAVerificationResult(
+            registration_number=n,
+            is_valid=not _is_revoked(rec),
             company_name=rec.get("name"),
             address=rec.get("address"),
             registration_date=rec.get("registrationDate"),
             update_date=rec.get("updateDate"),
-            raw_response=data,
-        )
-    except Exception as e:
-        return NTAVerificationResult(
-            registration_number=clean,
-            is_valid=False,
-            raw_response={"error": str(e)},
+            raw_response={"announcement": [rec]},
         )
+    return out
+
+
+def _get(http: httpx.Client, url: str, params: dict) -> httpx.Response:
+    resp = http.get(url, params=params)
+    if resp.status_code == 429 or resp.status_code >= 500:
+        resp.raise_for_status()  # nta_scheduler に再送させる
+    return resp
+
+
+def _is_revoked(rec: dict) -> bool:
+    """失効日・登録取消日が到来していれば、公表されていても無効とする。"""
+    today = date.today().isoformat()
+    for key in ("disposalDate", "expireDate"):
+        value = rec.get(key)
+        if value and value <= today:
+            return True
+    return False
+
+
+def is_definitive(result: NTAVerificationResult) -> bool:
+    """True for a real answer (or a local format rejection); False for transport/HTTP errors."""
+    raw = result.raw_response or {}
+    if result.is_valid or raw.get("reason") == "format":
+        return True
+    return "error" not in raw and "status_code" not in raw
@@ -0,0 +1,204 @@
+"""国税庁 登録番号照会キャッシュ -- 同じ取引先のT番号を何度も公表APIへ問い合わせない
+
+- 1段目: プロセス内LRU（NTA_CACHE_MEMORY_SIZE件）
+- 2段目: nta_registration_cache テーブル（正規化したT番号がキー）
+
+登録あり/登録なしで有効期限を分ける（NTA_CACHE_POSITIVE_TTL_HOURS / NTA_CACHE_NEGATIVE_TTL_HOURS）。
+通信エラーやHTTPエラーの結果は保存しない。キャッシュはあくまで補助なので、テーブルの読み書きに
+失敗しても照会は失敗させない（読み込みはミス、保存は省略として扱い ``db_errors`` に数える）。
+照会のたびに書き込まないよう、テーブルのヒット数（hit_count）はメモリに貯めて ``prune`` でまとめて反映する。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from database import SessionLocal
+from models.nta_registration import NTARegistrationCacheEntry
+from schemas.compliance import NTAVerificationResult
+from services.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_STORES = 1000
+
+_memory = LRUCache(settings.NTA_CACHE_MEMORY_SIZE)
+_stats_lock = threading.Lock()
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "fetches": 0,
+    "fetch_errors": 0,
+    "rejected_format": 0,
+    "db_errors": 0,
+}
+# 次の prune でテーブルの hit_count に加える件数（T番号ごと）
+_pending_hits: dict[str, int] = {}
+
+
+def count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def lookup(numbers: list[str]) -> dict[str, NTAVerificationResult]:
+    """Return unexpired cached results for normalized T-numbers: memory first, then one query."""
+    if not settings.NTA_CACHE_ENABLED:
+        return {}
+
+    now = datetime.now(timezone.utc)
+    found: dict[str, NTAVerificationResult] = {}
+    remaining = []
+    for number in set(numbers):
+        hit = _memory.get(number)
+        if hit is not None and hit[0] > now:
+            count("memory_hits")
+            found[number] = NTAVerificationResult(**hit[1])
+        else:
+            remaining.append(number)
+    if not remaining:
+        return found
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(
+                NTARegistrationCacheEntry.registration_number,
+                NTARegistrationCacheEntry.result,
+                NTARegistrationCacheEntry.expires_at,
+            ).where(
+                NTARegistrationCacheEntry.registration_number.in_(remaining),
+                NTARegistrationCacheEntry.expires_at > now,
+            )
+        ).all()
+    except Exception:
+        logger.exception("NTA cache lookup failed; treating %d numbers as misses", len(remaining))
+        count("db_errors")
+        rows = []
+    finally:
+        db.close()
+
+    with _stats_lock:
+        for number, _, _ in rows:
+            _pending_hits[number] = _pending_hits.get(number, 0) + 1
+    for number, result, expires_at in rows:
+        count("db_hits")
+        _memory.put(number, (expires_at, result))
+        found[number] = NTAVerificationResult(**result)
+    count("misses", len(remaining) - len(rows))
+    return found
+
+
+def store(results: list[NTAVerificationResult]):
+    """Remember definitive answers (registered / not registered) with their TTL."""
+    if not settings.NTA_CACHE_ENABLED or not results:
+        return
+
+    now = datetime.now(timezone.utc)
+    rows = {}
+    for r in results:
+        ttl = settings.NTA_CACHE_POSITIVE_TTL_HOURS if r.is_valid else settings.NTA_CACHE_NEGATIVE_TTL_HOURS
+        expires_at = now + timedelta(hours=ttl)
+        data = r.model_dump()
+        _memory.put(r.registration_number, (expires_at, data))
+        rows[r.registration_number] = {
+            "registration_number": r.registration_number,
+            "is_valid": r.is_valid,
+            "result": data,
+            "hit_count": 0,
+            "checked_at": now,
+            "expires_at": expires_at,
+        }
+
+    stmt = insert(NTARegistrationCacheEntry).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NTARegistrationCacheEntry.registration_number],
+        set_={
+            "is_valid": stmt.excluded.is_valid,
+            "result": stmt.excluded.result,
+            "checked_at": stmt.excluded.checked_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+    )
+    db = SessionLocal()
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        logger.exception("NTA cache store failed; %d results kept in memory only", len(rows))
+        count("db_errors")
+        return
+    finally:
+        db.close()
+
+    with _stats_lock:
+        before = _stats["stores"]
+        _stats["stores"] += len(rows)
+        due = before // PRUNE_EVERY_STORES != _stats["stores"] // PRUNE_EVERY_STORES
+    if due:
+        try:
+            prune()
+        except Exception:
+            logger.exception("NTA cache prune failed")
+            count("db_errors")
+
+
+def invalidate(number: str):
+    _memory.pop(number)
+    db = SessionLocal()
+    try:
+        db.execute(delete(NTARegistrationCacheEntry).where(NTARegistrationCacheEntry.registration_number == number))
+        db.commit()
+    finally:
+        db.close()
+
+
+def prune() -> int:
+    """Add the hit counts gathered since the last prune, then delete expired rows."""
+    with _stats_lock:
+        hits = sorted(_pending_hits.items())
+        _pending_hits.clear()
+    table = NTARegistrationCacheEntry.__table__
+    db = SessionLocal()
+    try:
+        if hits:
+            db.execute(
+                update(table)
+                .where(table.c.registration_number == bindparam("number"))
+                .values(hit_count=table.c.hit_count + bindparam("hits")),
+                [{"number": number, "hits": n} for number, n in hits],
+            )
+        removed = db.execute(
+            delete(NTARegistrationCacheEntry).where(NTARegistrationCacheEntry.expires_at <= datetime.now(timezone.utc))
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if removed:
+        logger.info("pruned %d NTA registration cache entries", removed)
+    return removed
+
+
+def clear_memory():
+    _memory.clear()
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+    stats["hit_ratio"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else None
+    checks = lookups + stats["rejected_format"]
+    stats["network_free_ratio"] = round(1 - stats["fetches"] / checks, 4) if checks else None
+    stats["memory_entries"] = len(_memory)
+    stats["memory_capacity"] = _memory.maxsize
+    return stats
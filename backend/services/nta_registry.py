@@ -0,0 +1,281 @@
+"""国税庁 公表情報のローカルミラー -- 全件ファイルと差分ファイルを nta_registrants へ取り込む
+
+公表サイトの「公表情報ダウンロード」で配布される全件データ・差分データ（CSV、またはCSVを含むZIP）を
+COPY で一時テーブルへ流し込み、登録番号ごとに最新の行だけを反映する。
+
+- 全件: 新しいテーブルへ投入してから入れ替えるため、取込中も照会は止まらない
+- 差分: 登録番号で upsert し、事業者処理区分 99（削除）の番号は削除する
+
+NTA_LOOKUP_MODE が ``local`` / ``local_then_api`` のとき、登録番号の照会はこのテーブルから行う。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import logging
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from sqlalchemy import select, text
+
+from config import settings
+from database import SessionLocal, engine
+from models.nta_registrant import NTARegistrant
+from schemas.compliance import NTAVerificationResult
+
+logger = logging.getLogger(__name__)
+
+# 照会のたびに最終取込日時を読まないよう、鮮度の判定をこの秒数だけ使い回す
+STALENESS_CACHE_SECONDS = 60.0
+_staleness_lock = threading.Lock()
+_staleness_checked: Optional[tuple[float, Optional[str]]] = None
+
+# 公表情報ダウンロードのCSV列順（ヘッダー行なし）
+CSV_COLUMNS = [
+    "sequenceNumber", "registratedNumber", "process", "correct", "kind", "country", "latest",
+    "registrationDate", "updateDate", "disposalDate", "expireDate",
+    "address", "addressPrefectureCode", "addressCityCode",
+    "addressRequest", "addressRequestPrefectureCode", "addressRequestCityCode",
+    "kana", "name", "addressInside", "addressInsidePrefectureCode", "addressInsideCityCode",
+    "tradeName", "popularName_previousName",
+]
+
+COPY_ENCODINGS = {"utf-8": "UTF8", "utf8": "UTF8", "sjis": "SJIS", "shift_jis": "SJIS", "cp932": "SJIS"}
+
+DELETED_PROCESS = "99"
+
+_STAGING_DDL = (
+    "CREATE TEMP TABLE nta_import_staging ("
+    + ", ".join(f'"{c}" text' for c in CSV_COLUMNS)
+    + ") ON COMMIT DROP"
+)
+
+# 同じ登録番号が複数行あれば一連番号の大きい（後の）行を採用する
+_LATEST_ROWS = """
+    SELECT DISTINCT ON ("registratedNumber")
+        "registratedNumber" AS registration_number,
+        NULLIF("sequenceNumber", '')::integer AS sequence_number,
+        "process" AS process,
+        "kind" AS kind,
+        NULLIF("name", '') AS name,
+        NULLIF("tradeName", '') AS trade_name,
+        NULLIF(COALESCE(NULLIF("address", ''), NULLIF("addressInside", '')), '') AS address,
+        NULLIF("registrationDate", '')::date AS registration_date,
+        NULLIF("updateDate", '')::date AS update_date,
+        NULLIF("disposalDate", '')::date AS disposal_date,
+        NULLIF("expireDate", '')::date AS expire_date
+    FROM nta_import_staging
+    WHERE "registratedNumber" <> ''
+    ORDER BY "registratedNumber", NULLIF("sequenceNumber", '')::integer DESC NULLS LAST
+"""
+
+_COLUMNS = (
+    "registration_number, sequence_number, process, kind, name, trade_name, address, "
+    "registration_date, update_date, disposal_date, expire_date"
+)
+
+
+def import_snapshot(path: str, encoding: str = "utf-8") -> dict:
+    """Replace the mirror with a full snapshot file."""
+    started = time.perf_counter()
+    with _raw_cursor() as (conn, cur):
+        staged = _copy_to_staging(cur, path, encoding)
+        cur.execute("DROP TABLE IF EXISTS nta_registrants_load")
+        cur.execute("CREATE TABLE nta_registrants_load (LIKE nta_registrants INCLUDING DEFAULTS)")
+        cur.execute(
+            f"INSERT INTO nta_registrants_load ({_COLUMNS}) "
+            f"SELECT {_COLUMNS} FROM ({_LATEST_ROWS}) latest WHERE process IS DISTINCT FROM '{DELETED_PROCESS}'"
+        )
+        loaded = cur.rowcount
+        cur.execute("ALTER TABLE nta_registrants_load ADD CONSTRAINT nta_registrants_load_pkey PRIMARY KEY (registration_number)")
+        cur.execute("CREATE INDEX ix_nta_registrants_load_imported_at ON nta_registrants_load (imported_at)")
+        # 入れ替えは同じトランザクション内で行い、照会側が空のテーブルを見ることはない
+        cur.execute("DROP TABLE nta_registrants")
+        cur.execute("ALTER TABLE nta_registrants_load RENAME TO nta_registrants")
+        cur.execute("ALTER INDEX nta_registrants_load_pkey RENAME TO nta_registrants_pkey")
+        cur.execute("ALTER INDEX ix_nta_registrants_load_imported_at RENAME TO ix_nta_registrants_imported_at")
+        cur.execute("ANALYZE nta_registrants")
+        conn.commit()
+
+    summary = {"staged_rows": staged, "registrants": loaded, "seconds": round(time.perf_counter() - started, 1)}
+    _forget_staleness()
+    logger.info("NTA snapshot imported from %s: %s", path, summary)
+    return summary
+
+
+def apply_diff(path: str, encoding: str = "utf-8") -> dict:
+    """Apply a daily diff file: upsert changed registrants, remove deleted ones."""
+    started = time.perf_counter()
+    with _raw_cursor() as (conn, cur):
+        staged = _copy_to_staging(cur, path, encoding)
+        cur.execute(f"CREATE TEMP TABLE nta_import_latest ON COMMIT DROP AS {_LATEST_ROWS}")
+        cur.execute(
+            "DELETE FROM nta_registrants r USING nta_import_latest l "
+            f"WHERE r.registration_number = l.registration_number AND l.process = '{DELETED_PROCESS}'"
+        )
+        deleted = cur.rowcount
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in _COLUMNS.split(", ")[1:])
+        cur.execute(
+            f"INSERT INTO nta_registrants ({_COLUMNS}) "
+            f"SELECT {_COLUMNS} FROM nta_import_latest WHERE process IS DISTINCT FROM '{DELETED_PROCESS}' "
+            f"ON CONFLICT (registration_number) DO UPDATE SET {updates}, imported_at = now()"
+        )
+        upserted = cur.rowcount
+        conn.commit()
+
+    summary = {
+        "staged_rows": staged,
+        "upserted": upserted,
+        "deleted": deleted,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    logger.info("NTA diff applied from %s: %s", path, summary)
+    _forget_staleness()
+    return summary
+
+
+def lookup_local(numbers: list[str]) -> dict[str, NTAVerificationResult]:
+    """Primary-key lookup of normalized T-numbers; numbers absent from the mirror are omitted."""
+    if not numbers:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(NTARegistrant).where(NTARegistrant.registration_number.in_(numbers))).scalars().all()
+    finally:
+        db.close()
+    return {r.registration_number: to_result(r) for r in rows}
+
+
+def to_result(r: NTARegistrant) -> NTAVerificationResult:
+    """Build the same result shape as an API lookup."""
+    today = date.today()
+    revoked = any(d is not None and d <= today for d in (r.disposal_date, r.expire_date))
+    announcement = {
+        "registratedNumber": r.registration_number,
+        "process": r.process,
+        "kind": r.kind,
+        "name": r.name,
+        "tradeName": r.trade_name,
+        "address": r.address,
+        "registrationDate": _iso(r.registration_date),
+        "updateDate": _iso(r.update_date),
+        "disposalDate": _iso(r.disposal_date),
+        "expireDate": _iso(r.expire_date),
+    }
+    return NTAVerificationResult(
+        registration_number=r.registration_number,
+        is_valid=not revoked,
+        company_name=r.name,
+        address=r.address,
+        registration_date=announcement["registrationDate"],
+        update_date=announcement["updateDate"],
+        raw_response={"announcement": [announcement], "source": "local"},
+    )
+
+
+def last_imported_at() -> Optional[datetime]:
+    db = SessionLocal()
+    try:
+        return _last_imported_at(db)
+    finally:
+        db.close()
+
+
+def staleness(cache_seconds: float = 0) -> Optional[str]:
+    """Why a miss in the mirror cannot be read as "not registered" (empty or out of date), or None.
+
+    ``cache_seconds`` reuses a verdict computed within that many seconds (for the lookup path).
+    """
+    global _staleness_checked
+    now = time.monotonic()
+    with _staleness_lock:
+        if cache_seconds and _staleness_checked and now - _staleness_checked[0] < cache_seconds:
+            return _staleness_checked[1]
+
+    last = last_imported_at()
+    if last is None:
+        reason = "公表情報が取り込まれていません"
+    else:
+        age_hours = (datetime.now(timezone.utc) - last).total_seconds() / 3600
+        reason = None
+        if age_hours > settings.NTA_LOCAL_MAX_AGE_HOURS:
+            reason = f"公表情報の最終取込が{age_hours:.0f}時間前です（上限 {settings.NTA_LOCAL_MAX_AGE_HOURS} 時間）"
+    with _staleness_lock:
+        _staleness_checked = (now, reason)
+    return reason
+
+
+def _forget_staleness():
+    global _staleness_checked
+    with _staleness_lock:
+        _staleness_checked = None
+
+
+def registry_stats() -> dict:
+    db = SessionLocal()
+    try:
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'nta_registrants'")
+        ).scalar()
+        last_imported = _last_imported_at(db)
+    finally:
+        db.close()
+    return {
+        "estimated_rows": max(estimate or 0, 0),
+        "last_imported_at": last_imported.isoformat() if last_imported else None,
+    }
+
+
+def _last_imported_at(db) -> Optional[datetime]:
+    return db.execute(
+        select(NTARegistrant.imported_at).order_by(NTARegistrant.imported_at.desc()).limit(1)
+    ).scalar()
+
+
+def _iso(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+@contextmanager
+def _raw_cursor():
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        try:
+            yield conn, cur
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    finally:
+        conn.close()
+
+
+def _copy_to_staging(cur, path: str, encoding: str) -> int:
+    copy_encoding = COPY_ENCODINGS.get(encoding.lower())
+    if not copy_encoding:
+        raise ValueError(f"unsupported encoding: {encoding}")
+    cur.execute(_STAGING_DDL)
+    with _open_csv(path) as f:
+        cur.copy_expert(f"COPY nta_import_staging FROM STDIN WITH (FORMAT csv, ENCODING '{copy_encoding}')", f)
+    return cur.rowcount
+
+
+@contextmanager
+def _open_csv(path: str):
+    """Open a CSV file, or the first CSV inside a ZIP archive, as a binary stream."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            names = [n for n in archive.namelist() if n.lower().endswith(".csv")]
+            if not names:
+                raise ValueError(f"no CSV file in {path}")
+            with archive.open(names[0]) as f:
+                yield f
+    else:
+        with open(path, "rb") as f:
+            yield f
+
@@ -1,24 +1,56 @@
 from __future__ import annotations
 from typing import Optional
 
+import asyncio
 import base64
+import hashlib
 import json
 import mimetypes
+import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from config import settings
+from services.image_preprocess import preprocess_image, preprocess_pil_image, preprocess_signature, encode_png
+from services.pdf_service import EmptyPdfError, count_pages, render_pages, select_pages
+from services.text_layer_extractor import extract_from_text_layer, TEXT_LAYER_VERSION
+from services.extraction_validation import validate_extraction
+from services.rate_limiter import openai_scheduler
+from services.http_clients import http_clients
 
 client: Optional[OpenAI] = None
+async_client: Optional[AsyncOpenAI] = None
 
 
 def _get_client() -> OpenAI:
     global client
-    if client is None:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    http = http_clients.get("openai")
+    if client is None or client._client is not http:
+        client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=0,  # 再送は openai_scheduler が行う
+            http_client=http,
+        )
     return client
 
 
+def _get_async_client() -> AsyncOpenAI:
+    global async_client
+    http = http_clients.get_async("openai")
+    if async_client is None or async_client._client is not http:
+        async_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=0,
+            http_client=http,
+        )
+    return async_client
+
+
 EXTRACTION_PROMPT = """あなたは日本の請求書を解析する専門家です。
 添付された請求書画像/PDFから以下の情報をJSON形式で抽出してください。
 
@@ -50,36 +82,321 @@ EXTRACTION_PROMPT = """あなたは日本の請求書を解析する専門家で
 JSON形式のみ出力してください（マークダウン不要）。"""
 
 
+PAGE_PROMPT = """
+
+この画像は{total}ページある請求書の{page}ページ目です。このページに記載されている情報のみを抽出してください。
+品目はこのページに記載された行だけを items に含め、記載のない項目はnullとしてください。"""
+
+HEADER_FIELDS = [
+    "vendor_name", "invoice_number", "invoice_date", "due_date",
+    "invoice_registration_number", "recipient_name",
+]
+TOTAL_FIELDS = ["total_amount", "subtotal_amount", "tax_amount", "tax_8_amount", "tax_10_amount"]
+
+
+# detail=high の画像は 2048px 四方に収めてから短辺768pxに縮小され、512pxタイルに分割される。
+# 見積もりは最も縦長の場合（768x2048 -> 2x4=8タイル）。A4縦のページは 768x1086 -> 2x3=6タイル
+IMAGE_MAX_TILES = 8
+# モデルごとの画像1枚のトークン数（ベース, 1タイルあたり）。gpt-4o-mini は gpt-4o の約33倍で数えられる
+IMAGE_TOKEN_COSTS = {
+    "gpt-4o": (85, 170),
+    "gpt-4o-mini": (2833, 5667),
+}
+
+_stats_lock = threading.Lock()
+_stats: dict = {"documents": 0, "text_layer": 0, "escalations": 0, "calls_by_model": {}}
+
+
+def extraction_version() -> str:
+    """Identify the model/prompt combination; cached results are only reused for the same version."""
+    prompt_hash = hashlib.sha256((EXTRACTION_PROMPT + PAGE_PROMPT).encode("utf-8")).hexdigest()[:12]
+    models = ">".join(settings.OCR_MODEL_CASCADE)
+    version = f"{models}:{prompt_hash}:{preprocess_signature()}:pdf{settings.OCR_PDF_DPI}x{settings.OCR_PDF_MAX_PAGES}"
+    if settings.OCR_TEXT_LAYER_ENABLED:
+        version += f":tl{TEXT_LAYER_VERSION}"
+    return version
+
+
 def extract_invoice_data(file_path: str) -> dict:
-    """Extract structured invoice data from an image/PDF using GPT-4o Vision."""
+    """Extract structured invoice data from an image/PDF.
+
+    Born-digital PDFs are read from their text layer when the rules find every
+    required field. Otherwise the models in OCR_MODEL_CASCADE are tried in order
+    (cheapest first) and the next one is used only when the result fails
+    :func:`validate_extraction`. Multi-page PDFs are split into pages that are
+    extracted concurrently and merged. PDFs longer than OCR_PDF_MAX_PAGES are read
+    partially (see :func:`select_pages`) and marked with ``_truncated``.
+    """
+    started = time.perf_counter()
+    fast = _try_text_layer(file_path)
+    if fast is not None:
+        return _record_text_layer(fast, started)
+
     c = _get_client()
+    requests, report = _build_requests(file_path)
+
+    tiers = []
+    for model in settings.OCR_MODEL_CASCADE:
+        tier_started = time.perf_counter()
+
+        def _complete(request: dict) -> str:
+            body = _for_model(request, model)
+            response = openai_scheduler.call(lambda: c.chat.completions.create(**body), tokens=_estimate_tokens(body))
+            return response.choices[0].message.content
+
+        if len(requests) == 1:
+            contents = [_complete(requests[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(settings.OCR_CONCURRENCY, len(requests))) as pool:
+                contents = list(pool.map(_complete, requests))
+
+        result = _merge_pages(contents)
+        problems = validate_extraction(result)
+        tiers.append(_tier_record(model, tier_started, len(requests), problems))
+        if not problems:
+            break
+    return _finish(result, report, tiers)
+
+
+async def extract_invoice_data_async(file_path: str, sem: Optional[asyncio.Semaphore] = None) -> dict:
+    """Async variant of :func:`extract_invoice_data` for concurrent batch extraction.
+
+    ``sem`` bounds the number of model requests in flight, counted per page.
+    """
+    started = time.perf_counter()
+    fast = await asyncio.to_thread(_try_text_layer, file_path)
+    if fast is not None:
+        return _record_text_layer(fast, started)
+
+    c = _get_async_client()
+    sem = sem or asyncio.Semaphore(settings.OCR_CONCURRENCY)
+    requests, report = await asyncio.to_thread(_build_requests, file_path)
+
+    tiers = []
+    for model in settings.OCR_MODEL_CASCADE:
+        tier_started = time.perf_counter()
+
+        async def _complete(request: dict) -> str:
+            body = _for_model(request, model)
+            async with sem:
+                response = await openai_scheduler.acall(
+                    lambda: c.chat.completions.create(**body), tokens=_estimate_tokens(body)
+                )
+            return response.choices[0].message.content
+
+        result = _merge_pages(await asyncio.gather(*(_complete(r) for r in requests)))
+        problems = validate_extraction(result)
+        tiers.append(_tier_record(model, tier_started, len(requests), problems))
+        if not problems:
+            break
+    return _finish(result, report, tiers)
+
+
+async def extract_many_async(file_paths: list[str], concurrency: Optional[int] = None) -> list:
+    """Extract several files concurrently, at most ``concurrency`` requests in flight.
+
+    Returns one entry per path in the same order: the extracted dict, or the
+    exception raised for that file.
+    """
+    sem = asyncio.Semaphore(concurrency or settings.OCR_CONCURRENCY)
+    return await asyncio.gather(
+        *(extract_invoice_data_async(p, sem) for p in file_paths),
+        return_exceptions=True,
+    )
+
+
+def cascade_stats() -> dict:
+    with _stats_lock:
+        stats = {**_stats, "calls_by_model": dict(_stats["calls_by_model"])}
+    model_documents = stats["documents"] - stats["text_layer"]
+    stats["escalation_rate"] = round(stats["escalations"] / model_documents, 4) if model_documents else None
+    stats["cascade"] = list(settings.OCR_MODEL_CASCADE)
+    return stats
 
+
+def merge_page_results(pages: list[dict]) -> dict:
+    """Merge per-page extraction results into one invoice.
+
+    Header fields come from the first page that has them, totals from the last
+    page that has them, items are concatenated in page order and each bank
+    account field is taken from the first page that has it.
+    """
+    parsed = [p for p in pages if not p.get("_parse_error")]
+    if not parsed:
+        return pages[0]
+
+    merged: dict = {}
+    for field in HEADER_FIELDS:
+        merged[field] = next((p.get(field) for p in parsed if p.get(field) is not None), None)
+    for field in TOTAL_FIELDS:
+        merged[field] = next((p.get(field) for p in reversed(parsed) if p.get(field) is not None), None)
+
+    bank: dict = {}
+    for p in parsed:
+        for key, value in (p.get("bank_account") or {}).items():
+            if value is not None and bank.get(key) is None:
+                bank[key] = value
+    merged["bank_account"] = bank
+
+    merged["items"] = [item for p in parsed for item in (p.get("items") or [])]
+    merged["_pages"] = len(pages)
+    failed = [i + 1 for i, p in enumerate(pages) if p.get("_parse_error")]
+    if failed:
+        merged["_page_parse_errors"] = failed
+    return merged
+
+
+def _try_text_layer(file_path: str) -> Optional[dict]:
+    if not settings.OCR_TEXT_LAYER_ENABLED or not file_path.lower().endswith(".pdf"):
+        return None
+    try:
+        return extract_from_text_layer(file_path)
+    except Exception:
+        return None
+
+
+def _load_images(file_path: str) -> tuple[list[tuple[bytes, str]], Optional[dict]]:
+    """Return the images to send as (bytes, mime type) -- one per page for PDFs -- and a size report."""
     mime_type, _ = mimetypes.guess_type(file_path)
     if not mime_type:
         mime_type = "application/octet-stream"
 
+    if mime_type == "application/pdf":
+        total = count_pages(file_path)
+        if total == 0:
+            raise EmptyPdfError("PDFにページがありません")
+        indexes = select_pages(total)
+        encode = preprocess_pil_image if settings.OCR_PREPROCESS_ENABLED else encode_png
+        pages = [encode(img) for img in render_pages(file_path, pages=indexes)]
+        report = {
+            "pages": total,
+            "page_numbers": [i + 1 for i in indexes],
+            "original_bytes": os.path.getsize(file_path),
+            "sent_bytes": sum(p.processed_bytes for p in pages),
+        }
+        return [(p.data, p.mime_type) for p in pages], report
+
     with open(file_path, "rb") as f:
         file_bytes = f.read()
 
-    b64 = base64.b64encode(file_bytes).decode("utf-8")
-    data_url = f"data:{mime_type};base64,{b64}"
-
-    response = c.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": EXTRACTION_PROMPT},
-                    {"type": "image_url", "image_url": {"url": data_url, "detail": "high"}},
-                ],
-            }
-        ],
-        temperature=0.1,
-        max_tokens=4000,
-    )
+    if settings.OCR_PREPROCESS_ENABLED and mime_type.startswith("image/"):
+        processed = preprocess_image(file_bytes)
+        if processed and processed.processed_bytes < processed.original_bytes:
+            return [(processed.data, processed.mime_type)], processed.report()
+    return [(file_bytes, mime_type)], None
+
+
+def _build_requests(file_path: str) -> tuple[list[dict], Optional[dict]]:
+    """Build one chat request per image/page. Returns (requests, preprocessing report)."""
+    images, report = _load_images(file_path)
+    pdf_pages = report.get("page_numbers") if report else None
+    total = report["pages"] if pdf_pages else len(images)
+    numbers = pdf_pages or range(1, total + 1)
+    requests = []
+    for (data, mime_type), page in zip(images, numbers):
+        prompt = EXTRACTION_PROMPT
+        if total > 1:
+            prompt += PAGE_PROMPT.format(total=total, page=page)
+        b64 = base64.b64encode(data).decode("utf-8")
+        data_url = f"data:{mime_type};base64,{b64}"
+        requests.append(dict(
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": data_url, "detail": settings.OCR_IMAGE_DETAIL}},
+                    ],
+                }
+            ],
+            temperature=0.1,
+        ))
+    return requests, report
+
+
+def _for_model(request: dict, model: str) -> dict:
+    return {**request, "model": model, "max_tokens": settings.OCR_MAX_TOKENS}
+
+
+def _image_tokens(model: Optional[str]) -> int:
+    """Upper bound of one image's tokens for ``model``.
+
+    Without a model the costliest model in OCR_MODEL_CASCADE is assumed, and an
+    unknown model is charged like the costliest known one, so the TPM bucket never
+    under-reserves.
+    """
+    if model is None:
+        return max((_image_tokens(m) for m in settings.OCR_MODEL_CASCADE), default=_image_tokens(""))
+    base, per_tile = IMAGE_TOKEN_COSTS.get(model) or max(IMAGE_TOKEN_COSTS.values())
+    return base if settings.OCR_IMAGE_DETAIL == "low" else base + per_tile * IMAGE_MAX_TILES
+
+
+def _estimate_tokens(request: dict) -> int:
+    """Rough token count for the TPM bucket: prompt text + image tiles + max completion tokens."""
+    per_image = _image_tokens(request.get("model"))
+    total = request.get("max_tokens") or 0
+    for message in request["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            total += len(content) // 2
+            continue
+        for part in content:
+            total += len(part.get("text", "")) // 2 if part["type"] == "text" else per_image
+    return total
+
+
+def _merge_pages(contents: list[str]) -> dict:
+    if not contents:
+        raise EmptyPdfError("抽出するページがありません")
+    pages = [_parse_response(c) for c in contents]
+    return pages[0] if len(pages) == 1 else merge_page_results(pages)
+
+
+def _tier_record(model: str, started: float, requests: int, problems: list[str]) -> dict:
+    with _stats_lock:
+        calls = _stats["calls_by_model"]
+        calls[model] = calls.get(model, 0) + requests
+    return {
+        "model": model,
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+        "requests": requests,
+        "problems": problems,
+    }
+
+
+def _finish(result: dict, report: Optional[dict], tiers: list[dict]) -> dict:
+    if report:
+        result["_preprocess"] = report
+        read = len(report.get("page_numbers") or [])
+        if read and read < report["pages"]:
+            # 読まなかったページの明細は欠けている -- コンプライアンスチェックで確認待ちにする
+            result["_truncated"] = {"pages": report["pages"], "read_pages": report["page_numbers"]}
+    result["_extraction"] = {
+        "model": tiers[-1]["model"],
+        "escalated": len(tiers) > 1,
+        "tiers": tiers,
+    }
+    with _stats_lock:
+        _stats["documents"] += 1
+        if len(tiers) > 1:
+            _stats["escalations"] += 1
+    return result
+
+
+def _record_text_layer(result: dict, started: float) -> dict:
+    result["_extraction"] = {
+        "model": "text_layer",
+        "escalated": False,
+        "tiers": [{"model": "text_layer", "latency_ms": round((time.perf_counter() - started) * 1000), "requests": 0, "problems": []}],
+    }
+    with _stats_lock:
+        _stats["documents"] += 1
+        _stats["text_layer"] += 1
+    return result
+
 
-    content = response.choices[0].message.content.strip()
+def _parse_response(content: str) -> dict:
+    content = content.strip()
 
     json_match = re.search(r"```(?:json)?\s*\n(.*?)```", content, re.DOTALL)
     if json_match:
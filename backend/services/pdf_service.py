@@ -0,0 +1,79 @@
+"""PDF処理 -- ページ分割・ラスタライズ・テキストレイヤー抽出"""
+
+from __future__ import annotations
+from typing import Optional
+
+import threading
+
+import pypdfium2 as pdfium
+from PIL import Image
+
+from config import settings
+
+# PDFium はスレッドセーフではないため、ワーカースレッド間で直列化する
+_pdfium_lock = threading.Lock()
+
+
+class EmptyPdfError(ValueError):
+    """The PDF has no pages to extract."""
+
+
+def count_pages(file_path: str) -> int:
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def select_pages(total: int, max_pages: Optional[int] = None) -> list[int]:
+    """Indexes of the pages to read: every page, or the first ``max_pages - 1`` and the last one.
+
+    Totals are printed on the last page, so it is kept when a long PDF is cut short.
+    """
+    max_pages = max_pages or settings.OCR_PDF_MAX_PAGES
+    if total <= max_pages:
+        return list(range(total))
+    return list(range(max_pages - 1)) + [total - 1]
+
+
+def render_pages(file_path: str, dpi: Optional[int] = None, pages: Optional[list[int]] = None) -> list[Image.Image]:
+    """Rasterize the given pages of a PDF (default: :func:`select_pages`) into PIL images."""
+    dpi = dpi or settings.OCR_PDF_DPI
+    images = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for index in select_pages(len(pdf)) if pages is None else pages:
+                page = pdf[index]
+                try:
+                    bitmap = page.render(scale=dpi / 72)
+                    images.append(bitmap.to_pil())
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+    return images
+
+
+def extract_text_layer(file_path: str, max_pages: Optional[int] = None) -> list[str]:
+    """Return the embedded text of each page; empty strings for scanned (image-only) pages."""
+    max_pages = max_pages or settings.OCR_PDF_MAX_PAGES
+    texts = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for index in range(min(len(pdf), max_pages)):
+                page = pdf[index]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        texts.append(textpage.get_text_range())
+                    finally:
+                        textpage.close()
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+    return texts
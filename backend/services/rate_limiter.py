@@ -0,0 +1,293 @@
+"""外部API呼び出しのスケジューラー -- トークンバケット・Retry-After・指数バックオフ・サーキットブレーカー
+
+月末のアップロード集中時にOpenAIの429で抽出が失敗しないよう、送信前に
+リクエスト数/分・トークン数/分の枠を確保し、429/5xxは待ってから再送する。
+プロバイダー障害が続く間はサーキットブレーカーが送信を止め、
+:class:`UpstreamBusyError` を受け取ったジョブキューは試行回数を消費せずに再予約する。
+"""
+
+from __future__ import annotations
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import httpx
+import openai
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamBusyError(Exception):
+    """The upstream cannot take requests right now; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamBusyError):
+    pass
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, holding at most ``burst`` units (default: one minute's worth).
+
+    :meth:`reserve` deducts immediately (the balance may go negative) and returns how
+    long the caller must wait, so the same bucket serves threads and coroutines.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = max(burst if burst is not None else per_minute, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_minute / 60)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * 60 / self.per_minute
+
+
+class CircuitBreaker:
+    """closed -> open after ``failure_threshold`` consecutive failures -> half_open after ``reset_seconds``.
+
+    In half_open a single probe request is let through; its outcome closes or reopens the circuit.
+    A probe that ends without an answer from the upstream (cancelled, non-HTTP error) is released
+    with :meth:`end_probe` so the next caller probes instead.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError while open; return True if this call is the half_open probe."""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            raise CircuitOpenError("外部APIが応答しないため送信を停止しています", max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("circuit opened after %d consecutive failures", self.failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def end_probe(self):
+        with self._lock:
+            self._probing = False
+
+
+class OutboundScheduler:
+    """Rate limiting, retries and circuit breaking for one upstream API."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        burst_seconds: float = 60.0,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute * burst_seconds / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "succeeded": 0, "retries": 0, "rate_limited": 0, "failed": 0, "throttled_seconds": 0.0}
+
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        """Run ``fn`` (one upstream request) under the limits, retrying transient errors."""
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            try:
+                time.sleep(self._admit(tokens))
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(e, attempt, probe)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            else:
+                self._on_success()
+                return result
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+        raise AssertionError("unreachable")
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """Async variant of :meth:`call`; ``fn`` returns a fresh awaitable per attempt."""
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            try:
+                await asyncio.sleep(self._admit(tokens))
+                result = await fn()
+            except Exception as e:
+                delay = self._on_error(e, attempt, probe)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            else:
+                self._on_success()
+                return result
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 1)
+        stats["circuit"] = self.breaker.state
+        stats["paused_for_seconds"] = round(max(0.0, self._paused_until - time.monotonic()), 1)
+        return stats
+
+    def _admit(self, tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens) if tokens else 0.0)
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self._stats["calls"] += 1
+            self._stats["throttled_seconds"] += wait
+        return max(wait, 0.0)
+
+    def _on_success(self):
+        self.breaker.record_success()
+        with self._lock:
+            self._stats["succeeded"] += 1
+
+    def _on_error(self, exc: Exception, attempt: int, probe: bool = False) -> Optional[float]:
+        """Return the delay before retrying, or None if ``exc`` should propagate.
+
+        ``probe`` is True when this attempt was the circuit breaker's half_open probe.
+        """
+        status = _status_code(exc)
+        rate_limited = status == 429
+        if not rate_limited and not _is_transient(exc, status):
+            if probe and status is not None:
+                # 400等が返るならプロバイダーは応答している
+                self.breaker.record_success()
+            return None
+
+        if not rate_limited or probe:
+            # 429はクォータの問題でありプロバイダー障害ではないため、ブレーカーには数えない
+            # （試行中の429だけは回路を開き直し、reset_seconds 後に改めて試す）
+            self.breaker.record_failure()
+
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        with self._lock:
+            if rate_limited:
+                self._stats["rate_limited"] += 1
+                # 他のスレッド/コルーチンも同じ時刻まで送信を控える
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            if attempt >= self.max_retries:
+                self._stats["failed"] += 1
+            else:
+                self._stats["retries"] += 1
+
+        if attempt >= self.max_retries:
+            if rate_limited:
+                raise UpstreamBusyError(f"{self.name}: レート制限により再送上限に達しました", delay) from exc
+            return None
+        logger.info("%s: %s, retrying in %.1fs (attempt %d)", self.name, status or type(exc).__name__, delay, attempt + 1)
+        return delay
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None and isinstance(getattr(exc, "response", None), httpx.Response):
+        status = exc.response.status_code
+    return status
+
+
+def _is_transient(exc: Exception, status: Optional[int]) -> bool:
+    if status is not None:
+        return status in (408, 409) or status >= 500
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError))
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds requested by the ``retry-after-ms`` / ``Retry-After`` response headers, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            return max(parsed.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+openai_scheduler = OutboundScheduler(
+    "openai",
+    requests_per_minute=settings.OPENAI_RPM_LIMIT,
+    tokens_per_minute=settings.OPENAI_TPM_LIMIT,
+    burst_seconds=settings.OPENAI_RATE_BURST_SECONDS,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    backoff_base=settings.OPENAI_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.OPENAI_BACKOFF_MAX_SECONDS,
+    failure_threshold=settings.OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=settings.OPENAI_CIRCUIT_RESET_SECONDS,
+)
@@ -0,0 +1,131 @@
+"""定期実行ジョブ -- APIプロセス内のスレッドで一定間隔ごとに処理を実行する
+
+複数プロセスで起動しても二重実行しないよう、各回の実行は PostgreSQL の
+アドバイザリーロック（``pg_try_advisory_lock``）を取れたプロセスだけが行う。
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional
+
+import logging
+import threading
+import time
+import zlib
+
+from sqlalchemy import text
+
+from config import settings
+from database import engine
+from services.audit_partitions import maintain as maintain_audit_partitions
+from services.invoice_rollup import reconcile as reconcile_invoice_rollup
+from services.vendor_revalidation import revalidate_vendors
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval_seconds: float, fn: Callable[[], object], initial_delay: float = 60):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.fn = fn
+        self.initial_delay = initial_delay
+        self.last_started: Optional[float] = None
+        self.last_result: object = None
+        self.last_error: Optional[str] = None
+
+
+class Scheduler:
+    def __init__(self):
+        self.tasks: dict[str, PeriodicTask] = {}
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def add(self, task: PeriodicTask):
+        self.tasks[task.name] = task
+
+    def start(self):
+        for task in self.tasks.values():
+            if task.interval_seconds <= 0:
+                continue
+            t = threading.Thread(target=self._loop, args=(task,), name=f"scheduler-{task.name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads.clear()
+
+    def run_now(self, name: str) -> object:
+        """Run a task synchronously (admin trigger). Returns None if skipped or failed."""
+        return self._run(self.tasks[name])
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": t.name,
+                "interval_seconds": t.interval_seconds,
+                "last_started_ago_seconds": round(time.monotonic() - t.last_started) if t.last_started else None,
+                "last_result": t.last_result,
+                "last_error": t.last_error,
+            }
+            for t in self.tasks.values()
+        ]
+
+    def _loop(self, task: PeriodicTask):
+        if self._stop.wait(task.initial_delay):
+            return
+        while not self._stop.is_set():
+            self._run(task)
+            self._stop.wait(task.interval_seconds)
+
+    def _run(self, task: PeriodicTask) -> object:
+        lock_key = zlib.crc32(f"scheduler:{task.name}".encode())
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": lock_key}).scalar():
+                logger.info("scheduled task %s is running elsewhere; skipped", task.name)
+                return None
+            conn.commit()  # セッション単位のロックなのでトランザクションを開いたままにしない
+            try:
+                task.last_started = time.monotonic()
+                started = time.perf_counter()
+                task.last_result = task.fn()
+                task.last_error = None
+                logger.info("scheduled task %s finished in %.1fs", task.name, time.perf_counter() - started)
+                return task.last_result
+            except Exception as e:
+                task.last_error = str(e)
+                logger.exception("scheduled task %s failed", task.name)
+                return None
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": lock_key})
+                conn.commit()
+
+
+scheduler = Scheduler()
+scheduler.add(PeriodicTask(
+    "vendor_revalidation",
+    settings.NTA_REVALIDATION_INTERVAL_HOURS * 3600,
+    revalidate_vendors,
+))
+scheduler.add(PeriodicTask(
+    "invoice_rollup_reconcile",
+    settings.DASHBOARD_ROLLUP_RECONCILE_MINUTES * 60,
+    reconcile_invoice_rollup,
+    initial_delay=5,
+))
+scheduler.add(PeriodicTask(
+    "audit_partitions",
+    settings.AUDIT_MAINTENANCE_INTERVAL_HOURS * 3600,
+    maintain_audit_partitions,
+    initial_delay=10,
+))
+
+
+def start_scheduler():
+    scheduler.start()
+
+
+def stop_scheduler():
+    scheduler.stop()
@@ -0,0 +1,54 @@
+"""データベーススキーマの更新 -- Alembic のマイグレーションを起動時に適用する
+
+スキーマの変更は migrations/versions にリビジョンとして追加する（``alembic revision --autogenerate``）。
+マイグレーション導入前に create_all で作られたデータベース（alembic_version がない）は、
+初期リビジョン（0001 = 最初の版が作ったテーブルだけ）として記録してから以降のリビジョンを適用する。
+その後の版が create_all で足したテーブルは、どの版で作られたかによって有無が違うため、
+0004 が無いものだけを作る。
+
+複数のプロセスが同時に起動しても二重に適用しないよう、PostgreSQL のアドバイザリーロックで直列化する。
+手動で適用する場合は ``alembic upgrade head``。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+BASELINE_REVISION = "0001"
+MIGRATION_LOCK_ID = 20_0001  # pg_advisory_lock のキー（アプリ内で一意）
+
+
+def alembic_config() -> Config:
+    return Config(ALEMBIC_INI)
+
+
+def upgrade_database(bind: Engine = engine) -> None:
+    """Apply pending migrations, stamping a pre-migration (create_all) database at the baseline first."""
+    cfg = alembic_config()
+    with bind.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        try:
+            tables = set(inspect(conn).get_table_names())
+            # Alembic は自分で開始したトランザクションを前提にするため、渡す前に閉じておく
+            conn.commit()
+            cfg.attributes["connection"] = conn
+            if "invoices" in tables and "alembic_version" not in tables:
+                logger.info("schema created without migrations; stamping revision %s", BASELINE_REVISION)
+                command.stamp(cfg, BASELINE_REVISION)
+            command.upgrade(cfg, "head")
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+            conn.commit()
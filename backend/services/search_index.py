@@ -0,0 +1,248 @@
+"""請求書の全文検索 -- 日本語をバイグラム（2文字ずつ）に分けた tsvector で検索する
+
+PostgreSQL の標準パーサーは日本語を単語に分けられないため、文字列の分割はアプリ側で行う。
+
+- 漢字・かな・カタカナの連続は2文字ずつずらして切り出す（1文字だけならその1文字）
+- 英数字は単語単位（「INV-2024-001」→ inv / 2024 / 001）
+- 全角・半角、大文字・小文字は NFKC + 小文字化で揃える
+
+請求書番号・取引先名（重み A）、摘要（B）、明細の品目（C）から位置と重み付きの tsvector
+リテラルを組み立て、invoice_search_documents に保存する。検索語も同じ規則で分割し、
+連続した部分は隣接演算子（<->）、語と語の間は AND で結ぶ。
+
+文書の更新は ORM のフラッシュで変更を検知し、コミット直前にトランザクション内でまとめて行う。
+既存データの作り直しは ``python scripts/reindex_search.py``。
+
+一致する請求書が SEARCH_MAX_CANDIDATES 件を超える場合は、先に見つかった分だけを順位付けする
+（よくある語だけの検索で全件の順位計算をしないため）。その場合は絞り込みを促す。
+
+取引先名の部分一致（一覧の vendor_name）は pg_trgm の GIN インデックスを使う（初期マイグレーションで作成）。
+拡張が使えないデータベースではインデックスを作らず、従来どおり全件走査になる。
+"""
+
+from __future__ import annotations
+from typing import Iterable, Optional
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import cast, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import TSQUERY, TSVECTOR, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models.invoice import Invoice
+from models.invoice_detail import InvoiceDetail
+from models.invoice_search import InvoiceSearchDocument
+from models.vendor import Vendor
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[ぁ-ゖァ-ヺー々一-鿿豈-﫿]+|[0-9a-z]+")
+_CJK_RE = re.compile(r"[^0-9a-z]")
+MAX_POSITION = 16383  # tsvector の位置の上限
+INDEXED_INVOICE_FIELDS = ("invoice_number", "vendor_id", "description")
+REINDEX_CHUNK = 1000
+
+
+def _runs(value: Optional[str]) -> list[str]:
+    if not value:
+        return []
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", value).lower())
+
+
+def _grams(run: str) -> list[str]:
+    if not _CJK_RE.match(run) or len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _quote(lexeme: str) -> str:
+    return "'" + lexeme.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def build_document(weighted_texts: Iterable[tuple[str, Optional[str]]]) -> str:
+    """tsvector literal from ``(weight, text)`` pairs, e.g. ``'株式':1A '式会':2A``."""
+    positions: dict[str, list[str]] = defaultdict(list)
+    pos = 0
+    for weight, value in weighted_texts:
+        for run in _runs(value):
+            for gram in _grams(run):
+                pos = min(pos + 1, MAX_POSITION)
+                positions[gram].append(f"{pos}{weight}")
+            pos = min(pos + 1, MAX_POSITION)  # 連続していない語をまたいで隣接一致しないよう1つ空ける
+    return " ".join(f"{_quote(lex)}:{','.join(p[:256])}" for lex, p in positions.items())
+
+
+def build_query(q: str) -> Optional[str]:
+    """tsquery literal for a search string; None if it contains nothing searchable."""
+    parts = []
+    runs = _runs(q)
+    for i, run in enumerate(runs):
+        grams = _grams(run)
+        is_cjk = bool(_CJK_RE.match(run))
+        if (is_cjk and len(run) == 1) or (not is_cjk and i == len(runs) - 1):
+            # 漢字1文字や入力途中の最後の英数字は前方一致
+            parts.append(f"{_quote(grams[0])}:*")
+        else:
+            parts.append("(" + " <-> ".join(_quote(g) for g in grams) + ")")
+    return " & ".join(parts) if parts else None
+
+
+def tsquery(q: str):
+    literal = build_query(q)
+    return cast(literal, TSQUERY) if literal else None
+
+
+def reindex(conn: Connection, invoice_ids: Iterable[int] = (), vendor_ids: Iterable[int] = ()) -> int:
+    """Rebuild documents for the given invoices and every invoice of the given vendors."""
+    invoice_ids, vendor_ids = list(set(invoice_ids)), list(set(vendor_ids))
+    if not invoice_ids and not vendor_ids:
+        return 0
+    q = select(Invoice.id, Invoice.invoice_number, Invoice.description, Vendor.name).outerjoin(
+        Vendor, Vendor.id == Invoice.vendor_id
+    )
+    if invoice_ids and vendor_ids:
+        q = q.where(Invoice.id.in_(invoice_ids) | Invoice.vendor_id.in_(vendor_ids))
+    elif invoice_ids:
+        q = q.where(Invoice.id.in_(invoice_ids))
+    else:
+        q = q.where(Invoice.vendor_id.in_(vendor_ids))
+    rows = conn.execute(q).all()
+
+    total = 0
+    for i in range(0, len(rows), REINDEX_CHUNK):
+        total += _write(conn, rows[i:i + REINDEX_CHUNK])
+    return total
+
+
+def _write(conn: Connection, rows: list) -> int:
+    if not rows:
+        return 0
+    lines: dict[int, list[str]] = defaultdict(list)
+    for invoice_id, description in conn.execute(
+        select(InvoiceDetail.invoice_id, InvoiceDetail.description)
+        .where(InvoiceDetail.invoice_id.in_([r.id for r in rows]))
+        .order_by(InvoiceDetail.invoice_id, InvoiceDetail.id)
+    ):
+        lines[invoice_id].append(description)
+
+    docs = [
+        {
+            "invoice_id": r.id,
+            "document": build_document(
+                [("A", r.invoice_number), ("A", r.name), ("B", r.description)]
+                + [("C", line) for line in lines[r.id]]
+            ),
+        }
+        for r in rows
+    ]
+    stmt = insert(InvoiceSearchDocument).values([
+        {"invoice_id": d["invoice_id"], "document": cast(d["document"], TSVECTOR)} for d in docs
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InvoiceSearchDocument.invoice_id],
+        set_={"document": stmt.excluded.document, "updated_at": func.now()},
+    )
+    conn.execute(stmt)
+    return len(docs)
+
+
+def _changed(obj, fields: Iterable[str]) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[f].history.has_changes() for f in fields)
+
+
+def _pending(session: Session) -> dict[str, set]:
+    return session.info.setdefault("search_reindex", {"invoices": set(), "vendors": set()})
+
+
+def mark_for_reindex(session: Session, invoice_ids: Iterable[int] = (), vendor_ids: Iterable[int] = ()):
+    """Rebuild these documents at commit (for changes made with Core statements the flush does not see)."""
+    pending = _pending(session)
+    pending["invoices"].update(invoice_ids)
+    pending["vendors"].update(vendor_ids)
+
+
+def _after_flush(session: Session, flush_context):
+    pending = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Invoice):
+            if obj in session.deleted or not (obj in session.new or _changed(obj, INDEXED_INVOICE_FIELDS)):
+                continue
+            pending = pending or _pending(session)
+            pending["invoices"].add(obj.id)
+        elif isinstance(obj, InvoiceDetail):
+            invoice_id = obj.invoice_id or (obj.invoice.id if obj.invoice else None)
+            if invoice_id:
+                pending = pending or _pending(session)
+                pending["invoices"].add(invoice_id)
+        elif isinstance(obj, Vendor) and obj in session.dirty and _changed(obj, ["name"]):
+            pending = pending or _pending(session)
+            pending["vendors"].add(obj.id)
+
+
+def _before_commit(session: Session):
+    if "search_reindex" not in session.info and not (session.new or session.dirty or session.deleted):
+        return
+    session.flush()
+    pending = session.info.pop("search_reindex", None)
+    if pending:
+        reindex(session.connection(), pending["invoices"], pending["vendors"])
+
+
+def _after_rollback(session: Session):
+    session.info.pop("search_reindex", None)
+
+
+event.listen(Session, "after_flush", _after_flush)
+event.listen(Session, "before_commit", _before_commit)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_rollback(session))
+
+
+def reindex_all(chunk: int = 5000) -> int:
+    """Rebuild every invoice's document (for existing data / after changing the tokenizer)."""
+    total = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(Invoice.id).where(Invoice.id > last_id).order_by(Invoice.id).limit(chunk)
+            ).scalars().all()
+            if not ids:
+                return total
+            total += reindex(conn, ids)
+        last_id = ids[-1]
+        logger.info("reindexed %d invoices (up to id %d)", total, last_id)
+
+
+def search(
+    db: Session, q: str, limit: int, department_id: Optional[int] = None
+) -> tuple[list[tuple[int, float]], bool]:
+    """``(invoice_id, rank)`` of the best matches, best first, and whether the candidates were capped."""
+    query = tsquery(q)
+    if query is None:
+        return [], False
+    cap = settings.SEARCH_MAX_CANDIDATES
+    candidates = (
+        select(InvoiceSearchDocument.invoice_id, InvoiceSearchDocument.document)
+        .join(Invoice, Invoice.id == InvoiceSearchDocument.invoice_id)
+        .where(InvoiceSearchDocument.document.op("@@")(query), Invoice.is_deleted.is_(False))
+        .limit(cap + 1)
+    )
+    if department_id:
+        candidates = candidates.where(Invoice.department_id == department_id)
+    candidates = candidates.subquery()
+    rank = func.ts_rank(candidates.c.document, query)
+    total = func.count().over()
+    stmt = (
+        select(candidates.c.invoice_id, rank, total)
+        .order_by(rank.desc(), candidates.c.invoice_id.desc())
+        .limit(limit)
+    )
+    rows = db.execute(stmt).all()
+    return [(invoice_id, float(r)) for invoice_id, r, _ in rows], bool(rows) and rows[0][2] > cap
@@ -0,0 +1,250 @@
+"""テキストレイヤー抽出 -- 電子発行PDFの埋め込みテキストからルールで請求書項目を読み取る
+
+会計ソフト等で発行されたPDFはテキストレイヤーを持つため、GPT-4o Visionを呼ばずに
+正規表現で主要項目を取り出せる。必須項目が欠けている、金額が整合しない、請求金額を
+検算できない、または必須項目の確度が OCR_TEXT_LAYER_MIN_CONFIDENCE 未満の場合は
+None を返し、呼び出し側がVisionモデルにフォールバックする。
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+import re
+import unicodedata
+from datetime import date
+
+from config import settings
+from services.extraction_validation import REQUIRED_FIELDS, amount, validate_extraction
+from services.pdf_service import count_pages, extract_text_layer
+
+TEXT_LAYER_VERSION = "2"
+
+# 1ページ目の文字数がこれ未満ならスキャン画像のPDFとみなす
+MIN_TEXT_CHARS = 40
+
+_AMOUNT = r"[¥\\]?\s*(-?\d{1,3}(?:,\d{3})+|-?\d+)\s*円?"
+_DATE = (
+    r"(?:(?P<y>\d{4})\s*[年/.\-]\s*(?P<m>\d{1,2})\s*[月/.\-]\s*(?P<d>\d{1,2})\s*日?"
+    r"|令和\s*(?P<ry>\d{1,2}|元)\s*年\s*(?P<rm>\d{1,2})\s*月\s*(?P<rd>\d{1,2})\s*日)"
+)
+_DATE_RE = re.compile(_DATE)
+
+_LABELS = {
+    "invoice_date": r"(?:請求日|発行日|請求書発行日|日付)",
+    "due_date": r"(?:お?支払(?:い)?期(?:限|日)|お?振込期(?:限|日)|支払予定日)",
+    "total_amount": r"(?:ご?請求金額|ご請求額|請求合計|総合計|合計金額|税込合計|^合計)",
+    "subtotal_amount": r"(?:小計|税抜(?:合計|金額)|税抜き金額)",
+    "tax_amount": r"(?:消費税(?:額)?(?:合計)?|内消費税)",
+}
+
+_COMPANY_RE = re.compile(r"(株式会社|有限会社|合同会社|合名会社|合資会社|一般社団法人|\(株\)|\(有\))")
+_VENDOR_LABEL_RE = re.compile(r"^(請求元|発行元)\s*[:：]?\s*")
+
+
+def extract_from_text_layer(file_path: str) -> Optional[dict]:
+    """Extract invoice fields from a born-digital PDF, or None if the vision model is needed."""
+    # 上限を超えるPDFは途中のページを読まないため、ページ単位で結果に印を付けるVision側に任せる
+    if count_pages(file_path) > settings.OCR_PDF_MAX_PAGES:
+        return None
+    pages = extract_text_layer(file_path)
+    if not pages or len(pages[0].strip()) < MIN_TEXT_CHARS:
+        return None
+
+    result = parse_invoice_text("\n".join(pages))
+    if fast_path_problems(result):
+        return None
+    return result
+
+
+def fast_path_problems(result: dict) -> list[str]:
+    """Return why a text-layer result cannot be used without the vision model; empty if it can."""
+    problems = validate_extraction(result)
+    if "subtotal_amount" in (result.get("_derived") or ()):
+        problems.append("税抜金額の記載がなく請求金額を検算できません")
+    confidence = result.get("_confidence") or {}
+    low = [
+        label for field, label in REQUIRED_FIELDS.items()
+        if result.get(field) is not None and confidence.get(field, 0) < settings.OCR_TEXT_LAYER_MIN_CONFIDENCE
+    ]
+    if low:
+        problems.append(f"確度の低い項目があります ({', '.join(low)})")
+    return problems
+
+
+def parse_invoice_text(text: str) -> dict:
+    """Apply the extraction rules to already extracted text. Adds per-field ``_confidence``."""
+    text = unicodedata.normalize("NFKC", text)
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    result: dict = {}
+    confidence: dict = {}
+    derived: list[str] = []
+
+    def put(field: str, value, score: float):
+        if value is not None and result.get(field) is None:
+            result[field] = value
+            confidence[field] = score
+
+    reg = re.search(r"登録番号\s*[:：]?\s*T\s*-?\s*(\d{13})", text)
+    if reg:
+        put("invoice_registration_number", "T" + reg.group(1), 0.99)
+    else:
+        reg = re.search(r"\bT\s*-?\s*(\d{13})\b", text)
+        if reg:
+            put("invoice_registration_number", "T" + reg.group(1), 0.9)
+
+    number = re.search(r"(?:請求書番号|請求番号|伝票番号|No\.?)\s*[:：]?\s*([A-Za-z0-9][A-Za-z0-9\-_/]*)", text)
+    if number:
+        put("invoice_number", number.group(1), 0.9)
+
+    for field in ("invoice_date", "due_date"):
+        for ln in lines:
+            if re.search(_LABELS[field], ln):
+                value = _find_date(ln)
+                if value:
+                    put(field, value, 0.95)
+                    break
+    if result.get("invoice_date") is None:
+        for ln in lines:
+            value = _find_date(ln)
+            if value:
+                put("invoice_date", value, 0.6)
+                break
+
+    for field in ("total_amount", "subtotal_amount", "tax_amount"):
+        for ln in lines:
+            if field == "tax_amount" and re.search(r"(8|10)\s*%", ln):
+                continue
+            if re.search(_LABELS[field], ln):
+                value = _last_amount(ln)
+                if value is not None:
+                    put(field, value, 0.95)
+                    break
+
+    for rate, field in (("8", "tax_8_amount"), ("10", "tax_10_amount")):
+        for ln in lines:
+            if re.search(rf"(?<!\d){rate}\s*%", ln) and "税" in ln:
+                value = _last_amount(ln)
+                if value is not None:
+                    put(field, value, 0.85)
+                    break
+
+    if result.get("tax_amount") is None and (result.get("tax_8_amount") or result.get("tax_10_amount")):
+        put("tax_amount", (result.get("tax_8_amount") or 0) + (result.get("tax_10_amount") or 0), 0.8)
+        derived.append("tax_amount")
+    if result.get("subtotal_amount") is None and result.get("total_amount") and result.get("tax_amount") is not None:
+        put("subtotal_amount", result["total_amount"] - result["tax_amount"], 0.8)
+        derived.append("subtotal_amount")
+
+    for ln in lines:
+        if _COMPANY_RE.search(ln) and re.search(r"(御中|様)\s*$", ln):
+            put("recipient_name", re.sub(r"\s*(御中|様)\s*$", "", ln), 0.9)
+            break
+    candidates = [
+        (index, ln) for index, ln in enumerate(lines)
+        if _COMPANY_RE.search(ln) and not re.search(r"(御中|様)", ln) and len(ln) <= 60
+    ]
+    # 「請求元」等のラベル付き、または登録番号のすぐ近くにある会社名は発行元とみてよい
+    digits = (result.get("invoice_registration_number") or "")[1:]
+    reg_line = next((index for index, ln in enumerate(lines) if digits and digits in ln), None)
+    for index, ln in candidates:
+        if _VENDOR_LABEL_RE.match(ln) or (reg_line is not None and abs(index - reg_line) <= 2):
+            put("vendor_name", _VENDOR_LABEL_RE.sub("", ln), 0.9)
+            break
+    if candidates:
+        put("vendor_name", _VENDOR_LABEL_RE.sub("", candidates[0][1]), 0.7)
+
+    result["bank_account"], bank_confidence = _parse_bank(text)
+    confidence.update({f"bank_account.{k}": v for k, v in bank_confidence.items()})
+
+    result["items"] = _parse_items(lines)
+    if result["items"]:
+        confidence["items"] = 0.7
+
+    for field in ("vendor_name", "invoice_number", "invoice_date", "due_date",
+                  "total_amount", "subtotal_amount", "tax_amount", "tax_8_amount", "tax_10_amount",
+                  "invoice_registration_number", "recipient_name"):
+        result.setdefault(field, None)
+
+    result["_source"] = "text_layer"
+    result["_text_layer_version"] = TEXT_LAYER_VERSION
+    result["_confidence"] = confidence
+    result["_derived"] = derived
+    return result
+
+
+def _find_date(line: str) -> Optional[str]:
+    m = _DATE_RE.search(line)
+    if not m:
+        return None
+    try:
+        if m.group("y"):
+            return date(int(m.group("y")), int(m.group("m")), int(m.group("d"))).isoformat()
+        year = 1 if m.group("ry") == "元" else int(m.group("ry"))
+        return date(2018 + year, int(m.group("rm")), int(m.group("rd"))).isoformat()
+    except ValueError:
+        return None
+
+
+def _last_amount(line: str) -> Optional[int]:
+    # 日付や税率の数字を金額と取り違えないよう除去してから末尾の金額を取る
+    cleaned = _DATE_RE.sub(" ", line)
+    cleaned = re.sub(r"\d+(\.\d+)?\s*%", " ", cleaned)
+    matches = re.findall(_AMOUNT, cleaned)
+    if not matches:
+        return None
+    value = amount(matches[-1])
+    return int(value) if value is not None else None
+
+
+def _parse_bank(text: str) -> tuple[dict, dict]:
+    bank: dict = {
+        "bank_name": None, "branch_name": None, "account_type": None,
+        "account_number": None, "account_holder": None,
+    }
+    confidence: dict = {}
+
+    m = re.search(r"([^\s:：]{1,20}(?:銀行|信用金庫|信用組合|労働金庫|農業協同組合|ゆうちょ銀行))", text)
+    if m:
+        bank["bank_name"] = m.group(1)
+        confidence["bank_name"] = 0.9
+    m = re.search(r"([^\s:：]{1,20}(?:支店|出張所|営業部))", text)
+    if m:
+        bank["branch_name"] = m.group(1)
+        confidence["branch_name"] = 0.9
+    m = re.search(r"(普通|当座|貯蓄)(?:預金)?", text)
+    if m:
+        bank["account_type"] = m.group(1)
+        confidence["account_type"] = 0.9
+    m = re.search(r"(?:口座番号|普通|当座)\s*(?:預金)?\s*[:：]?\s*(?:No\.?)?\s*(\d{7})(?!\d)", text)
+    if m:
+        bank["account_number"] = m.group(1)
+        confidence["account_number"] = 0.9
+    m = re.search(r"口座名(?:義|義人)?\s*[:：]?\s*([^\n]+)", text)
+    if m:
+        bank["account_holder"] = m.group(1).strip()
+        confidence["account_holder"] = 0.8
+    return bank, confidence
+
+
+def _parse_items(lines: list[str]) -> list[dict]:
+    """Read line items between the table header (品目/摘要/品名/内容) and the subtotal line."""
+    items = []
+    in_table = False
+    for ln in lines:
+        if not in_table:
+            if re.search(r"(品目|摘要|品名|内容|項目)", ln) and re.search(r"(金額|単価)", ln):
+                in_table = True
+            continue
+        if re.search(r"^(小計|合計|消費税|税抜|税込|値引)", ln):
+            break
+        value = _last_amount(ln)
+        description = re.sub(r"[\d,¥\\円\s%.※*]+$", "", ln).strip()
+        if value is None or not description:
+            continue
+        items.append({
+            "description": description,
+            "amount": value,
+            "tax": None,
+            "tax_rate": "8%" if ("※" in ln or re.search(r"(?<!\d)8\s*%", ln)) else "10%",
+        })
+    return items
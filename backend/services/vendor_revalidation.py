@@ -0,0 +1,121 @@
+"""取引先の登録番号の定期再確認 -- 登録の取消・失効を取引先と未処理の請求書へ反映する"""
+
+from __future__ import annotations
+from typing import Optional
+
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from config import settings
+from database import SessionLocal
+from models.invoice import Invoice
+from models.vendor import Vendor
+from services import invoice_rollup, nta_registry
+from services.nta_api_service import is_definitive, normalize_registration_number, verify_registration_numbers
+
+logger = logging.getLogger(__name__)
+
+UPDATE_CHUNK = 5000
+
+# 振込済み・却下済みの請求書は処理時点の判定を残す
+FINAL_INVOICE_STATUSES = ("transferred", "rejected")
+
+
+def revalidate_vendors(stale_hours: Optional[float] = None) -> dict:
+    """Re-check every vendor's registration number against the NTA API and bulk-update the results.
+
+    ``stale_hours`` limits the run to vendors not checked within that many hours.
+    Numbers whose lookup failed (network/HTTP errors) are left unchanged. With NTA_LOOKUP_MODE
+    ``local`` the run is skipped while the mirror is empty or older than NTA_LOCAL_MAX_AGE_HOURS.
+    """
+    if settings.NTA_LOOKUP_MODE == "local":
+        # local ではミラーにない番号を「無効」と判定するため、未取込・古いミラーでは全件が無効になってしまう
+        stale = nta_registry.staleness()
+        if stale:
+            logger.warning("vendor revalidation skipped: %s", stale)
+            return {"skipped": stale}
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        q = select(Vendor.id, Vendor.invoice_registration_number).where(
+            Vendor.invoice_registration_number.isnot(None),
+            Vendor.invoice_registration_number != "",
+        )
+        if stale_hours is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=stale_hours)
+            q = q.where((Vendor.registration_checked_at.is_(None)) | (Vendor.registration_checked_at < cutoff))
+        vendors = db.execute(q).all()
+        db.rollback()
+
+        by_number: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        for vendor_id, raw in vendors:
+            by_number[normalize_registration_number(raw)].append((vendor_id, raw))
+
+        results = verify_registration_numbers(list(by_number), refresh=True)
+
+        vendor_ids: dict[str, list[int]] = defaultdict(list)
+        raw_numbers: dict[str, set[str]] = defaultdict(set)
+        errors = 0
+        for number, result in results.items():
+            if not is_definitive(result):
+                errors += 1
+                continue
+            status = "valid" if result.is_valid else "invalid"
+            for vendor_id, raw in by_number[number]:
+                vendor_ids[status].append(vendor_id)
+                raw_numbers[status].update({raw, number})
+
+        now = datetime.now(timezone.utc)
+        old = Invoice.__table__.alias("old")
+        invoices_updated = 0
+        for status, ids in vendor_ids.items():
+            for i in range(0, len(ids), UPDATE_CHUNK):
+                db.execute(
+                    update(Vendor)
+                    .where(Vendor.id.in_(ids[i:i + UPDATE_CHUNK]))
+                    .values(registration_status=status, registration_checked_at=now)
+                )
+            numbers = sorted(raw_numbers[status])
+            for i in range(0, len(numbers), UPDATE_CHUNK):
+                # 自己結合した old から更新前の値を返し、ダッシュボード集計表へ差分を反映する
+                previous = db.execute(
+                    update(Invoice)
+                    .where(
+                        Invoice.id == old.c.id,
+                        Invoice.invoice_registration_number.in_(numbers[i:i + UPDATE_CHUNK]),
+                        Invoice.is_deleted.is_(False),
+                        Invoice.status.notin_(FINAL_INVOICE_STATUSES),
+                        Invoice.invoice_registration_status.is_distinct_from(status),
+                    )
+                    .values(invoice_registration_status=status)
+                    .returning(*invoice_rollup.state_columns(old))
+                    .execution_options(synchronize_session=False)
+                ).all()
+                invoice_rollup.apply_transitions(db, [
+                    (
+                        invoice_rollup.state_of(dept, st, reg, due, amount, deleted),
+                        invoice_rollup.state_of(dept, st, status, due, amount, deleted),
+                    )
+                    for dept, st, reg, due, amount, deleted in previous
+                ])
+                invoices_updated += len(previous)
+        db.commit()
+    finally:
+        db.close()
+
+    summary = {
+        "vendors": len(vendors),
+        "numbers": len(by_number),
+        "valid": len(vendor_ids["valid"]),
+        "invalid": len(vendor_ids["invalid"]),
+        "errors": errors,
+        "invoices_updated": invoices_updated,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    logger.info("vendor revalidation: %s", summary)
+    return summary
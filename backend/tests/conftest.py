@@ -0,0 +1,95 @@
+"""テスト共通のフィクスチャ -- 使い捨てのデータベースと SQL 文の計数
+
+テストは DATABASE_URL のサーバーに ``<データベース名>_test_<プロセスID>`` を作り、
+マイグレーションを適用して使い、終了時に削除する。既存のデータベースの中身には触れない。
+アップロード先と監査ログのアーカイブ先も一時ディレクトリにする。
+アプリのモジュールは DATABASE_URL を読み込み時に使うため、ここで差し替えてから読み込ませる。
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+_scratch = tempfile.mkdtemp(prefix="invoice-test-")
+os.environ["EXTRACTION_WORKERS"] = "0"
+os.environ["UPLOAD_DIR"] = os.path.join(_scratch, "uploads")
+os.environ["AUDIT_ARCHIVE_DIR"] = os.path.join(_scratch, "audit_archive")
+os.makedirs(os.environ["UPLOAD_DIR"])
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from config import settings  # noqa: E402
+
+_server_url = make_url(settings.DATABASE_URL)
+TEST_DATABASE = f"{_server_url.database}_test_{os.getpid()}"
+settings.DATABASE_URL = _server_url.set(database=TEST_DATABASE).render_as_string(hide_password=False)
+os.environ["DATABASE_URL"] = settings.DATABASE_URL
+
+
+def _admin_engine():
+    return create_engine(_server_url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Create the disposable database, migrate it to head, and drop it after the session."""
+    admin = _admin_engine()
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}"'))
+        conn.execute(text(f'CREATE DATABASE "{TEST_DATABASE}"'))
+
+    from database import engine
+    from services.schema import upgrade_database
+
+    try:
+        upgrade_database()
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)'))
+        admin.dispose()
+        shutil.rmtree(_scratch, ignore_errors=True)
+
+
+class StatementCounter:
+    """Records the SQL statements sent to the database while :meth:`counting` is active."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append(statement)
+
+    @contextmanager
+    def counting(self):
+        self.statements = []
+        self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+
+    @property
+    def selects(self) -> int:
+        return sum(1 for s in self.statements if s.lstrip().upper().startswith("SELECT"))
+
+    def describe(self) -> str:
+        return "\n".join("    " + " ".join(s.split())[:160] for s in self.statements)
+
+
+@pytest.fixture
+def statement_counter(database):
+    counter = StatementCounter()
+    event.listen(database, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(database, "before_cursor_execute", counter)
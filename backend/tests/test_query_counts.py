@@ -0,0 +1,127 @@
+"""請求書APIのSQL発行回数 -- N+1 の再発を CI で検出する
+
+合成データを投入して各エンドポイントを呼び、発行された SQL 文を数える。
+件数の上限（BUDGETS）を超えた場合や、一覧・アップロードで SELECT の数が件数に比例して増えた場合に失敗する。
+"""
+
+from __future__ import annotations
+
+import io
+import os
+
+import pytest
+
+MARKER = "query-count-check"
+
+# エンドポイントごとの SQL 文の上限（認証を除く。BEGIN/COMMIT は数えない）
+# 更新・アップロードはコミット時の検索用文書の更新（3文）を含む。監査ログは件数によらずコミット時の1文
+BUDGETS = {
+    "list (per_page=10)": 2,
+    "list (per_page=100)": 2,
+    "list (fields=details,...)": 4,
+    "detail": 3,
+    "update": 11,
+    "update (1 of 3 details)": 11,
+    "approve": 7,
+    "reject": 7,
+    "bulk approve (100)": 3,
+    "upload (1 file)": 10,
+    "upload (5 files)": 22,
+}
+
+# 件数を増やしても SELECT の数が変わってはいけない組
+SCALING = [("list (per_page=10)", "list (per_page=100)"), ("upload (1 file)", "upload (5 files)")]
+
+
+@pytest.fixture(scope="module")
+def seeded(database):
+    from models import BankAccount, Department, Invoice, InvoiceDetail, User, Vendor
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = User(email=f"{MARKER}@example.com", name=MARKER, hashed_password="-", role="admin")
+        dept = Department(name=MARKER, code=MARKER)
+        vendor = Vendor(name=MARKER)
+        db.add_all([user, dept, vendor])
+        db.flush()
+        invoices = []
+        for i in range(120):
+            inv = Invoice(
+                status="reviewed", vendor_id=vendor.id, department_id=dept.id, total_amount=1000 + i,
+                original_filename=MARKER, source_type="upload",
+            )
+            inv.details = [InvoiceDetail(description=f"item {n}", amount=100) for n in range(3)]
+            inv.bank_account = BankAccount(bank_name="bank", account_number="1234567")
+            invoices.append(inv)
+        db.add_all(invoices)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return {
+            "user": user,
+            "targets": [inv.id for inv in invoices[:4]],
+            "bulk": [inv.id for inv in invoices[10:110]],
+        }
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def calls(seeded):
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from services.auth_service import get_current_user
+
+    # 認証（ユーザーの読み込み）は数えないよう、読み込み済みのユーザーを返す
+    app_main.app.dependency_overrides[get_current_user] = lambda: seeded["user"]
+    client = TestClient(app_main.app)
+    targets, bulk = seeded["targets"], seeded["bulk"]
+
+    def pdf(n: int) -> list:
+        return [("files", (f"{MARKER}-{i}.pdf", io.BytesIO(b"%PDF-1.4 " + os.urandom(16)), "application/pdf")) for i in range(n)]
+
+    yield {
+        "list (per_page=10)": lambda: client.get("/api/invoices", params={"per_page": 10}),
+        "list (per_page=100)": lambda: client.get("/api/invoices", params={"per_page": 100}),
+        "list (fields=details,...)": lambda: client.get(
+            "/api/invoices", params={"per_page": 100, "fields": "details,bank_account,ai_raw_result"}
+        ),
+        "detail": lambda: client.get(f"/api/invoices/{targets[0]}"),
+        "update": lambda: client.put(f"/api/invoices/{targets[0]}", json={"description": "updated"}),
+        "update (1 of 3 details)": lambda: client.put(f"/api/invoices/{targets[3]}", json={"details": [
+            {"description": "item 0", "amount": 100}, {"description": "fixed", "amount": 100},
+            {"description": "item 2", "amount": 100},
+        ]}),
+        "approve": lambda: client.post(f"/api/invoices/{targets[1]}/approve"),
+        "reject": lambda: client.post(f"/api/invoices/{targets[2]}/reject"),
+        "bulk approve (100)": lambda: client.post(
+            "/api/invoices/bulk-transition", json={"action": "approve", "invoice_ids": bulk}
+        ),
+        "upload (1 file)": lambda: client.post("/api/invoices/upload", files=pdf(1)),
+        "upload (5 files)": lambda: client.post("/api/invoices/upload", files=pdf(5)),
+    }
+    app_main.app.dependency_overrides.pop(get_current_user, None)
+
+
+def _measure(counter, call) -> tuple[int, int]:
+    with counter.counting():
+        resp = call()
+    assert resp.status_code < 400, f"HTTP {resp.status_code} {resp.text[:200]}"
+    return len(counter.statements), counter.selects
+
+
+@pytest.mark.parametrize("name", list(BUDGETS))
+def test_statement_budget(name, calls, statement_counter):
+    statements, _ = _measure(statement_counter, calls[name])
+    assert statements <= BUDGETS[name], (
+        f"{name}: {statements} statements > budget {BUDGETS[name]}\n{statement_counter.describe()}"
+    )
+
+
+@pytest.mark.parametrize("small, large", SCALING)
+def test_select_count_does_not_grow_with_size(small, large, calls, statement_counter):
+    _, small_selects = _measure(statement_counter, calls[small])
+    _, large_selects = _measure(statement_counter, calls[large])
+    assert small_selects == large_selects, f"SELECT count grows with size: {small}={small_selects}, {large}={large_selects}"
@@ -7,7 +7,7 @@ import type { User } from "@/types";
 export default function SettingsPage() {
   const [user, setUser] = useState<User | null>(null);
   const [auditLogs, setAuditLogs] = useState<any[]>([]);
-  useEffect(() => { api.me().then(setUser).catch(() => {}); api.getAuditLogs({ limit: 50 }).then(setAuditLogs).catch(() => {}); }, []);
+  useEffect(() => { api.me().then(setUser).catch(() => {}); api.getAuditLogs({ limit: 50 }).then(r => setAuditLogs(r.items)).catch(() => {}); }, []);
 
   return (
     <div className="flex min-h-screen">
@@ -1,4 +1,4 @@
-import type { Invoice, InvoiceList, Department, Vendor, User, DashboardSummary, ComplianceCheck, AuditLogEntry } from "@/types";
+import type { Invoice, InvoiceList, InvoiceSearchResult, InvoiceBulkTransitionResult, Department, Vendor, User, DashboardSummary, ComplianceCheck, AuditLogPage } from "@/types";
 
 const API = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
@@ -29,10 +29,19 @@ class ApiClient {
   me() { return this.get<User>("/api/auth/me"); }
   uploadInvoices(files: File[]) { const fd = new FormData(); files.forEach(f => fd.append("files", f)); return this.post<Invoice[]>("/api/invoices/upload", fd); }
   getInvoices(p: Record<string, string | number> = {}) { const q = new URLSearchParams(); Object.entries(p).forEach(([k, v]) => { if (v !== undefined && v !== null && v !== "") q.set(k, String(v)); }); return this.get<InvoiceList>("/api/invoices?" + q); }
+  async exportInvoices(p: Record<string, string | number> = {}, format: "csv" | "xlsx" = "csv") {
+    const q = new URLSearchParams({ format }); Object.entries(p).forEach(([k, v]) => { if (v !== undefined && v !== null && v !== "") q.set(k, String(v)); });
+    const tk = this.getToken();
+    const r = await fetch(API + "/api/invoices/export?" + q, { headers: tk ? { Authorization: "Bearer " + tk } : {} });
+    if (!r.ok) { const e = await r.json().catch(() => ({ detail: r.statusText })); throw new Error(e.detail || "APIエラー"); }
+    return r.blob();
+  }
+  searchInvoices(q: string, limit = 20) { return this.get<InvoiceSearchResult>("/api/invoices/search?" + new URLSearchParams({ q, limit: String(limit) })); }
   getInvoice(id: number) { return this.get<Invoice>("/api/invoices/" + id); }
   updateInvoice(id: number, d: Partial<Invoice>) { return this.put<Invoice>("/api/invoices/" + id, d); }
   approveInvoice(id: number) { return this.post<Invoice>("/api/invoices/" + id + "/approve"); }
   rejectInvoice(id: number) { return this.post<Invoice>("/api/invoices/" + id + "/reject"); }
+  bulkTransitionInvoices(action: "approve" | "reject", invoice_ids: number[]) { return this.post<InvoiceBulkTransitionResult>("/api/invoices/bulk-transition", { action, invoice_ids }); }
   deleteInvoice(id: number) { return this.del<{ ok: boolean }>("/api/invoices/" + id); }
   verifyHash(id: number) { return this.get<{ valid: boolean }>("/api/invoices/" + id + "/verify-hash"); }
   executeTransfer(id: number) { return this.post<{ ok: boolean }>("/api/transfers/" + id + "/execute"); }
@@ -44,7 +53,7 @@ class ApiClient {
   checkCompliance(id: number) { return this.post<ComplianceCheck>("/api/compliance/check/" + id); }
   getComplianceDashboard() { return this.get<{ total_invoices: number; valid_registration: number; invalid_registration: number; unchecked_registration: number }>("/api/compliance/dashboard"); }
   getDashboard() { return this.get<DashboardSummary>("/api/dashboard/summary"); }
-  getAuditLogs(p: Record<string, string | number> = {}) { const q = new URLSearchParams(); Object.entries(p).forEach(([k, v]) => { if (v !== undefined && v !== null && v !== "") q.set(k, String(v)); }); return this.get<AuditLogEntry[]>("/api/audit?" + q); }
+  getAuditLogs(p: Record<string, string | number> = {}) { const q = new URLSearchParams(); Object.entries(p).forEach(([k, v]) => { if (v !== undefined && v !== null && v !== "") q.set(k, String(v)); }); return this.get<AuditLogPage>("/api/audit?" + q); }
   fetchGmail() { return this.post<{ ok: boolean; created_count: number }>("/api/gmail/fetch"); }
   getUsers() { return this.get<User[]>("/api/users"); }
   createUser(d: { email: string; name: string; password: string; role: string; department_id?: number }) { return this.post<User>("/api/users", d); }
@@ -76,11 +76,33 @@ export interface Invoice {
   department_name: string | null;
 }
 
+// 一覧は一覧用の列のみ。その他の項目は fields= で指定したときだけ含まれる
+export type InvoiceListItem = Pick<Invoice,
+  "id" | "invoice_number" | "vendor_id" | "department_id" | "status" | "invoice_date" | "due_date" |
+  "total_amount" | "original_filename" | "source_type" | "invoice_registration_number" |
+  "invoice_registration_status" | "created_at" | "updated_at" | "approved_at" | "vendor_name" | "department_name"
+> & Partial<Invoice>;
+
 export interface InvoiceList {
-  items: Invoice[];
+  items: InvoiceListItem[];
   total: number;
+  total_is_estimate: boolean;
   page: number;
   per_page: number;
+  next_cursor: string | null;
+}
+
+export interface InvoiceSearchResult {
+  query: string;
+  items: (InvoiceListItem & { rank: number })[];
+  truncated: boolean;
+}
+
+export interface InvoiceBulkTransitionResult {
+  action: "approve" | "reject";
+  status: string;
+  updated: number[];
+  skipped: { id: number; reason: "not_found" | "invalid_status" | "conflict"; status: string | null }[];
 }
 
 export interface ComplianceCheck {
@@ -114,3 +136,8 @@ export interface AuditLogEntry {
   ip_address: string | null;
   created_at: string;
 }
+
+export interface AuditLogPage {
+  items: AuditLogEntry[];
+  next_cursor: string | null;
+}